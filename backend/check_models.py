@@ -1,21 +1,17 @@
 # backend/check_models.py
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+from services.api.clients import gemini_client
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-if not api_key:
+if not gemini_client.get_api_key():
     print("❌ Erro: GEMINI_API_KEY não encontrada no .env")
     exit()
 
-genai.configure(api_key=api_key)
-
 print("🔍 Buscando modelos disponíveis...")
 try:
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            print(f"✅ Modelo disponível: {m.name}")
+    for name in gemini_client.list_available_models():
+        print(f"✅ Modelo disponível: {name}")
 except Exception as e:
-    print(f"❌ Erro ao listar modelos: {e}")
\ No newline at end of file
+    print(f"❌ Erro ao listar modelos: {e}")
+
+# Mesmo resolvedor usado pela API; a escolha atualiza o cache em disco
+chosen = gemini_client.resolve_model_name(force_refresh=True)
+print(f"🤖 Modelo selecionado: {chosen} (cache: {gemini_client.MODEL_CACHE_PATH})")
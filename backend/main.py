@@ -1,24 +1,79 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import Depends, FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List
 import uvicorn
 import os
 import json
 import logging
+import asyncio
+from datetime import datetime
 from pathlib import Path
+from dotenv import load_dotenv
+
+# Variáveis do .env antes dos imports dos services: vários módulos leem a
+# configuração (QD_*, NER_*, SYNC_*, ...) em constantes no import
+load_dotenv()
+
+from services.integration.piter_api_orchestrator import (  # noqa: E402
+    PiterApiOrchestrator, run_analysis_pipeline, save_search_with_stats, stream_analysis_pipeline
+)
+from services.integration.job_queue import get_job_queue  # noqa: E402
+from services.integration import result_index  # noqa: E402
+from services.api.clients.querido_diario_client import FilterParams  # noqa: E402
+from services.api.clients import http_pool, spacy_api_client, gemini_client  # noqa: E402
 
 # Configurar logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Imports
-from services.integration.piter_api_orchestrator import PiterApiOrchestrator, run_analysis_pipeline
-from services.api.clients.querido_diario_client import FilterParams
+# "0" desliga o carregamento antecipado (em segundo plano) dos modelos no startup
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") != "0"
+
+
+async def warm_up_models():
+    """Carrega NER e LLM em segundo plano: o servidor já aceita requisições."""
+    for name, warm_up in (("spaCy", spacy_api_client.warm_up), ("Gemini", gemini_client.warm_up)):
+        try:
+            ready = await warm_up()
+            logger.info(f"🔥 Warm-up {name}: {'ok' if ready else 'indisponível'}")
+        except Exception as e:
+            logger.warning(f"Warm-up {name} falhou: {e}")
+
+
+# Fila de jobs: análises longas rodam fora da requisição HTTP
+job_queue = get_job_queue()
+job_queue.register("analysis", run_analysis_pipeline)
+job_queue.register("save_search", save_search_with_stats)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool HTTP único por processo (HTTP/2 + keep-alive) para o Querido Diário
+    await http_pool.startup_http_client()
+    warmup_task = asyncio.create_task(warm_up_models()) if MODEL_WARMUP else None
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        if warmup_task is not None:
+            warmup_task.cancel()
+        await job_queue.stop()
+        await http_pool.shutdown_http_client()
+        try:
+            from services.api.ranking.ranking_service import shutdown_stats_executor
+            shutdown_stats_executor()
+        except ImportError:
+            pass
+        spacy_api_client.shutdown_ner_executor()
+
 
 app = FastAPI(
     title="P.I.T.E.R API",
     description="Plataforma de Integração e Transparência em Educação e Recursos",
-    version="1.3.0"
+    version="1.3.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -45,7 +100,20 @@ async def read_root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z"}
+    """
+    Liveness + readiness: `ready` indica se o modelo de NER já está carregado
+    (o LLM é opcional e só é reportado).
+    """
+    models = {
+        "ner": spacy_api_client.model_status(),
+        "llm": gemini_client.model_status(),
+    }
+    return {
+        "status": "healthy",
+        "ready": models["ner"] == "loaded",
+        "models": models,
+        "timestamp": datetime.now().isoformat()
+    }
 
 @app.get("/api/v1/gazettes")
 async def get_gazettes(
@@ -83,68 +151,131 @@ async def analyze_gazettes(
         keywords=kw_value
     )
 
-@app.get("/api/v1/analysis/files")
-async def list_analysis_files():
-    """Lista arquivos de análise salvos"""
+# Formatos aceitos por /analyze/stream e seus content-types
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def format_stream_event(event: str, payload: Dict[str, Any], fmt: str) -> str:
+    """Um evento do pipeline como linha NDJSON ou bloco SSE."""
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+    return json.dumps({"event": event, "data": payload}, ensure_ascii=False, default=str) + "\n"
+
+
+@app.get("/analyze/stream")
+async def analyze_gazettes_stream(
+    territory_id: str = "5300108",
+    since: str = "2024-01-01",
+    until: str = "2024-01-05",
+    keywords: str = Query(None, description="Palavra-chave para filtro"),
+    format: str = Query("ndjson", description="ndjson ou sse")
+):
+    """
+    Mesma análise de /analyze, transmitida por etapas (gazettes, investments,
+    entities, statistics, qualitative). O último evento, "result", traz o
+    mesmo JSON de /analyze (ou "error").
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {format} (use ndjson ou sse)")
+    kw_value = keywords if keywords else None
+
+    async def events():
+        async for event, payload in stream_analysis_pipeline(
+            territory_id=territory_id, since=since, until=until, keywords=kw_value
+        ):
+            yield format_stream_event(event, payload, format)
+
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+DATA_OUTPUT_DIR = Path(__file__).parent / "data_output"
+
+
+class ResultListing:
+    """Parâmetros comuns das listagens de resultados salvos."""
+
+    def __init__(
+        self,
+        limit: int = Query(50, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        cursor: str = Query(None, description="Cursor da próxima página (next_cursor)"),
+        territory_id: str = Query(None, description="Filtra por território"),
+        type: str = Query(None, description="analysis, search ou comparison"),
+        since: str = Query(None, description="Período analisado termina em/após (AAAA-MM-DD)"),
+        until: str = Query(None, description="Período analisado começa em/antes (AAAA-MM-DD)"),
+        summary: bool = Query(False, description="Inclui só meta + totais principais (sem abrir arquivos)"),
+        fields: str = Query(None, description="Campos do conteúdo, ex.: meta,data.total_invested"),
+        include_data: bool = Query(False, description="Inclui o conteúdo completo de cada arquivo da página"),
+    ):
+        self.limit, self.offset, self.cursor = limit, offset, cursor
+        self.filters = {"territory_id": territory_id, "kind": type, "since": since, "until": until}
+        self.summary = summary
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        self.include_data = include_data
+
+
+async def _indexed_results(listing: ResultListing, exclude_prefix: str = None):
+    """
+    Página do índice de resultados. O conteúdo dos arquivos só é lido com
+    `fields` (projeção) ou `include_data`; `summary` sai do próprio índice.
+    """
+    index = result_index.get_result_index(DATA_OUTPUT_DIR)
     try:
-        data_dir = Path(__file__).parent / "data_output"
-        
-        if not data_dir.exists():
-            return {"files": [], "total": 0}
-        
-        files = []
-        for file in sorted(data_dir.glob("*.json"), key=lambda x: x.stat().st_mtime, reverse=True):
-            if file.name.startswith("archive"):
-                continue
+        rows, total, next_cursor = await asyncio.to_thread(
+            index.list, listing.limit, listing.offset, exclude_prefix,
+            cursor=listing.cursor, with_meta=listing.summary, **listing.filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for row in rows:
+        if listing.summary:
+            row["data"] = result_index.summary_document(row)
+            row.pop("meta", None)
+        if listing.fields or listing.include_data:
             try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-                
-                files.append({
-                    "filename": file.name,
-                    "modified": file.stat().st_mtime,
-                    "data": content
-                })
+                content = await asyncio.to_thread(result_index.load_result, DATA_OUTPUT_DIR, row["name"])
+                row["data"] = result_index.project(content, listing.fields) if listing.fields else content
             except Exception as e:
-                logger.warning(f"Erro ao ler {file.name}: {e}")
-        
-        return {"files": files, "total": len(files)}
+                row["error"] = str(e)
+    page = {"total": total, "limit": listing.limit, "next_cursor": next_cursor}
+    if not listing.cursor:
+        page["offset"] = listing.offset
+    return rows, page
+
+
+@app.get("/api/v1/analysis/files")
+async def list_analysis_files(listing: ResultListing = Depends()):
+    """Lista arquivos de análise salvos (paginado e filtrado pelo índice)"""
+    try:
+        if not DATA_OUTPUT_DIR.exists():
+            return {"files": [], "total": 0}
+
+        rows, page = await _indexed_results(listing, exclude_prefix="archive")
+        files = [{"filename": row.pop("name"), **row} for row in rows]
+
+        return {"files": files, **page}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao listar arquivos: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/data_output")
-async def list_data_output():
-    """Lista todos os arquivos JSON salvos em data_output"""
+async def list_data_output(listing: ResultListing = Depends()):
+    """Lista os arquivos JSON salvos em data_output (paginado e filtrado pelo índice)"""
     try:
-        data_dir = Path(__file__).parent / "data_output"
-        
-        if not data_dir.exists():
+        if not DATA_OUTPUT_DIR.exists():
             return {"files": [], "total": 0, "message": "Nenhum arquivo encontrado"}
-        
-        files = []
-        for file in sorted(data_dir.glob("*.json"), key=lambda x: x.stat().st_mtime, reverse=True):
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-                
-                files.append({
-                    "name": file.name,
-                    "size": file.stat().st_size,
-                    "modified": file.stat().st_mtime,
-                    "type": "analysis" if "analysis" in file.name else "comparison" if "compare" in file.name else "search",
-                    "territory_id": content.get("meta", {}).get("source_territory", "unknown"),
-                    "data": content
-                })
-            except Exception as e:
-                files.append({
-                    "name": file.name,
-                    "size": file.stat().st_size,
-                    "modified": file.stat().st_mtime,
-                    "error": str(e)
-                })
-        
-        return {"files": files, "total": len(files)}
+
+        files, page = await _indexed_results(listing)
+
+        return {"files": files, **page}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -155,15 +286,11 @@ async def get_data_output_file(filename: str):
         if ".." in filename or "/" in filename:
             raise HTTPException(status_code=400, detail="Nome de arquivo inválido")
 
-        file_path = Path(__file__).parent / "data_output" / filename
-
-        if not file_path.exists():
+        # Aceita o nome .json, o .json.gz gravado em disco e ponteiros como latest_search.json
+        try:
+            return await asyncio.to_thread(result_index.load_result, DATA_OUTPUT_DIR, filename)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"Arquivo não encontrado: {filename}")
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        return data
     except HTTPException:
         raise
     except Exception as e:
@@ -173,69 +300,72 @@ async def get_data_output_file(filename: str):
 async def save_search_results(request: Dict[str, Any]):
     """Salva resultados de busca e calcula estatísticas"""
     try:
-        from services.integration.piter_api_orchestrator import save_json_file
-        from services.processing.statistics_generator import StatisticsGenerator
-        from datetime import datetime
-
-        gazettes = request.get("gazettes", [])
-        filters = request.get("filters", {})
-
-        if not gazettes:
-            return {"status": "skipped", "message": "Nenhum diário para salvar"}
-
-        stats_gen = StatisticsGenerator()
-        investment_stats = stats_gen.extract_investment_statistics(gazettes)
-
-        logger.info(f"Estatísticas: total={investment_stats.get('total_invested', 0)}")
-
-        territory_id = filters.get("territory_id") or filters.get("municipio", "unknown")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        data = {
-            "meta": {
-                "source_territory": territory_id,
-                "period": f"{filters.get('dataInicio', 'N/A')} a {filters.get('dataFim', 'N/A')}",
-                "search_keywords": filters.get("categoria") or filters.get("querystring", "N/A"),
-                "generated_at": datetime.now().isoformat(),
-                "type": "search_with_stats",
-                "date_range_start": filters.get("dataInicio"),
-                "date_range_end": filters.get("dataFim")
-            },
-            "data": {
-                "total_gazettes": len(gazettes),
-                "total_invested": investment_stats.get("total_invested", 0),
-                "total_entities": 0,
-                "investments_by_category": investment_stats.get("investments_by_category", {}),
-                "investments_by_period": investment_stats.get("investments_by_period", {}),
-                "publications_by_period": investment_stats.get("publications_by_period", {}),
-                "period_grouping": investment_stats.get("period_grouping", "month")
-            },
-            "gazettes": gazettes
-        }
-
-        filename = f"search_{territory_id}_{timestamp}.json"
-        
-        try:
-            save_json_file(data, filename, is_latest=True, latest_name="latest_search.json")
-            logger.info(f"Arquivo salvo: {filename}")
-        except Exception as e:
-            logger.warning(f"Erro ao salvar arquivo (não crítico): {e}")
-
-        return {
-            "status": "saved",
-            "filename": filename,
-            "total_gazettes": len(gazettes),
-            "total_invested": investment_stats.get("total_invested", 0),
-            "investments_by_category": investment_stats.get("investments_by_category", {}),
-            "investments_by_period": investment_stats.get("investments_by_period", {}),
-            "publications_by_period": investment_stats.get("publications_by_period", {}),
-            "period_grouping": investment_stats.get("period_grouping", "month"),
-            "message": "Resultados salvos com sucesso"
-        }
+        from services.integration.piter_api_orchestrator import save_search_with_stats
+        return await save_search_with_stats(request.get("gazettes", []), request.get("filters", {}))
 
     except Exception as e:
         logger.error(f"Erro ao salvar resultados: {e}")
         return {"status": "error", "message": str(e)}
 
+# --- Jobs em segundo plano ---
+
+def _job_or_404(job):
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@app.post("/api/v1/jobs/analyze", status_code=202)
+async def submit_analysis_job(
+    territory_id: str = "5300108",
+    since: str = "2024-01-01",
+    until: str = "2024-01-05",
+    keywords: str = Query(None, description="Palavra-chave para filtro")
+):
+    """Enfileira a mesma análise de /analyze; o resultado sai em /api/v1/jobs/{job_id}/result."""
+    return await job_queue.submit("analysis", {
+        "territory_id": territory_id,
+        "since": since,
+        "until": until,
+        "keywords": keywords if keywords else None,
+    })
+
+
+@app.post("/api/v1/jobs/save_search", status_code=202)
+async def submit_save_search_job(request: Dict[str, Any]):
+    """Enfileira o mesmo processamento de /api/v1/save_search."""
+    return await job_queue.submit("save_search", {
+        "gazettes": request.get("gazettes", []),
+        "filters": request.get("filters", {}),
+    })
+
+
+@app.get("/api/v1/jobs")
+async def list_jobs():
+    jobs = job_queue.list_jobs()
+    return {"jobs": jobs, "total": len(jobs)}
+
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    return _job_or_404(await job_queue.get(job_id)).to_dict()
+
+
+@app.get("/api/v1/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Resultado de um job concluído (202 enquanto ainda está na fila ou rodando)."""
+    job = _job_or_404(await job_queue.get(job_id))
+    if job.status == "done":
+        return job.result
+    if job.status in ("queued", "running"):
+        return JSONResponse(status_code=202, content=job.to_dict())
+    raise HTTPException(status_code=409, detail=f"Job {job.status}: {job.error or 'sem resultado'}")
+
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    return _job_or_404(await job_queue.cancel(job_id)).to_dict()
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -1,79 +1,127 @@
 # backend/scripts/run_pipeline_automation.py
+"""
+Radar agendado: sincroniza em lote territórios x palavras-chave.
+
+Uso:
+    python scripts/run_pipeline_automation.py
+    python scripts/run_pipeline_automation.py --territories exports/goias_municipalities.json
+    python scripts/run_pipeline_automation.py --territories 5300108,5208707 --keywords "robótica,tablet"
+
+`--territories` aceita ids separados por vírgula ou um JSON no formato gerado
+por `fetch_goias_municipalities.py` (`[{"id": ..., "name": ...}]`, ou uma
+lista de ids). Todas as combinações rodam em um único plano (`sync_batch`):
+cada diário é baixado e analisado uma vez por execução.
+
+Antes do lote, cada território recebe a carga sem palavra-chave do corpus
+local (`--corpus-days`, padrão SYNC_CORPUS_DAYS): com ela, buscas com
+qualquer palavra-chave nesse período são respondidas offline.
+"""
+import argparse
 import asyncio
+import json
 import sys
 import os
 
 # Adiciona o diretório pai (backend) ao path para conseguir importar os services
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from services.integration.piter_api_orchestrator import run_analysis_pipeline
-from datetime import datetime, timedelta
+from services.api.clients.gazette_corpus import normalize_query
+from services.integration import result_store
+from services.integration.incremental_sync import (
+    get_sync_store,
+    load_territory_corpus,
+    restore_state,
+    sync_batch,
+    sync_filename,
+)
+from services.integration.piter_api_orchestrator import save_json_file
 
-async def main():
-    print("🤖 Iniciando automação do P.I.T.E.R...")
-    
-    # Configuração da Busca (Você pode mudar isso ou ler de variáveis de ambiente)
-    territory_id = "5300108" # Brasília (Exemplo)
-    
-    # Define o período: Últimos 30 dias
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    # Keywords para o Radar (Pode ser uma lista que você itera)
-    keywords_list = ["tecnologia educação", "robótica", "computador", "tablet"]
-    
-    for keyword in keywords_list:
-        print(f"\n--- Processando keyword: {keyword} ---")
-        result = await run_analysis_pipeline(
-            territory_id=territory_id,
-            since=str(start_date),
-            until=str(end_date),
-            keywords=keyword
-        )
-        
-        if "error" in result:
-            print(f"⚠️ Aviso: {result['error']}")
-        else:
-            print(f"✅ Sucesso! Investimento encontrado: R$ {result['data'].get('total_invested', 0)}")
+DEFAULT_TERRITORIES = "5300108"  # Brasília (Exemplo)
+DEFAULT_KEYWORDS = "tecnologia educação,robótica,computador,tablet"
 
-if __name__ == "__main__":
-    asyncio.run(main())# backend/scripts/run_pipeline_automation.py
-import asyncio
-import sys
-import os
 
-# Adiciona o diretório pai (backend) ao path para conseguir importar os services
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+def load_territories(value: str) -> dict:
+    """Mapa `id -> nome` a partir de ids separados por vírgula ou de um arquivo JSON."""
+    if os.path.isfile(value):
+        with open(value, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        territories = {}
+        for item in items:
+            if isinstance(item, dict):
+                territories[str(item["id"])] = item.get("name") or str(item["id"])
+            else:
+                territories[str(item)] = str(item)
+        return territories
+    return {tid.strip(): tid.strip() for tid in value.split(",") if tid.strip()}
+
+
+def ensure_states(territories, keywords_list) -> set:
+    """
+    Garante o estado de cada busca antes do lote. Sem o SQLite (ex.: cache do
+    CI expirado), o estado é recriado a partir do arquivo acumulado já salvo.
+    Retorna as buscas que NÃO podem rodar: há um arquivo acumulado, mas sem
+    estado recuperável, e uma sincronização do zero o sobrescreveria.
+    """
+    store = get_sync_store()
+    results = result_store.get_result_store(os.path.join(os.getcwd(), "data_output"))
+    blocked = set()
+    for territory_id in territories:
+        for keyword in keywords_list:
+            if store.get(territory_id, normalize_query(keyword)) is not None:
+                continue
+            try:
+                saved = results.load(sync_filename(territory_id, keyword))
+            except FileNotFoundError:
+                continue
+            if restore_state(territory_id, keyword, saved, store=store):
+                print(f"♻️ Estado de {territory_id} / {keyword} recuperado do arquivo acumulado")
+            else:
+                blocked.add((territory_id, normalize_query(keyword)))
+    return blocked
 
-from services.integration.piter_api_orchestrator import run_analysis_pipeline
-from datetime import datetime, timedelta
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Radar P.I.T.E.R: sincronização incremental em lote")
+    parser.add_argument("--territories", default=DEFAULT_TERRITORIES,
+                        help="ids IBGE separados por vírgula ou arquivo JSON de municípios")
+    parser.add_argument("--keywords", default=DEFAULT_KEYWORDS, help="palavras-chave separadas por vírgula")
+    parser.add_argument("--concurrency", type=int, default=None, help="buscas ao mesmo tempo (SYNC_BATCH_CONCURRENCY)")
+    parser.add_argument("--corpus-days", type=int, default=None,
+                        help="dias da carga sem palavra-chave do corpus local (SYNC_CORPUS_DAYS; 0 desativa)")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
     print("🤖 Iniciando automação do P.I.T.E.R...")
-    
-    # Configuração da Busca (Você pode mudar isso ou ler de variáveis de ambiente)
-    territory_id = "5300108" # Brasília (Exemplo)
-    
-    # Define o período: Últimos 30 dias
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    # Keywords para o Radar (Pode ser uma lista que você itera)
-    keywords_list = ["tecnologia educação", "robótica", "computador", "tablet"]
-    
-    for keyword in keywords_list:
-        print(f"\n--- Processando keyword: {keyword} ---")
-        result = await run_analysis_pipeline(
-            territory_id=territory_id,
-            since=str(start_date),
-            until=str(end_date),
-            keywords=keyword
-        )
-        
+    territories = load_territories(args.territories)
+    keywords_list = [k.strip() for k in args.keywords.split(",") if k.strip()]
+    print(f"📋 Plano: {len(territories)} território(s) x {len(keywords_list)} palavra(s)-chave")
+
+    # Corpus local: todos os diários recentes de cada território (busca offline por qualquer palavra-chave)
+    for territory_id in territories:
+        loaded = await load_territory_corpus(territory_id, days=args.corpus_days)
+        if loaded is not None:
+            print(f"📚 Corpus {territory_id}: {loaded['gazettes']} diários de {loaded['since']} a {loaded['until']}")
+
+    # Sincronização incremental: só o que foi publicado desde a última execução
+    # (a primeira execução busca os últimos SYNC_INITIAL_DAYS dias)
+    blocked = ensure_states(list(territories), keywords_list)
+    for territory_id, query in sorted(blocked):
+        print(f"⛔ {territory_id} / {query}: estado ausente e arquivo acumulado sem estado; arquivo preservado")
+    results = await sync_batch(list(territories), keywords_list, concurrency=args.concurrency, exclude=blocked)
+
+    for result in results:
+        label = f"{territories.get(result['territory_id'], result['territory_id'])} / {result['keywords']}"
         if "error" in result:
-            print(f"⚠️ Aviso: {result['error']}")
-        else:
-            print(f"✅ Sucesso! Investimento encontrado: R$ {result['data'].get('total_invested', 0)}")
+            print(f"⚠️ Aviso ({label}): {result['error']}")
+            continue
+
+        save_json_file(result["document"], sync_filename(result["territory_id"], result["keywords"]))
+        print(
+            f"✅ {label}: {result['new_gazettes']} diários novos ({result['since']} a {result['until']}). "
+            f"Investimento acumulado: R$ {result['document']['data'].get('total_invested', 0)}"
+        )
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,438 @@
+# backend/services/api/clients/gazette_corpus.py
+"""
+Corpus local dos diários já baixados, com índice invertido (SQLite FTS5).
+
+Toda busca por palavra-chave ia ao Querido Diário, que ordena por relevância
+e obriga a filtrar as datas à mão. Aqui cada diário recebido (metadados +
+texto completo, ou os excerpts quando o texto não foi baixado) é guardado
+por território e data, e o texto vai para um índice FTS5. Uma consulta é
+respondida localmente, com filtro exato de datas e sem rede, quando o
+corpus sabe que está completo para ela:
+
+  * cobertura da própria busca: uma busca (território + palavras-chave)
+    que já foi feita por inteiro no upstream registra o período coberto;
+    repetir a busca, ou buscar qualquer sub-período dela, devolve os mesmos
+    diários (com os excerpts originais) direto do corpus;
+  * cobertura total do território (consulta "*", gravada pela carga sem
+    palavra-chave do radar, `incremental_sync.load_territory_corpus`):
+    qualquer palavra-chave é resolvida pelo FTS5, com os excerpts gerados
+    por `snippet()`. Só vale para períodos em que todos os diários têm o
+    texto completo guardado.
+
+Dias muito recentes (GAZETTE_CORPUS_SETTLE_DAYS) nunca contam como
+cobertos: o Querido Diário ainda pode publicar diários para eles. Períodos
+antigos também não são confiáveis para sempre (o Querido Diário recarrega
+datas antigas quando inclui ou reprocessa um município): cada cobertura
+guarda quando foi verificada (`checked_at`) e, passado
+GAZETTE_CORPUS_COVERAGE_TTL, a busca volta ao upstream e a cobertura é
+renovada pela nova carga.
+
+Os textos completos ocupam no máximo GAZETTE_CORPUS_MAX_TEXT_MB: acima
+disso, os mais antigos voltam a ser indexados só pelos excerpts (e a
+cobertura total "*" dos territórios afetados é descartada, já que o FTS
+deixa de ter o texto inteiro deles).
+
+Variáveis de ambiente (opcionais):
+    GAZETTE_CORPUS_DB           - arquivo SQLite (padrão backend/cache/gazette_corpus.sqlite3)
+    GAZETTE_CORPUS_ENABLED      - "0" desativa o corpus
+    GAZETTE_CORPUS_SETTLE_DAYS  - dias recentes fora da cobertura (padrão 2)
+    GAZETTE_CORPUS_COVERAGE_TTL - segundos até revalidar um período coberto (padrão 7 dias; 0 = nunca)
+    GAZETTE_CORPUS_MAX_TEXT_MB  - teto dos textos completos guardados (padrão 1024; 0 = sem teto)
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.api.clients import querido_diario_client
+from services.api.clients.querido_diario_client import DEFAULT_QUERYSTRING
+from services.api.clients.query_planner import gazette_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_DB = Path(__file__).resolve().parents[3] / "cache" / "gazette_corpus.sqlite3"
+SETTLE_DAYS = int(os.getenv("GAZETTE_CORPUS_SETTLE_DAYS", 2))
+COVERAGE_TTL = float(os.getenv("GAZETTE_CORPUS_COVERAGE_TTL", 7 * 24 * 3600))
+MAX_TEXT_BYTES = int(float(os.getenv("GAZETTE_CORPUS_MAX_TEXT_MB", 1024)) * 1024 * 1024)
+# Consulta que representa "todos os diários do território"
+ALL_GAZETTES = "*"
+# Tamanho (em tokens) dos excerpts gerados pelo FTS5
+SNIPPET_TOKENS = 48
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gazettes (
+    id            INTEGER PRIMARY KEY,
+    key           TEXT UNIQUE NOT NULL,
+    territory_id  TEXT NOT NULL,
+    date          TEXT NOT NULL,
+    meta          TEXT NOT NULL,
+    has_full_text INTEGER NOT NULL DEFAULT 0,
+    text_bytes    INTEGER NOT NULL DEFAULT 0,
+    stored_at     REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS gazettes_territory_date ON gazettes (territory_id, date);
+CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+CREATE TABLE IF NOT EXISTS hits (
+    territory_id TEXT NOT NULL,
+    query        TEXT NOT NULL,
+    gazette_id   INTEGER NOT NULL,
+    excerpts     TEXT,
+    PRIMARY KEY (territory_id, query, gazette_id)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    territory_id TEXT NOT NULL,
+    query        TEXT NOT NULL,
+    since        TEXT NOT NULL,
+    until        TEXT NOT NULL,
+    checked_at   REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS coverage_lookup ON coverage (territory_id, query);
+"""
+
+# Colunas incluídas depois da primeira versão do schema (bancos já existentes)
+_MIGRATIONS = (
+    ("gazettes", "text_bytes", "INTEGER NOT NULL DEFAULT 0"),
+    ("gazettes", "stored_at", "REAL NOT NULL DEFAULT 0"),
+    ("coverage", "checked_at", "REAL NOT NULL DEFAULT 0"),
+)
+
+
+def _to_date(value: Any) -> date:
+    return date.fromisoformat(str(value)[:10])
+
+
+def is_complete(total_gazettes: int) -> bool:
+    """
+    Uma busca upstream só é completa se não parou no teto global de itens
+    (QD_MAX_GAZETTES); as fatias do planejador que batem no teto delas já
+    são subdivididas.
+    """
+    cap = querido_diario_client.QD_MAX_GAZETTES
+    return not cap or total_gazettes < cap
+
+
+def normalize_query(keywords: Optional[str]) -> str:
+    """Chave de uma busca: palavras-chave em minúsculas, espaços normalizados."""
+    return " ".join((keywords or DEFAULT_QUERYSTRING).lower().split())
+
+
+def fts_query(keywords: Optional[str]) -> Optional[str]:
+    """
+    Converte a sintaxe de busca do Querido Diário (termos com E implícito,
+    `|` para OU, `-termo` para negação, "frases" e prefixo com `*`) para uma
+    expressão FTS5. None se a busca não tiver nenhum termo positivo.
+    """
+    positive: List[str] = []
+    negative: List[str] = []
+    operator = "AND"
+    for token in re.findall(r'"[^"]*"|\||[^\s|]+', keywords or DEFAULT_QUERYSTRING):
+        if token == "|":
+            operator = "OR"
+            continue
+        negated = token.startswith("-")
+        token = token.lstrip("+-")
+        prefix = token.endswith("*")
+        term = token.strip('"').rstrip("*").replace('"', '""').strip()
+        if not term:
+            continue
+        phrase = f'"{term}"' + (" *" if prefix else "")
+        if negated:
+            negative.append(phrase)
+        else:
+            if positive:
+                positive.append(operator)
+            positive.append(phrase)
+        operator = "AND"
+    if not positive:
+        return None
+    expression = f"({' '.join(positive)})"
+    return expression + "".join(f" NOT {phrase}" for phrase in negative)
+
+
+def storage_key(gazette: Dict[str, Any]) -> Optional[str]:
+    """Identidade de um diário como texto (ver `query_planner.gazette_key`)."""
+    key = gazette_key(gazette)
+    return json.dumps(key, ensure_ascii=False, default=str) if key is not None else None
+
+
+def _excerpt_text(gazette: Dict[str, Any]) -> str:
+    excerpts = gazette.get("excerpts") or []
+    if not isinstance(excerpts, list):
+        excerpts = [excerpts]
+    return "\n".join(str(e) for e in excerpts if e)
+
+
+def _first_gap(intervals: List[Tuple[str, str]], since: date) -> date:
+    """Primeiro dia a partir de `since` fora da união dos intervalos (inclusivos)."""
+    cursor = since
+    for start, end in sorted((_to_date(s), _to_date(e)) for s, e in intervals):
+        if start > cursor:
+            break
+        if end >= cursor:
+            cursor = end + timedelta(days=1)
+    return cursor
+
+
+def _covers(intervals: List[Tuple[str, str]], since: date, until: date) -> bool:
+    """True se a união dos intervalos (inclusivos) contém [since, until]."""
+    return _first_gap(intervals, since) > until
+
+
+class GazetteCorpus:
+    """Diários por território/data + índice FTS5 do texto (acesso serializado por lock)."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv("GAZETTE_CORPUS_DB") or DEFAULT_CORPUS_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Inclui colunas novas; coberturas antigas ficam com `checked_at` 0 (revalidadas no próximo uso)."""
+        for table, column, definition in _MIGRATIONS:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column in columns:
+                continue
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if column == "text_bytes":
+                self._conn.execute(
+                    "UPDATE gazettes SET text_bytes = (SELECT length(text) FROM texts WHERE rowid = gazettes.id)"
+                    " WHERE has_full_text = 1"
+                )
+
+    # --- escrita ---
+    def ingest(
+        self,
+        territory_id: str,
+        gazettes: Iterable[Dict[str, Any]],
+        full_texts: Optional[Dict[str, str]] = None,
+        keywords: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        all_gazettes: bool = False,
+    ) -> int:
+        """
+        Guarda os diários de uma busca (texto completo quando disponível em
+        `full_texts`, senão os excerpts) e os associa à busca. Com
+        `since`/`until`, o período passa a contar como coberto para a busca
+        (ou para qualquer busca, com `all_gazettes`): só informe o período
+        quando a busca upstream foi completa (sem teto nem erro). Diários
+        que não puderam ser gravados (sem identidade ou data) ou, na carga
+        total, sem texto completo deixam o período sem cobertura: uma
+        resposta local não os incluiria.
+        Retorna quantos diários foram gravados.
+        """
+        full_texts = full_texts or {}
+        query = ALL_GAZETTES if all_gazettes else normalize_query(keywords)
+        stored = 0
+        complete = True
+        added_text = False
+        now = time.time()
+        with self._lock, self._conn:
+            for gazette in gazettes:
+                key = storage_key(gazette)
+                gazette_date = str(gazette.get("date") or "")[:10]
+                if key is None or len(gazette_date) != 10:
+                    complete = False
+                    continue
+                meta = {k: v for k, v in gazette.items() if k != "excerpts"}
+                text = full_texts.get(gazette.get("txt_url") or "")
+                row = self._conn.execute("SELECT id, has_full_text FROM gazettes WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    gazette_id = self._conn.execute(
+                        "INSERT INTO gazettes (key, territory_id, date, meta, has_full_text, text_bytes, stored_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, str(gazette.get("territory_id") or territory_id), gazette_date,
+                         json.dumps(meta, ensure_ascii=False, default=str), int(bool(text)),
+                         len(text) if text else 0, now),
+                    ).lastrowid
+                    added_text = added_text or bool(text)
+                    self._conn.execute(
+                        "INSERT INTO texts (rowid, text) VALUES (?, ?)", (gazette_id, text or _excerpt_text(gazette))
+                    )
+                    has_full_text = bool(text)
+                else:
+                    gazette_id, has_full_text = row
+                    if text and not has_full_text:
+                        # Texto completo substitui os excerpts indexados antes
+                        self._conn.execute("DELETE FROM texts WHERE rowid = ?", (gazette_id,))
+                        self._conn.execute("INSERT INTO texts (rowid, text) VALUES (?, ?)", (gazette_id, text))
+                        self._conn.execute(
+                            "UPDATE gazettes SET has_full_text = 1, text_bytes = ?, stored_at = ? WHERE id = ?",
+                            (len(text), now, gazette_id),
+                        )
+                        added_text = has_full_text = True
+                if all_gazettes and not has_full_text:
+                    # Só o texto completo responde qualquer palavra-chave pelo FTS
+                    complete = False
+                if not all_gazettes:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO hits (territory_id, query, gazette_id, excerpts) VALUES (?, ?, ?, ?)",
+                        (territory_id, query, gazette_id, json.dumps(gazette.get("excerpts") or [], ensure_ascii=False)),
+                    )
+                stored += 1
+
+            settled = date.today() - timedelta(days=SETTLE_DAYS)
+            if complete and since and until and _to_date(since) <= min(_to_date(until), settled):
+                # Coberturas vencidas da busca são substituídas pela nova carga
+                if COVERAGE_TTL > 0:
+                    self._conn.execute(
+                        "DELETE FROM coverage WHERE territory_id = ? AND query = ? AND checked_at < ?",
+                        (territory_id, query, now - COVERAGE_TTL),
+                    )
+                self._conn.execute(
+                    "INSERT INTO coverage (territory_id, query, since, until, checked_at) VALUES (?, ?, ?, ?, ?)",
+                    (territory_id, query, _to_date(since).isoformat(), min(_to_date(until), settled).isoformat(), now),
+                )
+            if added_text:
+                self._prune_texts()
+        return stored
+
+    def _prune_texts(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Mantém os textos completos abaixo do teto: os guardados há mais tempo
+        voltam a ser indexados pelos excerpts. Chamado com o lock e dentro da
+        transação. Retorna quantos textos foram descartados.
+        """
+        max_bytes = MAX_TEXT_BYTES if max_bytes is None else max_bytes
+        if max_bytes <= 0:
+            return 0
+        total = self._conn.execute("SELECT COALESCE(SUM(text_bytes), 0) FROM gazettes WHERE has_full_text = 1").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        pruned = 0
+        territories = set()
+        rows = self._conn.execute(
+            "SELECT id, territory_id, text_bytes FROM gazettes WHERE has_full_text = 1 ORDER BY stored_at, id"
+        ).fetchall()
+        for gazette_id, territory_id, text_bytes in rows:
+            if total <= max_bytes:
+                break
+            excerpts = []
+            for (hit_excerpts,) in self._conn.execute("SELECT excerpts FROM hits WHERE gazette_id = ?", (gazette_id,)):
+                excerpts.extend(json.loads(hit_excerpts or "[]"))
+            self._conn.execute("DELETE FROM texts WHERE rowid = ?", (gazette_id,))
+            self._conn.execute(
+                "INSERT INTO texts (rowid, text) VALUES (?, ?)", (gazette_id, _excerpt_text({"excerpts": excerpts}))
+            )
+            self._conn.execute("UPDATE gazettes SET has_full_text = 0, text_bytes = 0 WHERE id = ?", (gazette_id,))
+            total -= text_bytes
+            territories.add(territory_id)
+            pruned += 1
+        # Sem o texto inteiro, o FTS não responde mais qualquer palavra-chave nesses territórios
+        for territory_id in territories:
+            self._conn.execute(
+                "DELETE FROM coverage WHERE territory_id = ? AND query = ?", (territory_id, ALL_GAZETTES)
+            )
+        logger.info(f"🧹 Corpus local: {pruned} textos completos descartados (teto de {max_bytes} bytes)")
+        return pruned
+
+    # --- leitura ---
+    def _fresh_intervals(self, territory_id: str, query: str) -> List[Tuple[str, str]]:
+        # Só coberturas verificadas dentro do TTL (depois dele, a busca é revalidada no upstream)
+        fresh_after = time.time() - COVERAGE_TTL if COVERAGE_TTL > 0 else float("-inf")
+        return self._conn.execute(
+            "SELECT since, until FROM coverage WHERE territory_id = ? AND query = ? AND checked_at >= ?",
+            (territory_id, query, fresh_after),
+        ).fetchall()
+
+    def _covered(self, territory_id: str, query: str, since: date, until: date) -> bool:
+        intervals = self._fresh_intervals(territory_id, query)
+        return bool(intervals) and _covers(intervals, since, until)
+
+    def uncovered_since(self, territory_id: str, since: str, keywords: Optional[str] = None, all_gazettes: bool = False) -> date:
+        """Primeiro dia a partir de `since` que a busca (ou a carga total) ainda não cobre."""
+        query = ALL_GAZETTES if all_gazettes else normalize_query(keywords)
+        with self._lock:
+            return _first_gap(self._fresh_intervals(territory_id, query), _to_date(since))
+
+    def search(self, territory_id: str, since: str, until: str, keywords: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Resposta local (`{"total_gazettes", "gazettes", "source": "local"}`,
+        ordenada por data) ou None se o corpus não cobre a busca.
+        """
+        if not territory_id or "," in str(territory_id):
+            return None
+        try:
+            start, end = _to_date(since), _to_date(until)
+        except (TypeError, ValueError):
+            return None
+        query = normalize_query(keywords)
+
+        with self._lock:
+            if self._covered(territory_id, query, start, end):
+                rows = self._conn.execute(
+                    "SELECT g.meta, h.excerpts FROM hits h JOIN gazettes g ON g.id = h.gazette_id"
+                    " WHERE h.territory_id = ? AND h.query = ? AND g.date BETWEEN ? AND ?"
+                    " ORDER BY g.date, g.id",
+                    (territory_id, query, start.isoformat(), end.isoformat()),
+                ).fetchall()
+            elif self._covered(territory_id, ALL_GAZETTES, start, end):
+                expression = fts_query(keywords)
+                if expression is None:
+                    return None
+                rows = self._conn.execute(
+                    "SELECT g.meta, json_array(snippet(texts, 0, '', '', ' … ', ?)) FROM texts"
+                    " JOIN gazettes g ON g.id = texts.rowid"
+                    " WHERE texts MATCH ? AND g.territory_id = ? AND g.date BETWEEN ? AND ?"
+                    " ORDER BY g.date, g.id",
+                    (SNIPPET_TOKENS, expression, territory_id, start.isoformat(), end.isoformat()),
+                ).fetchall()
+            else:
+                return None
+
+        gazettes = [{**json.loads(meta), "excerpts": json.loads(excerpts or "[]")} for meta, excerpts in rows]
+        return {"total_gazettes": len(gazettes), "gazettes": gazettes, "source": "local"}
+
+    def full_texts(self, gazettes: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Textos completos guardados (`txt_url -> texto`) dos diários informados."""
+        by_key = {}
+        for gazette in gazettes:
+            key = storage_key(gazette)
+            if key is not None and gazette.get("txt_url"):
+                by_key[key] = gazette["txt_url"]
+        texts = {}
+        with self._lock:
+            keys = list(by_key)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                for key, text in self._conn.execute(
+                    "SELECT g.key, t.text FROM gazettes g JOIN texts t ON t.rowid = g.id"
+                    f" WHERE g.has_full_text = 1 AND g.key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    texts[by_key[key]] = text
+        return texts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_corpus: Optional[GazetteCorpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> Optional[GazetteCorpus]:
+    """Instância única por processo (None se o corpus estiver desativado ou indisponível)."""
+    global _corpus
+    if os.getenv("GAZETTE_CORPUS_ENABLED", "1") == "0":
+        return None
+    with _corpus_lock:
+        if _corpus is None:
+            try:
+                _corpus = GazetteCorpus()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"⚠️ Corpus local indisponível: {e}")
+                return None
+        return _corpus
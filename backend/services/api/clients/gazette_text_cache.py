@@ -0,0 +1,209 @@
+# backend/services/api/clients/gazette_text_cache.py
+"""
+Cache persistente em disco para os textos completos (`txt_url`) dos diários.
+
+Diários publicados são imutáveis, então um texto baixado uma vez pode ser
+reaproveitado por qualquer requisição e por qualquer worker (o cache vive no
+sistema de arquivos, não na instância do StatisticsGenerator).
+
+Estrutura em disco:
+    <cache_dir>/index.sqlite3            - índice url -> ETag/Last-Modified/digest
+    <cache_dir>/blobs/ab/abcdef....gz    - conteúdo comprimido, endereçado pelo sha256
+
+Variáveis de ambiente (opcionais):
+    GAZETTE_TEXT_CACHE_DIR        - diretório do cache (padrão backend/cache/gazette_texts)
+    GAZETTE_TEXT_CACHE_MAX_BYTES  - orçamento em bytes comprimidos (padrão 2 GB)
+    GAZETTE_TEXT_CACHE_ENABLED    - "0" desativa o cache
+"""
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[3] / "cache" / "gazette_texts"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Evita uma escrita no índice a cada leitura: o "último acesso" só é
+# atualizado se estiver mais velho que isso.
+TOUCH_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url_key       TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    digest        TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    stored_at     REAL NOT NULL,
+    last_access   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries (digest);
+"""
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class GazetteTextCache:
+    """Cache LRU, comprimido e limitado por bytes, compartilhado via disco."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("GAZETTE_TEXT_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.max_bytes = int(max_bytes or os.getenv("GAZETTE_TEXT_CACHE_MAX_BYTES") or DEFAULT_MAX_BYTES)
+        self.blobs_dir = self.cache_dir / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.sqlite3"
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Uma conexão por operação: seguro entre threads (asyncio.to_thread)
+        # e entre processos (WAL + timeout de lock).
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / f"{digest}.gz"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna `{"text", "etag", "last_modified", "stored_at"}` ou None.
+        Entradas cujo blob sumiu do disco são descartadas.
+        """
+        key = _url_key(url)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, digest, stored_at, last_access FROM entries WHERE url_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            etag, last_modified, digest, stored_at, last_access = row
+            try:
+                with gzip.open(self._blob_path(digest), "rt", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, EOFError):
+                conn.execute("DELETE FROM entries WHERE url_key = ?", (key,))
+                return None
+
+            now = time.time()
+            if now - last_access > TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET last_access = ? WHERE url_key = ?", (now, key))
+
+        return {"text": text, "etag": etag, "last_modified": last_modified, "stored_at": stored_at}
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Grava (ou substitui) o texto de uma URL e aplica o orçamento de bytes."""
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        blob = self._blob_path(digest)
+
+        # Conteúdo idêntico (mesmo digest) é gravado uma única vez
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_suffix(f".{os.getpid()}.tmp")
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(raw)
+            os.replace(tmp, blob)
+        size = blob.stat().st_size
+
+        now = time.time()
+        with self._connect() as conn:
+            previous = conn.execute(
+                "SELECT digest FROM entries WHERE url_key = ?", (_url_key(url),)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(url_key, url, etag, last_modified, digest, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_url_key(url), url, etag, last_modified, digest, size, now, now),
+            )
+            if previous and previous[0] != digest:
+                self._drop_blob_if_unused(conn, previous[0])
+
+        self.evict()
+
+    def touch(self, url: str) -> None:
+        """Marca a entrada como revalidada (ex.: resposta 304 do servidor)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE entries SET stored_at = ?, last_access = ? WHERE url_key = ?",
+                (now, now, _url_key(url)),
+            )
+
+    def total_bytes(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest)"
+            ).fetchone()
+        return int(row[0])
+
+    def evict(self) -> int:
+        """Remove as entradas menos usadas até caber no orçamento. Retorna quantas saíram."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT url_key, digest FROM entries ORDER BY last_access ASC"
+            ).fetchall()
+            for url_key, digest in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE url_key = ?", (url_key,))
+                total -= self._drop_blob_if_unused(conn, digest)
+                removed += 1
+
+        if removed:
+            logger.info(f"🧹 Cache de textos: {removed} entradas removidas (LRU)")
+        return removed
+
+    def _drop_blob_if_unused(self, conn: sqlite3.Connection, digest: str) -> int:
+        """Apaga o blob se nenhuma entrada o referencia mais. Retorna os bytes liberados."""
+        in_use = conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if in_use:
+            return 0
+        blob = self._blob_path(digest)
+        try:
+            size = blob.stat().st_size
+            blob.unlink()
+            return size
+        except OSError:
+            return 0
+
+
+_cache: Optional[GazetteTextCache] = None
+
+
+def get_text_cache() -> Optional[GazetteTextCache]:
+    """Instância única por processo (None se o cache estiver desativado ou indisponível)."""
+    global _cache
+    if os.getenv("GAZETTE_TEXT_CACHE_ENABLED", "1") == "0":
+        return None
+    if _cache is None:
+        try:
+            _cache = GazetteTextCache()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️ Cache de textos indisponível: {e}")
+            return None
+    return _cache
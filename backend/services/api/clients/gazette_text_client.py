@@ -0,0 +1,152 @@
+# backend/services/api/clients/gazette_text_client.py
+"""
+Download assíncrono e concorrente dos textos completos (`txt_url`) dos diários.
+
+Substitui o antigo `requests.get` síncrono do StatisticsGenerator: todos os
+textos de um lote são baixados em paralelo (limitados por semáforo), com
+retentativas e decodificação em streaming, ANTES do cálculo das estatísticas.
+Textos já baixados são lidos do cache persistente em disco
+(`gazette_text_cache`) sem tocar a rede.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from services.api.clients import http_pool
+from services.api.clients.gazette_text_cache import get_text_cache
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CONCURRENCY = int(os.getenv("TXT_DOWNLOAD_CONCURRENCY", 8))
+DOWNLOAD_RETRIES = int(os.getenv("TXT_DOWNLOAD_RETRIES", 3))
+DOWNLOAD_TIMEOUT = float(os.getenv("TXT_DOWNLOAD_TIMEOUT", 30))
+RETRY_BACKOFF = 0.5  # segundos (dobra a cada tentativa)
+# Diários publicados não mudam: por padrão o cache nunca é revalidado.
+# Com um valor > 0, entradas mais velhas são revalidadas via ETag/Last-Modified.
+REVALIDATE_AFTER = float(os.getenv("GAZETTE_TEXT_CACHE_REVALIDATE_AFTER", 0))
+
+# Status que valem nova tentativa (instabilidade do servidor / rate limit)
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def collect_txt_urls(gazettes: Iterable[Dict[str, Any]]) -> List[str]:
+    """Extrai as `txt_url` únicas de uma lista de diários, preservando a ordem."""
+    seen = set()
+    urls = []
+    for gazette in gazettes:
+        url = gazette.get("txt_url") if isinstance(gazette, dict) else None
+        if url and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+async def _stream_text(url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], httpx.Headers]:
+    """
+    Baixa um documento em streaming, decodificando os pedaços conforme chegam.
+    Retorna `(None, headers)` quando o servidor responde 304 (não modificado).
+    """
+    client = http_pool.get_http_client()
+    async with http_pool.host_slot(url):
+        async with client.stream("GET", url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                return None, response.headers
+            response.raise_for_status()
+            if not response.encoding:
+                response.encoding = "utf-8"
+            parts = []
+            async for chunk in response.aiter_text():
+                parts.append(chunk)
+            return "".join(parts), response.headers
+
+
+def _conditional_headers(cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    if not cached:
+        return None
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return headers or None
+
+
+async def _safe_cache_call(func, *args) -> None:
+    """Escritas no cache nunca derrubam o download (ex.: disco cheio)."""
+    try:
+        await asyncio.to_thread(func, *args)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao gravar cache de textos: {e}")
+
+
+async def download_text(url: str) -> str:
+    """
+    Retorna o texto completo de um diário: primeiro o cache em disco, depois a
+    rede (com retentativas). Retorna "" em caso de falha definitiva (o chamador
+    usa os excerpts).
+    """
+    if not url:
+        return ""
+
+    cache = get_text_cache()
+    cached = None
+    if cache:
+        try:
+            cached = await asyncio.to_thread(cache.get, url)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao ler cache de textos: {e}")
+    if cached:
+        is_stale = REVALIDATE_AFTER > 0 and time.time() - cached["stored_at"] > REVALIDATE_AFTER
+        if not is_stale:
+            return cached["text"]
+
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        try:
+            text, headers = await _stream_text(url, _conditional_headers(cached))
+            if text is None:
+                # 304: o texto em cache continua válido
+                await _safe_cache_call(cache.touch, url)
+                return cached["text"]
+            logger.info(f"📥 Texto completo baixado: {len(text)} chars")
+            if cache and text:
+                await _safe_cache_call(cache.put, url, text, headers.get("etag"), headers.get("last-modified"))
+            return text
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status not in _RETRY_STATUS or attempt == DOWNLOAD_RETRIES:
+                logger.warning(f"⚠️ Erro HTTP {status} ao baixar texto: {url}")
+                return cached["text"] if cached else ""
+        except (httpx.TransportError, httpx.StreamError) as e:
+            if attempt == DOWNLOAD_RETRIES:
+                logger.warning(f"⚠️ Erro ao baixar texto: {e}")
+                return cached["text"] if cached else ""
+        await asyncio.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+
+    return ""
+
+
+async def fetch_full_texts(gazettes: Iterable[Dict[str, Any]], concurrency: Optional[int] = None) -> Dict[str, str]:
+    """
+    Baixa concorrentemente todas as `txt_url` de um lote de diários.
+
+    Returns:
+        Dict[str, str]: mapa `txt_url -> texto` (somente downloads bem-sucedidos)
+    """
+    urls = collect_txt_urls(gazettes)
+    if not urls:
+        return {}
+
+    semaphore = asyncio.Semaphore(concurrency or DOWNLOAD_CONCURRENCY)
+
+    async def _bounded(url: str) -> str:
+        async with semaphore:
+            return await download_text(url)
+
+    results = await asyncio.gather(*(_bounded(url) for url in urls))
+    texts = {url: text for url, text in zip(urls, results) if text}
+    logger.info(f"📥 Textos completos: {len(texts)}/{len(urls)} baixados")
+    return texts
@@ -1,106 +1,509 @@
 # backend/services/api/clients/gemini_client.py
+"""
+Cliente do Gemini (análise qualitativa).
+
+O SDK `google.generativeai` é pesado para importar e o `.env` só precisa ser
+lido quando o LLM é usado: ambos ficam para o primeiro uso (ou para o warm-up
+do startup), de modo que importar o app não paga esse custo.
+"""
+import asyncio
+import copy
+import hashlib
+import json
 import os
-import google.generativeai as genai
-from typing import Dict, Any
-from dotenv import load_dotenv
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 import re
 
-# Carrega as variáveis do arquivo .env
-load_dotenv()
+# Cache da escolha de modelo (evita um `list_models` a cada análise)
+MODEL_CACHE_TTL = float(os.getenv("GEMINI_MODEL_CACHE_TTL", 24 * 3600))
+MODEL_CACHE_PATH = Path(
+    os.getenv("GEMINI_MODEL_CACHE_PATH")
+    or Path(__file__).resolve().parents[3] / "cache" / "gemini_model.json"
+)
+# Modelo fixo usado quando a listagem falha
+FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.5-flash")
+# Um fallback é guardado por pouco tempo: a listagem é tentada de novo logo
+FALLBACK_CACHE_TTL = 300.0
 
-api_key = os.getenv("GEMINI_API_KEY")
+# Limites das chamadas de geração (todas as requisições do processo)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+# Cache de respostas: o mesmo texto com o mesmo prompt/modelo não é gerado de novo
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
 
-if api_key:
-    genai.configure(api_key=api_key)
-else:
-    print("⚠️ AVISO: GEMINI_API_KEY não encontrada no .env")
+# Mude a versão ao alterar o prompt: invalida as respostas em cache
+PROMPT_VERSION = "investment-context-v1"
+MAX_PROMPT_TEXT = 30000
+PROMPT_TEMPLATE = """
+    Você é um especialista em análise de licitações públicas e tecnologia educacional.
+    Analise o seguinte trecho de um Diário Oficial e extraia informações sobre investimentos.
+    
+    TEXTO:
+    "{text}"
+    
+    TAREFA:
+    Responda estritamente no formato JSON com os seguintes campos:
+    - "resumo_objeto": O que está sendo comprado? (Máx 1 frase)
+    - "justificativa": Qual o motivo ou destino da compra? (Ex: "Para escolas rurais", "Modernização de laboratórios")
+    - "fornecedor": Nome da empresa vencedora (se houver).
+    - "marca_modelo": Há menção de marca/modelo específico? (Sim/Não e qual).
+    
+    Se não encontrar alguma informação, preencha com "Não identificado".
+    Não use markdown (sem ```json), retorne apenas o JSON puro.
+    """
 
-def get_best_gemini_model():
+# Lote: vários trechos (um por diário) em um único prompt estruturado
+BATCH_PROMPT_VERSION = "investment-context-batch-v1"
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", 8000))
+LLM_SNIPPET_MAX_CHARS = int(os.getenv("LLM_SNIPPET_MAX_CHARS", 6000))
+# Estimativa grosseira de caracteres por token (texto em português)
+CHARS_PER_TOKEN = 4
+BATCH_PROMPT_TEMPLATE = """
+    Você é um especialista em análise de licitações públicas e tecnologia educacional.
+    Abaixo estão {count} trechos de Diários Oficiais, cada um identificado por "TRECHO <id>".
+    Analise CADA trecho separadamente e extraia informações sobre investimentos.
+    
+    {snippets}
+    
+    TAREFA:
+    Responda estritamente com um objeto JSON cujas chaves são os ids dos trechos
+    (ex.: {{"1": {{...}}, "2": {{...}}}}) e cujos valores têm os campos:
+    - "resumo_objeto": O que está sendo comprado? (Máx 1 frase)
+    - "justificativa": Qual o motivo ou destino da compra? (Ex: "Para escolas rurais", "Modernização de laboratórios")
+    - "fornecedor": Nome da empresa vencedora (se houver).
+    - "marca_modelo": Há menção de marca/modelo específico? (Sim/Não e qual).
+    
+    Se não encontrar alguma informação, preencha com "Não identificado".
+    Não use markdown (sem ```json), retorne apenas o JSON puro.
+    """
+
+_genai = None
+# "not_loaded" | "loaded" | "missing_key" | "unavailable"
+_client_state = "not_loaded"
+_client_lock = threading.Lock()
+
+# {"model", "source": "list_models" | "fallback", "resolved_at"}
+_model_entry: Optional[Dict[str, Any]] = None
+_model_instances: Dict[str, Any] = {}
+_model_lock = threading.Lock()
+_refreshing = False
+
+
+def get_api_key() -> Optional[str]:
+    """Lê a GEMINI_API_KEY (carregando o .env na primeira chamada)."""
+    from dotenv import load_dotenv
+
+    # Carrega as variáveis do arquivo .env (não sobrescreve as já definidas)
+    load_dotenv()
+    return os.getenv("GEMINI_API_KEY")
+
+
+def get_genai():
+    """Importa e configura o SDK no primeiro uso. None sem API key."""
+    global _genai, _client_state
+    if _genai is not None or _client_state in ("missing_key", "unavailable"):
+        return _genai
+    with _client_lock:
+        if _genai is None and _client_state == "not_loaded":
+            api_key = get_api_key()
+            if not api_key:
+                print("⚠️ AVISO: GEMINI_API_KEY não encontrada no .env")
+                _client_state = "missing_key"
+                return None
+            try:
+                import google.generativeai as genai
+            except ImportError as e:
+                print(f"⚠️ SDK do Gemini indisponível: {e}")
+                _client_state = "unavailable"
+                return None
+            genai.configure(api_key=api_key)
+            _genai = genai
+            _client_state = "loaded"
+    return _genai
+
+
+async def warm_up() -> bool:
     """
-    Busca dinamicamente o melhor/mais recente modelo 'Flash' disponível na conta.
-    Se falhar, retorna um fallback seguro.
+    Importa/configura o SDK e resolve o modelo fora do event loop (tarefa de
+    fundo no startup), para que a primeira análise não pague a listagem.
     """
+    if await asyncio.to_thread(get_genai) is None:
+        return False
+    await asyncio.to_thread(resolve_model_name)
+    return True
+
+
+def model_status() -> str:
+    """Estado do cliente: not_loaded | loaded | missing_key | unavailable."""
+    return _client_state
+
+
+def list_available_models() -> List[str]:
+    """Modelos Gemini da conta que suportam `generateContent` (chamada remota)."""
+    genai = get_genai()
+    if genai is None:
+        return []
+    available_models = []
+    for m in genai.list_models():
+        if 'generateContent' in m.supported_generation_methods:
+            # Filtra apenas modelos da família Gemini
+            if 'gemini' in m.name.lower():
+                available_models.append(m.name)
+    return available_models
+
+
+def select_best_model(available_models: List[str]) -> Optional[str]:
+    """Escolhe o melhor modelo da lista (None se nenhum servir)."""
+    # 1. Preferência: Versões Flash mais novas (2.5, 2.0, 1.5...)
+    # A lógica aqui procura strings como 'gemini-2.5-flash', 'gemini-1.5-flash'
+    # e tenta ordenar para pegar a maior versão.
+    flash_models = [m for m in available_models if 'flash' in m.lower() and 'legacy' not in m.lower()]
+
+    if flash_models:
+        # Ordena reverso para tentar pegar 2.5 antes de 1.5, etc.
+        # (Uma ordenação alfabética simples geralmente funciona bem para versões: 2.5 > 1.5)
+        flash_models.sort(reverse=True)
+
+        # Tenta pegar o primeiro que não seja 'experimental' ou 'preview' se possível,
+        # mas se só tiver preview (comum em lançamentos novos), pega ele mesmo.
+        return flash_models[0]
+
+    # 2. Fallback: Se não achar Flash, pega qualquer Gemini Pro
+    pro_models = [m for m in available_models if 'pro' in m.lower()]
+    if pro_models:
+        pro_models.sort(reverse=True)
+        print(f"⚠️ Flash não encontrado. Usando Pro: {pro_models[0]}")
+        return pro_models[0]
+
+    return None
+
+
+def _read_model_cache() -> Optional[Dict[str, Any]]:
+    try:
+        with open(MODEL_CACHE_PATH, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry.get("model") and entry.get("resolved_at"):
+            return entry
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_model_cache(entry: Dict[str, Any]) -> None:
     try:
-        # Lista todos os modelos disponíveis
-        available_models = []
-        for m in genai.list_models():
-            if 'generateContent' in m.supported_generation_methods:
-                # Filtra apenas modelos da família Gemini
-                if 'gemini' in m.name.lower():
-                    available_models.append(m.name)
-        
-        # 1. Preferência: Versões Flash mais novas (2.5, 2.0, 1.5...)
-        # A lógica aqui procura strings como 'gemini-2.5-flash', 'gemini-1.5-flash'
-        # e tenta ordenar para pegar a maior versão.
-        flash_models = [m for m in available_models if 'flash' in m.lower() and 'legacy' not in m.lower()]
-        
-        if flash_models:
-            # Ordena reverso para tentar pegar 2.5 antes de 1.5, etc.
-            # (Uma ordenação alfabética simples geralmente funciona bem para versões: 2.5 > 1.5)
-            flash_models.sort(reverse=True)
-            
-            # Tenta pegar o primeiro que não seja 'experimental' ou 'preview' se possível,
-            # mas se só tiver preview (comum em lançamentos novos), pega ele mesmo.
-            chosen_model = flash_models[0]
-            print(f"🤖 Modelo de IA selecionado automaticamente: {chosen_model}")
-            return genai.GenerativeModel(chosen_model)
-
-        # 2. Fallback: Se não achar Flash, pega qualquer Gemini Pro
-        pro_models = [m for m in available_models if 'pro' in m.lower()]
-        if pro_models:
-            pro_models.sort(reverse=True)
-            print(f"⚠️ Flash não encontrado. Usando Pro: {pro_models[0]}")
-            return genai.GenerativeModel(pro_models[0])
+        MODEL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = MODEL_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, MODEL_CACHE_PATH)
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o cache de modelo: {e}")
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    ttl = MODEL_CACHE_TTL if entry.get("source") == "list_models" else FALLBACK_CACHE_TTL
+    return time.time() - entry["resolved_at"] < ttl
+
 
+def refresh_model_name() -> str:
+    """Lista os modelos (chamada remota), escolhe o melhor e atualiza o cache."""
+    global _model_entry
+    try:
+        chosen = select_best_model(list_available_models())
+        entry = {"model": chosen, "source": "list_models"} if chosen else None
     except Exception as e:
         print(f"⚠️ Erro ao listar modelos ({e}). Usando fallback fixo.")
+        entry = None
+
+    if entry is None:
+        # 3. Último recurso: um modelo fixo (GEMINI_FALLBACK_MODEL), guardado
+        # por pouco tempo para tentar a listagem de novo em breve.
+        entry = {"model": FALLBACK_MODEL, "source": "fallback"}
+    else:
+        print(f"🤖 Modelo de IA selecionado automaticamente: {entry['model']}")
+
+    entry["resolved_at"] = time.time()
+    with _model_lock:
+        _model_entry = entry
+    _write_model_cache(entry)
+    return entry["model"]
+
+
+def _refresh_in_background() -> None:
+    global _refreshing
+    with _model_lock:
+        if _refreshing:
+            return
+        _refreshing = True
+
+    def _run():
+        global _refreshing
+        try:
+            refresh_model_name()
+        finally:
+            _refreshing = False
+
+    threading.Thread(target=_run, name="gemini-model-refresh", daemon=True).start()
+
+
+def resolve_model_name(force_refresh: bool = False) -> str:
+    """
+    Nome do modelo a usar, sem chamada remota no caminho quente:
+    memória -> arquivo em disco (sobrevive a restarts) -> `list_models`.
+    Uma entrada vencida continua sendo usada enquanto a nova é resolvida em
+    segundo plano.
+    """
+    global _model_entry
+    if force_refresh:
+        return refresh_model_name()
 
-    # 3. Último recurso: Se a listagem falhar (erro de rede, etc), usa um fixo que sabemos que existe hoje.
-    return genai.GenerativeModel('gemini-2.5-flash')
+    entry = _model_entry
+    if entry is None:
+        entry = _read_model_cache()
+        if entry is None:
+            return refresh_model_name()
+        with _model_lock:
+            _model_entry = entry
+
+    if not _is_fresh(entry):
+        _refresh_in_background()
+    return entry["model"]
+
+
+def get_best_gemini_model():
+    """
+    Retorna o melhor/mais recente modelo 'Flash' disponível na conta, resolvido
+    pelo cache de modelos (ver `resolve_model_name`).
+    """
+    genai = get_genai()
+    if genai is None:
+        return None
+    name = resolve_model_name()
+    model = _model_instances.get(name)
+    if model is None:
+        model = _model_instances[name] = genai.GenerativeModel(name)
+    return model
+
+
+class _RateLimiter:
+    """Espaçamento mínimo entre chamadas ao LLM (requisições por minuto)."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        # Sem await entre ler e reservar o horário: seguro dentro do event loop
+        now = time.monotonic()
+        delay = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _ResultCache:
+    """LRU em memória com TTL para as respostas do LLM."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.time(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_rate_limiter = _RateLimiter(LLM_REQUESTS_PER_MINUTE)
+_result_cache = _ResultCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL)
+# Semáforos de concorrência, um por event loop (TestClient / asyncio.run)
+_llm_semaphores: Dict[int, asyncio.Semaphore] = {}
+
+
+@asynccontextmanager
+async def llm_slot():
+    """Limite global de chamadas simultâneas + taxa máxima por minuto."""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(id(loop))
+    if semaphore is None:
+        semaphore = _llm_semaphores[id(loop)] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    async with semaphore:
+        await _rate_limiter.wait()
+        yield
+
+
+async def _generate(model, prompt: str) -> str:
+    """Geração assíncrona (sem bloquear o event loop), respeitando os limites."""
+    async with llm_slot():
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(model.generate_content, prompt)
+    return response.text
+
+
+def _parse_response(result_text: str) -> Dict[str, Any]:
+    result_text = result_text.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(result_text)
+    except json.JSONDecodeError:
+        return {"raw_analysis": result_text}
+
+
+def _cache_key(model_name: str, text: str, prompt_version: str = PROMPT_VERSION) -> str:
+    text_digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{prompt_version}\0{model_name}\0{text_digest}".encode("utf-8")).hexdigest()
 
 
 async def analyze_investment_context(text: str) -> Dict[str, Any]:
     """
     Usa o Gemini para fazer uma análise qualitativa do texto do diário.
+    Respostas ficam em cache por (versão do prompt, modelo, hash do texto).
     """
-    if not api_key:
+    # Primeiro uso importa o SDK: fora do event loop
+    if await asyncio.to_thread(get_genai) is None:
         return {"error": "API Key não configurada"}
-    
+
     if not text or len(text) < 50:
         return {"analysis": "Texto insuficiente para análise."}
 
-    # --- MUDANÇA AQUI: Usa a função dinâmica em vez de nome fixo ---
-    model = get_best_gemini_model()
-    # --------------------------------------------------------------
+    # Modelo vem do cache de resolução; só a primeira vez (sem cache em disco)
+    # faz a listagem remota, e ela roda fora do event loop.
+    model = await asyncio.to_thread(get_best_gemini_model)
 
-    prompt = f"""
-    Você é um especialista em análise de licitações públicas e tecnologia educacional.
-    Analise o seguinte trecho de um Diário Oficial e extraia informações sobre investimentos.
-    
-    TEXTO:
-    "{text[:30000]}"
-    
-    TAREFA:
-    Responda estritamente no formato JSON com os seguintes campos:
-    - "resumo_objeto": O que está sendo comprado? (Máx 1 frase)
-    - "justificativa": Qual o motivo ou destino da compra? (Ex: "Para escolas rurais", "Modernização de laboratórios")
-    - "fornecedor": Nome da empresa vencedora (se houver).
-    - "marca_modelo": Há menção de marca/modelo específico? (Sim/Não e qual).
-    
-    Se não encontrar alguma informação, preencha com "Não identificado".
-    Não use markdown (sem ```json), retorne apenas o JSON puro.
-    """
+    text = text[:MAX_PROMPT_TEXT]
+    key = _cache_key(getattr(model, "model_name", ""), text)
+    cached = _result_cache.get(key)
+    if cached is not None:
+        return cached
 
-    try:
-        response = model.generate_content(prompt)
-        result_text = response.text.replace("```json", "").replace("```", "").strip()
-        
-        import json
-        try:
-            return json.loads(result_text)
-        except json.JSONDecodeError:
-            return {"raw_analysis": result_text}
+    prompt = PROMPT_TEMPLATE.format(text=text)
 
+    try:
+        result = _parse_response(await _generate(model, prompt))
     except Exception as e:
         print(f"Erro ao chamar Gemini: {e}")
-        return {"error": f"Falha na análise qualitativa: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Falha na análise qualitativa: {str(e)}"}
+
+    _result_cache.put(key, result)
+    return result
+
+
+def pack_snippets(snippets: Dict[str, str], char_budget: Optional[int] = None) -> List[List[Tuple[str, str]]]:
+    """
+    Agrupa `chave -> texto` em lotes cujo tamanho somado cabe no orçamento
+    (LLM_BATCH_TOKEN_BUDGET tokens), preservando a ordem.
+    """
+    budget = char_budget or LLM_BATCH_TOKEN_BUDGET * CHARS_PER_TOKEN
+    batches: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    used = 0
+    for key, text in snippets.items():
+        if current and used + len(text) > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append((key, text))
+        used += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _analyze_batch(model, batch: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """Uma chamada ao LLM para o lote; devolve `chave -> resultado`."""
+    snippets = "\n\n".join(f'TRECHO {i}:\n"{text}"' for i, (_, text) in enumerate(batch, start=1))
+    prompt = BATCH_PROMPT_TEMPLATE.format(count=len(batch), snippets=snippets)
+    try:
+        parsed = _parse_response(await _generate(model, prompt))
+    except Exception as e:
+        print(f"Erro ao chamar Gemini (lote de {len(batch)}): {e}")
+        return {key: {"error": f"Falha na análise qualitativa: {str(e)}"} for key, _ in batch}
+
+    # Aceita {"1": {...}} ou uma lista na mesma ordem dos trechos
+    if isinstance(parsed, list):
+        parsed = {str(i): item for i, item in enumerate(parsed, start=1)}
+    if not isinstance(parsed, dict) or "raw_analysis" in parsed:
+        return {key: {"error": "Resposta do lote fora do formato JSON"} for key, _ in batch}
+
+    results = {}
+    for i, (key, _) in enumerate(batch, start=1):
+        item = parsed.get(str(i))
+        if isinstance(item, dict):
+            results[key] = item
+        else:
+            results[key] = {"error": "Trecho sem resposta no lote"}
+    return results
+
+
+async def analyze_snippets(snippets: Dict[Any, str]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Análise qualitativa de vários trechos (ex.: um por diário) com o mínimo
+    de chamadas: trechos idênticos são analisados uma vez, respostas já em
+    cache (inclusive de outras palavras-chave) não voltam ao LLM e o restante
+    é empacotado em prompts até o orçamento de tokens.
+
+    Returns:
+        Dict: `id do trecho -> resultado` (mesmos campos de
+        `analyze_investment_context`)
+    """
+    if await asyncio.to_thread(get_genai) is None:
+        return {sid: {"error": "API Key não configurada"} for sid in snippets}
+
+    model = await asyncio.to_thread(get_best_gemini_model)
+    model_name = getattr(model, "model_name", "")
+
+    results: Dict[Any, Dict[str, Any]] = {}
+    keys: Dict[Any, str] = {}
+    pending: Dict[str, str] = {}
+    for sid, text in snippets.items():
+        text = (text or "").strip()[:LLM_SNIPPET_MAX_CHARS]
+        if len(text) < 50:
+            results[sid] = {"analysis": "Texto insuficiente para análise."}
+            continue
+        key = keys[sid] = _cache_key(model_name, text, BATCH_PROMPT_VERSION)
+        cached = _result_cache.get(key)
+        if cached is not None:
+            results[sid] = cached
+        else:
+            pending.setdefault(key, text)
+
+    batches = pack_snippets(pending)
+    if batches:
+        print(f"🧠 LLM: {len(pending)} trechos novos em {len(batches)} chamadas ({len(snippets) - len(pending)} reaproveitados)")
+    analyzed: Dict[str, Dict[str, Any]] = {}
+    for batch_result in await asyncio.gather(*(_analyze_batch(model, batch) for batch in batches)):
+        for key, result in batch_result.items():
+            if "error" not in result:
+                _result_cache.put(key, result)
+            analyzed[key] = result
+
+    for sid, key in keys.items():
+        if sid not in results:
+            results[sid] = copy.deepcopy(analyzed[key])
+    return {sid: results[sid] for sid in snippets}
@@ -0,0 +1,154 @@
+# backend/services/api/clients/http_pool.py
+"""
+Pool HTTP assíncrono compartilhado por todo o processo.
+
+Um único `httpx.AsyncClient` (HTTP/2 + keep-alive) é criado no startup do
+FastAPI e reaproveitado por todas as chamadas ao Querido Diário, evitando um
+handshake TCP/TLS novo a cada requisição.
+
+Variáveis de ambiente (todas opcionais):
+    HTTP_MAX_CONNECTIONS      - total de conexões abertas no pool (padrão 100)
+    HTTP_MAX_KEEPALIVE        - conexões ociosas mantidas vivas (padrão 20)
+    HTTP_KEEPALIVE_EXPIRY     - segundos até fechar conexão ociosa (padrão 30)
+    HTTP_PER_HOST_LIMIT       - requisições simultâneas por host (padrão 10)
+    HTTP_TIMEOUT              - timeout total em segundos (padrão 60)
+    HTTP2_ENABLED             - "0" desativa HTTP/2 (padrão ativo se `h2` instalado)
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (necessário para http2=True no httpx)
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 100)
+MAX_KEEPALIVE = _env_int("HTTP_MAX_KEEPALIVE", 20)
+KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+PER_HOST_LIMIT = _env_int("HTTP_PER_HOST_LIMIT", 10)
+TIMEOUT = _env_float("HTTP_TIMEOUT", 60.0)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") != "0" and _H2_AVAILABLE
+
+# Estado do processo. O cliente fica associado ao event loop em que foi
+# criado: scripts (asyncio.run) e o TestClient podem usar loops diferentes,
+# e conexões de um loop não podem ser reaproveitadas em outro.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+# Fechamentos de clientes descartados ainda em andamento (referência forte às tasks)
+_closing: Set[Any] = set()
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=limits,
+        timeout=TIMEOUT,
+        follow_redirects=True,
+    )
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as e:
+        # Loop dono já encerrado: os sockets não podem mais ser fechados por ele
+        logger.debug(f"Pool HTTP anterior fechado com erro: {e}")
+
+
+def _discard_client(client: Optional[httpx.AsyncClient], loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Fecha o cliente de outro loop sem bloquear o loop atual."""
+    if client is None or client.is_closed:
+        return
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        # Loop dono ainda ativo (ex.: thread do TestClient): fecha lá
+        future = asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+    else:
+        future = asyncio.ensure_future(_aclose_quietly(client))
+    _closing.add(future)
+    future.add_done_callback(_closing.discard)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente compartilhado do loop atual.
+    Se o lifespan do app não o criou (scripts, testes), cria sob demanda.
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # Um cliente de outro loop não pode ser reaproveitado: é fechado e substituído
+        _discard_client(_client, _client_loop)
+        _client = _build_client()
+        _client_loop = loop
+        _host_semaphores.clear()
+        logger.info(
+            f"Pool HTTP criado (http2={HTTP2_ENABLED}, max_conn={MAX_CONNECTIONS}, "
+            f"keepalive={MAX_KEEPALIVE}, por_host={PER_HOST_LIMIT})"
+        )
+    return _client
+
+
+async def startup_http_client() -> httpx.AsyncClient:
+    """Cria o pool no startup do FastAPI."""
+    return get_http_client()
+
+
+async def shutdown_http_client() -> None:
+    """Fecha o pool no shutdown do FastAPI."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Pool HTTP encerrado")
+    _client = None
+    _client_loop = None
+    _host_semaphores.clear()
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """Limita a quantidade de requisições simultâneas para o mesmo host."""
+    loop = asyncio.get_running_loop()
+    key = (id(loop), urlsplit(url).netloc)
+    semaphore = _host_semaphores.get(key)
+    if semaphore is None:
+        semaphore = _host_semaphores[key] = asyncio.Semaphore(PER_HOST_LIMIT)
+    async with semaphore:
+        yield
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    """GET pelo pool compartilhado respeitando o limite por host."""
+    client = get_http_client()
+    async with host_slot(url):
+        return await client.get(url, **kwargs)
@@ -1,43 +1,106 @@
 # backend/services/api/clients/querido_diario_client.py
 
+import asyncio
+import os
 import httpx
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List
 from datetime import date
 
+from services.api.clients import http_pool
+
 QUERIDO_DIARIO_API_URL = "https://api.queridodiario.ok.org.br/api" # <-- Corrigido
 
-async def fetch_gazettes(territory_id: str, since: str, until: str, keywords: str = None) -> Optional[Dict[Any, Any]]:
+# Diários por página (a API aceita `size` + `offset`)
+QD_PAGE_SIZE = int(os.getenv("QD_PAGE_SIZE", 50))
+# Teto de diários por busca (0 = sem teto)
+QD_MAX_GAZETTES = int(os.getenv("QD_MAX_GAZETTES", 0))
+# Busca usada quando nenhuma palavra-chave é informada (focada em gastos)
+DEFAULT_QUERYSTRING = "educação tecnologia informática"
+
+
+async def _fetch_page(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    # Pool compartilhado (HTTP/2 + keep-alive, segue redirecionamentos)
+    response = await http_pool.get(url, params=params)
+    # Se der erro 404 ou 500, vai cair aqui
+    response.raise_for_status()
+    return response.json()
+
+
+async def paginate_gazettes(
+    url: str,
+    params: Dict[str, Any],
+    page_size: Optional[int] = None,
+    max_items: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Percorre todas as páginas de uma busca (`offset` crescente) e produz a
+    resposta de cada página assim que ela chega. A página seguinte já é
+    pedida enquanto o chamador processa a atual (prefetch).
+
+    Erros HTTP/conexão são propagados (httpx.HTTPStatusError / RequestError).
+    """
+    page_size = page_size or QD_PAGE_SIZE
+    max_items = QD_MAX_GAZETTES if max_items is None else max_items
+
+    def _request(offset: int) -> "asyncio.Task":
+        size = page_size if not max_items else min(page_size, max_items - offset)
+        return asyncio.create_task(_fetch_page(url, {**params, "size": size, "offset": offset}))
+
+    emitted = 0
+    next_page = _request(0)
+    try:
+        while next_page is not None:
+            data = await next_page
+            next_page = None
+            gazettes = data.get("gazettes") or []
+            total = data.get("total_gazettes")
+            emitted += len(gazettes)
+
+            has_more = bool(gazettes) and (total is None or emitted < total)
+            if has_more and max_items and emitted >= max_items:
+                print(f"⚠️ Querido Diário: limite de {max_items} diários atingido (total {total})")
+                has_more = False
+            if has_more:
+                next_page = _request(emitted)
+
+            yield data
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+async def iter_gazette_pages(territory_id: str, since: str, until: str, keywords: str = None, max_items: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
     """
-    Busca diários oficiais com palavras-chave específicas.
+    Busca diários oficiais com palavras-chave específicas, página a página:
+    produz a lista de diários de cada página conforme ela chega.
     """
     url = f"{QUERIDO_DIARIO_API_URL}/gazettes"
-    
+
     # Se não passar keyword, usa uma padrão focada em gastos para garantir resultados
-    query_term = keywords if keywords else "educação tecnologia informática"
-    
+    query_term = keywords if keywords else DEFAULT_QUERYSTRING
+
     # CORRIGIDO: A API espera 'published_since' e 'published_until', não 'since' e 'until'
     params = {
         "territory_ids": territory_id,
         "published_since": since,
         "published_until": until,
-        "size": 50,
         "querystring": query_term
     }
-    
+
+    print(f"Buscando em: {url} (paginado, {QD_PAGE_SIZE} por página)")
+    async for data in paginate_gazettes(url, params, max_items=max_items):
+        yield data.get("gazettes") or []
+
+
+async def fetch_gazettes(territory_id: str, since: str, until: str, keywords: str = None) -> Optional[Dict[Any, Any]]:
+    """
+    Busca diários oficiais com palavras-chave específicas (todas as páginas).
+    """
+    gazettes = []
     try:
-        # --- CORREÇÃO: follow_redirects=True segue o link novo automaticamente ---
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-            print(f"Buscando em: {url} (com redirecionamento automático)")
-            response = await client.get(url, params=params)
-            
-            # Se der erro 404 ou 500, vai cair aqui
-            response.raise_for_status() 
-            
-            data = response.json()
-            print(f"Querido Diário: Encontrados {data.get('total_gazettes', 0)} diários.")
-            return data
-    
+        async for page in iter_gazette_pages(territory_id, since, until, keywords):
+            gazettes.extend(page)
     except httpx.HTTPStatusError as e:
         print(f"Erro HTTP ao buscar dados do Querido Diário: Status {e.response.status_code}")
         print(f"Detalhes: {e.response.text[:200]}...") # Mostra o início do erro para ajudar no debug
@@ -49,6 +112,9 @@ async def fetch_gazettes(territory_id: str, since: str, until: str, keywords: st
         print(f"Erro inesperado no cliente do Querido Diário: {e}")
         return None
 
+    print(f"Querido Diário: Encontrados {len(gazettes)} diários.")
+    return {"total_gazettes": len(gazettes), "gazettes": gazettes}
+
 class FilterParams(BaseModel):
     """Modelo para os parâmetros de filtro da API do Querido Diário."""
     territory_ids: Optional[str] = None
@@ -62,26 +128,42 @@ class QueridoDiarioClient:
 
     async def fetch_gazettes(self, filters: FilterParams) -> Dict[str, Any]:
         params = filters.dict(exclude_none=True)
-        # Adiciona follow_redirects aqui também
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-            response = await client.get(self.BASE_URL, params=params)
-            response.raise_for_status()
-
-            # Garantir codificação UTF-8 correta
-            response.encoding = 'utf-8'
-            data = response.json()
-
-            # Corrigir problemas de codificação nos excerpts
-            if 'gazettes' in data:
-                for gazette in data['gazettes']:
-                    if 'excerpts' in gazette and gazette['excerpts']:
-                        gazette['excerpts'] = [
-                            self._fix_encoding(excerpt) if isinstance(excerpt, str) else excerpt
-                            for excerpt in gazette['excerpts']
-                        ]
-
-            print("Resposta do Querido Diário:", data) # Ótimo para depuração
-            return data
+        # Usa o pool compartilhado do processo (segue redirecionamentos)
+        response = await http_pool.get(self.BASE_URL, params=params)
+        response.raise_for_status()
+
+        # Garantir codificação UTF-8 correta
+        response.encoding = 'utf-8'
+        data = response.json()
+
+        # Corrigir problemas de codificação nos excerpts
+        if 'gazettes' in data:
+            for gazette in data['gazettes']:
+                if 'excerpts' in gazette and gazette['excerpts']:
+                    gazette['excerpts'] = [
+                        self._fix_encoding(excerpt) if isinstance(excerpt, str) else excerpt
+                        for excerpt in gazette['excerpts']
+                    ]
+
+        print("Resposta do Querido Diário:", data) # Ótimo para depuração
+        return data
+
+    async def iter_gazette_pages(self, filters: FilterParams, max_items: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Todas as páginas da busca, uma lista de diários por vez (com prefetch
+        da próxima página). `filters.size` é o tamanho de cada página.
+        """
+        params = filters.dict(exclude_none=True)
+        page_size = params.pop("size", None)
+        async for data in paginate_gazettes(self.BASE_URL, params, page_size=page_size, max_items=max_items):
+            gazettes = data.get("gazettes") or []
+            for gazette in gazettes:
+                if gazette.get("excerpts"):
+                    gazette["excerpts"] = [
+                        self._fix_encoding(excerpt) if isinstance(excerpt, str) else excerpt
+                        for excerpt in gazette["excerpts"]
+                    ]
+            yield gazettes
 
     def _fix_encoding(self, text: str) -> str:
         """Corrige problemas comuns de codificação de caracteres."""
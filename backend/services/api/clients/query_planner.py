@@ -0,0 +1,194 @@
+# backend/services/api/clients/query_planner.py
+"""
+Planejador de consultas ao Querido Diário por fatias de datas.
+
+Uma busca de vários anos vira uma única consulta ordenada por relevância,
+lenta e sujeita ao teto de itens. Aqui o período é dividido em fatias
+(meses ou semanas), buscadas em paralelo; uma fatia que bate no teto de
+itens é subdividida (mês -> semanas -> dias) e buscada de novo. O resultado
+é mesclado e deduplicado por diário.
+
+Variáveis de ambiente (opcionais):
+    QD_SHARD_CONCURRENCY   - fatias buscadas ao mesmo tempo (padrão 4)
+    QD_SHARD_MAX_GAZETTES  - teto de diários por fatia antes de subdividir (padrão 500)
+"""
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple, Union
+
+import httpx
+
+from services.api.clients import querido_diario_client
+
+QD_SHARD_CONCURRENCY = int(os.getenv("QD_SHARD_CONCURRENCY", 4))
+QD_SHARD_MAX_GAZETTES = int(os.getenv("QD_SHARD_MAX_GAZETTES", 500))
+# Períodos maiores que isso são fatiados por mês; acima de WEEK_SHARD_DAYS, por semana
+MONTH_SHARD_DAYS = 92
+WEEK_SHARD_DAYS = 14
+
+Shard = Tuple[date, date]
+
+
+def _to_date(value: Union[str, date]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def split_range(since: date, until: date, unit: str) -> List[Shard]:
+    """Divide [since, until] (inclusivo) em fatias de 'month', 'week' ou 'day'."""
+    shards = []
+    start = since
+    while start <= until:
+        if unit == "month":
+            next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+            end = next_month - timedelta(days=1)
+        elif unit == "week":
+            end = start + timedelta(days=6)
+        else:
+            end = start
+        end = min(end, until)
+        shards.append((start, end))
+        start = end + timedelta(days=1)
+    return shards
+
+
+def plan_shards(since: date, until: date) -> List[Shard]:
+    """Fatias iniciais: meses para períodos longos, semanas para médios."""
+    days = (until - since).days + 1
+    if days > MONTH_SHARD_DAYS:
+        return split_range(since, until, "month")
+    if days > WEEK_SHARD_DAYS:
+        return split_range(since, until, "week")
+    return [(since, until)]
+
+
+def subdivide(shard: Shard) -> List[Shard]:
+    """Fatia menor para uma fatia que bateu no teto (semanas, depois dias)."""
+    since, until = shard
+    if (until - since).days + 1 > 7:
+        return split_range(since, until, "week")
+    return split_range(since, until, "day")
+
+
+def gazette_key(gazette: Dict[str, Any]) -> Optional[Hashable]:
+    """Identidade de um diário (None se não houver como identificá-lo)."""
+    for field in ("id", "txt_url", "url", "file_checksum"):
+        if gazette.get(field):
+            return (field, gazette[field])
+    if gazette.get("date"):
+        return (
+            gazette.get("territory_id"), gazette.get("date"), gazette.get("edition_number"),
+            gazette.get("is_extra_edition"), gazette.get("power"),
+        )
+    return None
+
+
+class _Deduplicator:
+    def __init__(self):
+        self.seen = set()
+
+    def filter(self, gazettes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unique = []
+        for gazette in gazettes:
+            key = gazette_key(gazette)
+            if key is not None:
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+            unique.append(gazette)
+        return unique
+
+
+async def iter_sharded_pages(
+    territory_id: str,
+    since: Union[str, date],
+    until: Union[str, date],
+    keywords: str = None,
+    concurrency: Optional[int] = None,
+    shard_cap: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Busca o período em fatias paralelas e produz os diários (já deduplicados)
+    de cada fatia assim que ela termina.
+    """
+    try:
+        since, until = _to_date(since), _to_date(until)
+    except ValueError:
+        # Datas fora do formato AAAA-MM-DD: a API decide (sem fatiar)
+        async for page in querido_diario_client.iter_gazette_pages(territory_id, str(since), str(until), keywords):
+            yield page
+        return
+    shard_cap = QD_SHARD_MAX_GAZETTES if shard_cap is None else shard_cap
+    semaphore = asyncio.Semaphore(concurrency or QD_SHARD_CONCURRENCY)
+
+    async def _fetch(shard: Shard) -> List[Dict[str, Any]]:
+        start, end = shard
+        single_day = start == end
+        # Um único dia não tem como ser subdividido: busca sem teto
+        cap = 0 if single_day else shard_cap
+        gazettes: List[Dict[str, Any]] = []
+        async with semaphore:
+            async for page in querido_diario_client.iter_gazette_pages(
+                territory_id, start.isoformat(), end.isoformat(), keywords, max_items=cap
+            ):
+                gazettes.extend(page)
+
+        if cap and len(gazettes) >= cap:
+            children = subdivide(shard)
+            print(f"🔀 Fatia {start}..{end} atingiu {cap} diários: dividindo em {len(children)}")
+            parts = await asyncio.gather(*(_fetch(child) for child in children))
+            return [gazette for part in parts for gazette in part]
+        return gazettes
+
+    dedup = _Deduplicator()
+    shards = plan_shards(since, until)
+    if len(shards) == 1:
+        # Período curto: busca paginada direta, página a página
+        async for page in querido_diario_client.iter_gazette_pages(
+            territory_id, since.isoformat(), until.isoformat(), keywords
+        ):
+            unique = dedup.filter(page)
+            if unique:
+                yield unique
+        return
+
+    print(f"🗓️ Busca fatiada: {len(shards)} fatias de {since} a {until}")
+    tasks = [asyncio.create_task(_fetch(shard)) for shard in shards]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            unique = dedup.filter(await finished)
+            if unique:
+                yield unique
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_gazettes_sharded(
+    territory_id: str, since: Union[str, date], until: Union[str, date], keywords: str = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Igual a `querido_diario_client.fetch_gazettes`, mas fatiando o período:
+    todas as fatias mescladas, em ordem cronológica (None em caso de erro).
+    """
+    gazettes: List[Dict[str, Any]] = []
+    try:
+        async for shard_gazettes in iter_sharded_pages(territory_id, since, until, keywords):
+            gazettes.extend(shard_gazettes)
+    except httpx.HTTPStatusError as e:
+        print(f"Erro HTTP ao buscar dados do Querido Diário: Status {e.response.status_code}")
+        return None
+    except httpx.RequestError as e:
+        print(f"Erro de CONEXÃO ao buscar dados do Querido Diário: {e}")
+        return None
+    except Exception as e:
+        print(f"Erro inesperado no planejador de consultas: {e}")
+        return None
+
+    gazettes.sort(key=lambda g: g.get("date") or "")
+    print(f"Querido Diário: Encontrados {len(gazettes)} diários.")
+    return {"total_gazettes": len(gazettes), "gazettes": gazettes}
@@ -1,54 +1,364 @@
 # backend/services/api/clients/spacy_api_client.py
-import spacy
-from typing import List, Dict, Any
-
-# Tenta carregar o modelo
-try:
-    nlp = spacy.load("pt_core_news_sm")
-except IOError:
-    print("="*50)
-    print("AVISO: Modelo 'pt_core_news_sm' não encontrado.")
-    print("Instalando modelo automaticamente...")
-    import os
-    os.system("python -m spacy download pt_core_news_sm")
-    nlp = spacy.load("pt_core_news_sm")
-    print("="*50)
+"""
+Extração de entidades (NER) com spaCy.
+
+`nlp(text)` é CPU-bound e pode levar segundos em textos grandes: rodá-lo
+direto em uma corrotina congelaria o event loop do FastAPI. Por isso a NER
+roda em um pool de processos, com um `pt_core_news_sm` carregado por worker,
+e o número de textos em andamento é limitado (backpressure): quando o pool
+está saturado, novas chamadas esperam em vez de empilhar trabalho.
+
+Para lotes (um documento por excerpt/diário), `extract_entities_batch` passa
+os documentos por `nlp.pipe` em blocos, sem truncar o corpus, e devolve as
+entidades agrupadas pela origem de cada documento. Só os componentes usados
+pela NER são carregados (tagger, parser, lemmatizer etc. ficam de fora do
+modelo em cada worker, e não apenas desligados).
+
+Nem o spaCy nem o modelo são carregados no import: o carregamento acontece
+no primeiro uso ou no warm-up disparado pelo startup do FastAPI (`warm_up`),
+e `model_status` alimenta o `/health`. Com o pool, o modelo só existe nos
+workers: o estado deste processo é atualizado pelo warm-up e pelas chamadas
+ao pool (a primeira bem-sucedida marca "loaded"). Um modelo indisponível é
+tentado de novo depois de NER_RETRY_AFTER segundos.
+
+Variáveis de ambiente (opcionais):
+    NER_WORKERS         - processos do pool (padrão: nº de CPUs; 0 usa uma thread)
+    NER_MAX_PENDING     - tarefas em andamento ao mesmo tempo (padrão 2x workers)
+    NER_BATCH_SIZE      - documentos por lote do `nlp.pipe` (padrão 64)
+    NER_PIPE_PROCESSES  - `n_process` do `nlp.pipe` quando não há pool (padrão 1)
+    SPACY_AUTO_DOWNLOAD - "0" não baixa o modelo automaticamente se faltar
+    NER_RETRY_AFTER     - segundos até tentar de novo um modelo indisponível (padrão 300)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "pt_core_news_sm"
+# Únicos componentes necessários para `doc.ents`
+NER_PIPES = ("tok2vec", "ner")
+# Demais componentes do pt_core_news_sm: excluídos no carregamento (nomes
+# ausentes no modelo são ignorados pelo spaCy)
+NON_NER_PIPES = ("morphologizer", "tagger", "parser", "lemmatizer", "attribute_ruler", "senter")
+# "0" desativa o download automático do modelo quando ele não está instalado
+SPACY_AUTO_DOWNLOAD = os.getenv("SPACY_AUTO_DOWNLOAD", "1") != "0"
+
+NER_WORKERS = int(os.getenv("NER_WORKERS", os.cpu_count() or 1))
+NER_MAX_PENDING = int(os.getenv("NER_MAX_PENDING", max(1, NER_WORKERS) * 2))
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", 64))
+NER_PIPE_PROCESSES = int(os.getenv("NER_PIPE_PROCESSES", 1))
+NER_RETRY_AFTER = float(os.getenv("NER_RETRY_AFTER", 300))
+# Rodadas do warm-up até ver todos os workers do pool
+WARMUP_ROUNDS = 3
+# Lotes do nlp.pipe enviados a cada tarefa do pool
+BATCHES_PER_TASK = 4
+# Limite de segurança (caracteres por texto)
+MAX_TEXT_LENGTH = 1000000
+ENTITY_LABELS = ("ORG", "LOC", "PER", "MISC")
+
+# O modelo é carregado no primeiro uso (ou no warm-up), nunca no import:
+# importar o app não paga o custo do spaCy.
+nlp = None
+# "not_loaded" | "loading" | "loaded" | "unavailable"
+_model_state = "not_loaded"
+_unavailable_at = 0.0
+_model_lock = threading.Lock()
+
+_ner_executor: Optional[Executor] = None
+# Semáforos de backpressure, um por event loop (TestClient / asyncio.run)
+_pending: Dict[int, asyncio.Semaphore] = {}
+
+
+class ModelUnavailableError(RuntimeError):
+    """O modelo de NER não pôde ser carregado no processo que executou a tarefa."""
+
+
+def _set_model_state(state: str) -> None:
+    global _model_state, _unavailable_at
+    _model_state = state
+    if state == "unavailable":
+        _unavailable_at = time.monotonic()
+
+
+def _unavailable() -> bool:
+    """Modelo indisponível e ainda dentro do intervalo até a próxima tentativa."""
+    return _model_state == "unavailable" and time.monotonic() - _unavailable_at < NER_RETRY_AFTER
+
+
+def _load_ner_model():
+    import spacy
+
+    try:
+        model = spacy.load(MODEL_NAME, exclude=NON_NER_PIPES)
+    except IOError:
+        if not SPACY_AUTO_DOWNLOAD:
+            raise
+        print("="*50)
+        print(f"AVISO: Modelo '{MODEL_NAME}' não encontrado.")
+        print("Instalando modelo automaticamente...")
+        os.system(f"python -m spacy download {MODEL_NAME}")
+        model = spacy.load(MODEL_NAME, exclude=NON_NER_PIPES)
+        print("="*50)
+    return model
+
+
+def get_nlp():
+    """Modelo de NER deste processo, carregado na primeira chamada (None se indisponível)."""
+    global nlp
+    if nlp is not None or _unavailable():
+        return nlp
+    with _model_lock:
+        if nlp is None and not _unavailable():
+            _set_model_state("loading")
+            try:
+                nlp = _load_ner_model()
+                _set_model_state("loaded")
+                logger.info(f"🧠 Modelo spaCy '{MODEL_NAME}' carregado")
+            except Exception as e:
+                _set_model_state("unavailable")
+                logger.warning(f"⚠️ Modelo spaCy indisponível: {e}")
+    return nlp
+
+
+def _require_nlp():
+    model = get_nlp()
+    if model is None:
+        raise ModelUnavailableError(f"Modelo spaCy '{MODEL_NAME}' indisponível")
+    return model
+
+
+def _init_worker() -> None:
+    """Inicializador de cada processo do pool: carrega o modelo uma vez por worker."""
+    get_nlp()
+
+
+def _worker_ready() -> Tuple[int, bool]:
+    return os.getpid(), get_nlp() is not None
+
+
+def _doc_entities(doc) -> List[Dict[str, str]]:
+    entities = []
+    for ent in doc.ents:
+        # Filtro de qualidade:
+        # 1. Ignorar entidades muito curtas (ex: "A", "1")
+        # 2. Focar em tipos que nos interessam
+        if len(ent.text) > 2 and ent.label_ in ENTITY_LABELS:
+            entities.append({
+                "text": ent.text.strip(),
+                "label": ent.label_
+            })
+    return entities
+
+
+def _extract_entities_sync(text: str) -> List[Dict[str, str]]:
+    """Executado no worker: precisa ser função de módulo (picklable)."""
+    return _doc_entities(_require_nlp()(text))
+
+
+def pipe_entities(
+    documents: Iterable[Tuple[Hashable, str]],
+    batch_size: int = NER_BATCH_SIZE,
+    n_process: int = 1,
+) -> Iterator[Tuple[Hashable, List[Dict[str, str]]]]:
+    """
+    Passa `(origem, texto)` por `nlp.pipe` em streaming e produz
+    `(origem, entidades)` na mesma ordem, um documento por vez.
+    """
+    model = get_nlp()
+    if not model:
+        return
+    stream = ((text[:MAX_TEXT_LENGTH], source) for source, text in documents if text)
+    for doc, source in model.pipe(stream, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        yield source, _doc_entities(doc)
+
+
+def _pipe_entities_chunk(documents: List[Tuple[Hashable, str]], batch_size: int) -> List[Tuple[Hashable, List[Dict[str, str]]]]:
+    """Executado no worker: um bloco de documentos pelo `nlp.pipe`."""
+    _require_nlp()
+    return list(pipe_entities(documents, batch_size=batch_size))
+
+
+def _get_ner_executor() -> Optional[Executor]:
+    """Pool de processos compartilhado para a NER (None -> usar thread)."""
+    global _ner_executor
+    if _ner_executor is None and NER_WORKERS > 0:
+        try:
+            _ner_executor = ProcessPoolExecutor(max_workers=NER_WORKERS, initializer=_init_worker)
+            logger.info(f"🧠 Pool de NER criado com {NER_WORKERS} processos")
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Pool de processos indisponível para NER ({e}); usando thread")
+            return None
+    return _ner_executor
+
+
+def shutdown_ner_executor() -> None:
+    """Encerra o pool de NER (chamado no shutdown do FastAPI)."""
+    global _ner_executor
+    if _ner_executor is not None:
+        _ner_executor.shutdown(wait=False, cancel_futures=True)
+        _ner_executor = None
+    _pending.clear()
+
+
+def _pending_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _pending.get(id(loop))
+    if semaphore is None:
+        semaphore = _pending[id(loop)] = asyncio.Semaphore(NER_MAX_PENDING)
+    return semaphore
+
 
 async def extract_entities(text: str) -> List[Dict[str, str]]:
     """
     Processa o texto e extrai entidades relevantes (ORG, LOC, PER, MISC).
+    O parsing roda fora do event loop.
     """
-    if not nlp:
+    if not text or _unavailable():
         return []
 
     # Limite de segurança
-    if len(text) > 1000000:
-        text = text[:1000000]
+    if len(text) > MAX_TEXT_LENGTH:
+        text = text[:MAX_TEXT_LENGTH]
 
     try:
-        doc = nlp(text)
-        
-        entities = []
-        for ent in doc.ents:
-            # Filtro de qualidade:
-            # 1. Ignorar entidades muito curtas (ex: "A", "1")
-            # 2. Focar em tipos que nos interessam
-            if len(ent.text) > 2 and ent.label_ in ["ORG", "LOC", "PER", "MISC"]:
-                entities.append({
-                    "text": ent.text.strip(),
-                    "label": ent.label_
-                })
-        
-        return entities
-            
+        async with _pending_slots():
+            executor = _get_ner_executor()
+            if executor is not None:
+                loop = asyncio.get_running_loop()
+                entities = await loop.run_in_executor(executor, _extract_entities_sync, text)
+            else:
+                entities = await asyncio.to_thread(_extract_entities_sync, text)
+
+    except ModelUnavailableError:
+        _set_model_state("unavailable")
+        return []
     except Exception as e:
         print(f"Erro no processamento spaCy: {e}")
         return []
+    # Com o pool, o modelo só existe nos workers: a chamada bem-sucedida confirma o estado
+    _set_model_state("loaded")
+    return entities
+
+
+def _chunks(documents: Iterable[Tuple[Hashable, str]], size: int) -> Iterator[List[Tuple[Hashable, str]]]:
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def extract_entities_batch(
+    documents: Iterable[Tuple[Hashable, str]],
+    batch_size: Optional[int] = None,
+) -> Dict[Hashable, List[Dict[str, str]]]:
+    """
+    NER de um lote de documentos `(origem, texto)` (ex.: um por excerpt, com
+    o índice do diário como origem). Retorna `origem -> entidades`, somando
+    as entidades de documentos com a mesma origem.
+
+    Com o pool de processos, blocos de documentos são distribuídos entre os
+    workers; sem ele, o `nlp.pipe` roda em uma thread com `NER_PIPE_PROCESSES`.
+    """
+    batch_size = batch_size or NER_BATCH_SIZE
+    results: Dict[Hashable, List[Dict[str, str]]] = {}
+    if _unavailable():
+        return results
+
+    try:
+        executor = _get_ner_executor()
+        if executor is None:
+            async with _pending_slots():
+                pairs = await asyncio.to_thread(
+                    lambda: list(pipe_entities(documents, batch_size, NER_PIPE_PROCESSES))
+                )
+        else:
+            loop = asyncio.get_running_loop()
+
+            async def _run_chunk(chunk):
+                async with _pending_slots():
+                    return await loop.run_in_executor(executor, _pipe_entities_chunk, chunk, batch_size)
+
+            chunk_results = await asyncio.gather(
+                *(_run_chunk(chunk) for chunk in _chunks(documents, batch_size * BATCHES_PER_TASK))
+            )
+            pairs = [pair for chunk in chunk_results for pair in chunk]
+
+    except ModelUnavailableError:
+        _set_model_state("unavailable")
+        return results
+    except Exception as e:
+        print(f"Erro no processamento spaCy (lote): {e}")
+        return results
+    _set_model_state("loaded")
+
+    for source, entities in pairs:
+        results.setdefault(source, []).extend(entities)
+    return results
+
+
+async def warm_up() -> bool:
+    """
+    Carrega o modelo antes da primeira requisição (tarefa de fundo no startup):
+    em cada worker do pool ou, sem pool, neste processo.
+
+    Cada worker carrega o modelo no inicializador; as tarefas de warm-up são
+    repetidas (até WARMUP_ROUNDS rodadas) até que todos os workers, pelo pid,
+    tenham respondido.
+    """
+    executor = _get_ner_executor()
+    if executor is None:
+        return await asyncio.to_thread(get_nlp) is not None
+
+    _set_model_state("loading")
+    loop = asyncio.get_running_loop()
+    workers: Dict[int, bool] = {}
+    try:
+        for _ in range(WARMUP_ROUNDS):
+            workers.update(await asyncio.gather(
+                *(loop.run_in_executor(executor, _worker_ready) for _ in range(NER_WORKERS))
+            ))
+            if len(workers) >= NER_WORKERS:
+                break
+    except Exception as e:
+        logger.warning(f"⚠️ Falha no warm-up do pool de NER: {e}")
+        workers[0] = False
+    ready = bool(workers) and all(workers.values())
+    _set_model_state("loaded" if ready else "unavailable")
+    if ready and len(workers) < NER_WORKERS:
+        logger.info(f"🧠 Warm-up respondido por {len(workers)} de {NER_WORKERS} workers")
+    return ready
+
+
+def model_status() -> str:
+    """Estado do modelo de NER: not_loaded | loading | loaded | unavailable."""
+    return "loaded" if nlp is not None else _model_state
+
+
+def gazette_documents(gazettes: Iterable[Dict[str, Any]], cleaner=None, start: int = 0) -> Iterator[Tuple[int, str]]:
+    """Um documento por excerpt: `(índice do diário, texto limpo)`; o índice começa em `start`."""
+    for idx, gazette in enumerate(gazettes, start):
+        for excerpt in gazette.get("excerpts") or []:
+            text = cleaner(excerpt) if cleaner else excerpt
+            if text:
+                yield idx, text
+
 
 # Classe Wrapper (para compatibilidade com código existente)
 class SpacyApiClient:
     def __init__(self, base_url=None):
         pass
-        
+
     async def extract_entities(self, text: str):
-        return await extract_entities(text)
\ No newline at end of file
+        return await extract_entities(text)
+
+    async def extract_entities_batch(self, documents: Iterable[Tuple[Hashable, str]], batch_size: Optional[int] = None):
+        return await extract_entities_batch(documents, batch_size)
@@ -1,48 +1,173 @@
-from typing import Dict, List
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+
 from ..clients.querido_diario_client import QueridoDiarioClient
+from ..clients.gazette_text_client import fetch_full_texts
+from ...processing.investment_facts import InvestmentAggregate, aggregate_gazettes, merge_aggregates
 from ...processing.statistics_generator import StatisticsGenerator
 
+logger = logging.getLogger(__name__)
+
+# Municípios processados simultaneamente (busca + download + estatísticas)
+RANKING_CONCURRENCY = int(os.getenv("RANKING_CONCURRENCY", 8))
+# Tempo máximo por município; quem estourar fica de fora (resultado parcial)
+RANKING_MUNICIPALITY_TIMEOUT = float(os.getenv("RANKING_MUNICIPALITY_TIMEOUT", 120))
+# Processos para o cálculo de estatísticas (CPU); 0 usa threads
+RANKING_STATS_WORKERS = int(os.getenv("RANKING_STATS_WORKERS", os.cpu_count() or 1))
+
+_stats_executor: Optional[Executor] = None
+
+
+def _get_stats_executor() -> Optional[Executor]:
+    """Pool de processos compartilhado para o cálculo (CPU-bound) das estatísticas."""
+    global _stats_executor
+    if _stats_executor is None and RANKING_STATS_WORKERS > 0:
+        try:
+            _stats_executor = ProcessPoolExecutor(max_workers=RANKING_STATS_WORKERS)
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Pool de processos indisponível ({e}); usando threads")
+            return None
+    return _stats_executor
+
+
+def public_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultado de um município sem o agregado interno (centavos mescláveis), para respostas da API."""
+    return {k: v for k, v in data.items() if k != "investment_aggregate"}
+
+
+def shutdown_stats_executor() -> None:
+    """Encerra o pool de processos (chamado no shutdown do FastAPI)."""
+    global _stats_executor
+    if _stats_executor is not None:
+        _stats_executor.shutdown(wait=False, cancel_futures=True)
+        _stats_executor = None
+
+
+def _compute_statistics(gazette_data: Dict[str, Any], full_texts: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Executado no processo filho: precisa ser função de módulo (picklable).
+    Devolve também o agregado de investimentos do município (serializado),
+    mesclado depois nos totais do estado.
+    """
+    generator = StatisticsGenerator()
+    statistics = generator.generate_statistics(gazette_data, full_texts=full_texts)
+    # Fatos já estão no cache do processo: o agregado não revarre os textos
+    aggregate = aggregate_gazettes(gazette_data.get("gazettes") or [], full_texts, generator=generator)
+    return {"statistics": statistics, "investment_aggregate": aggregate.to_dict()}
+
+
 class RankingService:
     def __init__(self):
         self.qd_client = QueridoDiarioClient()
         self.stats_generator = StatisticsGenerator()
 
+    async def _run_statistics(self, gazette_data: Dict[str, Any], full_texts: Dict[str, str]) -> Dict[str, Any]:
+        """Tira o cálculo do event loop: pool de processos, ou thread como fallback."""
+        loop = asyncio.get_running_loop()
+        executor = _get_stats_executor()
+        if executor is not None:
+            return await loop.run_in_executor(executor, _compute_statistics, gazette_data, full_texts)
+        return await asyncio.to_thread(_compute_statistics, gazette_data, full_texts)
+
+    async def _process_municipality(self, territory_id: str, start_date: str, end_date: str, keywords: List[str]) -> Optional[Dict[str, Any]]:
+        """Busca, baixa os textos e calcula as estatísticas de um município."""
+        gazette_data = await self.qd_client.search_gazettes(
+            territory_id=territory_id,
+            start_date=start_date,
+            end_date=end_date,
+            keywords=keywords
+        )
+        if not gazette_data:
+            return None
+
+        full_texts = await fetch_full_texts(gazette_data.get('gazettes') or [])
+        computed = await self._run_statistics(gazette_data, full_texts)
+        municipality_stats = computed["statistics"]
+
+        return {
+            "total_gazettes": municipality_stats.get('total_gazettes', 0),
+            "total_invested": municipality_stats.get('total_invested', 0.0),
+            "top_categories": municipality_stats.get('top_categories', {}),
+            "statistics": municipality_stats,
+            "investment_aggregate": computed["investment_aggregate"],
+        }
+
+    async def iter_municipalities(self, territory_ids: List[str], start_date: str, end_date: str, keywords: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Processa os municípios em paralelo (no máximo RANKING_CONCURRENCY por vez)
+        e produz um evento por município assim que ele termina:
+        `{"territory_id", "status": "ok" | "empty" | "timeout" | "error", "data"?, "error"?}`.
+        """
+        semaphore = asyncio.Semaphore(RANKING_CONCURRENCY)
+
+        async def _bounded(territory_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    data = await asyncio.wait_for(
+                        self._process_municipality(territory_id, start_date, end_date, keywords),
+                        timeout=RANKING_MUNICIPALITY_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Ranking: município {territory_id} excedeu {RANKING_MUNICIPALITY_TIMEOUT}s")
+                    return {"territory_id": territory_id, "status": "timeout"}
+                except Exception as e:
+                    logger.warning(f"Ranking: falha no município {territory_id}: {e}")
+                    return {"territory_id": territory_id, "status": "error", "error": str(e)}
+
+                if data is None:
+                    return {"territory_id": territory_id, "status": "empty"}
+                return {"territory_id": territory_id, "status": "ok", "data": data}
+
+        tasks = [asyncio.create_task(_bounded(str(tid))) for tid in dict.fromkeys(territory_ids)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
     async def get_state_municipalities_ranking(self, state_code: str, territory_ids: List[str], start_date: str, end_date: str, keywords: List[str]) -> Dict:
         """
         Obtém e compara os dados de diferentes municípios de um estado.
-        
+
         Args:
             state_code (str): Código UF do estado (ex: SP, RJ, MG)
             territory_ids (List[str]): Lista de IDs dos territórios (municípios) para comparar
             start_date (str): Data inicial no formato YYYY-MM-DD
             end_date (str): Data final no formato YYYY-MM-DD
             keywords (List[str]): Lista de palavras-chave para busca
-            
+
         Returns:
             Dict: Dicionário com estatísticas comparativas dos municípios
         """
         results = {}
+        failed = []
 
-        # Busca dados para cada município de forma isolada
-        for territory_id in territory_ids:
-            gazette_data = await self.qd_client.search_gazettes(
-                territory_id=territory_id,
-                start_date=start_date,
-                end_date=end_date,
-                keywords=keywords
-            )
+        async for event in self.iter_municipalities(territory_ids, start_date, end_date, keywords):
+            if event["status"] == "ok":
+                results[event["territory_id"]] = event["data"]
+            elif event["status"] in ("timeout", "error"):
+                failed.append({"territory_id": event["territory_id"], "reason": event["status"]})
 
-            # Processa os dados do município
-            if gazette_data:
-                municipality_stats = self.stats_generator.generate_statistics(gazette_data)
+        # Mantém a ordem de entrada, independente de qual município terminou primeiro
+        ordered = {str(tid): results[str(tid)] for tid in territory_ids if str(tid) in results}
+        return self.build_ranking(ordered, failed)
+
+    def build_ranking(self, results: Dict[str, Dict[str, Any]], failed: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """
+        Monta os rankings comparativos a partir dos resultados por município.
+        Os totais do estado (`state_totals`) vêm da soma dos agregados de
+        investimento dos municípios, sem recalcular nenhum texto.
+        """
+        aggregates = [
+            InvestmentAggregate.from_dict(data["investment_aggregate"])
+            for data in results.values() if data.get("investment_aggregate")
+        ]
+        results = {tid: public_result(data) for tid, data in results.items()}
 
-                results[territory_id] = {
-                    "total_gazettes": municipality_stats.get('total_gazettes', 0),
-                    "total_invested": municipality_stats.get('total_invested', 0.0),
-                    "top_categories": municipality_stats.get('top_categories', {}),
-                    "statistics": municipality_stats,
-                }
-        
         # Calcula métricas comparativas
         if results:
             total_municipalities = len(results)
@@ -81,7 +206,20 @@ class RankingService:
                     "total_municipalities": total_municipalities,
                 }
             }
+            if aggregates:
+                state_totals = merge_aggregates(aggregates)
+                state_ranking["rankings"]["state_totals"] = {
+                    "total_gazettes": sum(data["total_gazettes"] for data in results.values()),
+                    **state_totals.to_statistics(),
+                }
+            if failed:
+                state_ranking["partial"] = True
+                state_ranking["failed_municipalities"] = failed
 
             return state_ranking
-        
-        return {"municipalities": {}, "rankings": {"by_publications": [], "total_municipalities": 0}}
\ No newline at end of file
+
+        empty = {"municipalities": {}, "rankings": {"by_publications": [], "total_municipalities": 0}}
+        if failed:
+            empty["partial"] = True
+            empty["failed_municipalities"] = failed
+        return empty
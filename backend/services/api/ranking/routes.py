@@ -1,6 +1,8 @@
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List
-from .ranking_service import RankingService
+from .ranking_service import RankingService, public_result
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -34,4 +36,42 @@ async def get_state_ranking(request: RankingRequest):
         )
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ranking/state/stream")
+async def stream_state_ranking(request: RankingRequest):
+    """
+    Versão em streaming (NDJSON) do ranking estadual.
+
+    Emite uma linha por município assim que ele termina
+    (`{"event": "municipality", "done", "total", "territory_id", "status", "data"?}`)
+    e, ao final, `{"event": "ranking", "data": <mesmo formato de /ranking/state>}`.
+    """
+    async def event_stream():
+        results = {}
+        failed = []
+        total = len(dict.fromkeys(str(t) for t in request.territory_ids))
+        done = 0
+
+        async for event in ranking_service.iter_municipalities(
+            territory_ids=request.territory_ids,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            keywords=request.keywords
+        ):
+            done += 1
+            if event["status"] == "ok":
+                results[event["territory_id"]] = event["data"]
+            elif event["status"] in ("timeout", "error"):
+                failed.append({"territory_id": event["territory_id"], "reason": event["status"]})
+            if "data" in event:
+                event = {**event, "data": public_result(event["data"])}
+            yield json.dumps(
+                {"event": "municipality", "done": done, "total": total, **event}, ensure_ascii=False, default=str
+            ) + "\n"
+
+        ordered = {str(tid): results[str(tid)] for tid in request.territory_ids if str(tid) in results}
+        ranking = ranking_service.build_ranking(ordered, failed)
+        yield json.dumps({"event": "ranking", "data": ranking}, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
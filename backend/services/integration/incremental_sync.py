@@ -0,0 +1,520 @@
+# backend/services/integration/incremental_sync.py
+"""
+Sincronização incremental dos diários de um município.
+
+O radar agendado (`scripts/run_pipeline_automation.py`) refazia, a cada
+execução, a busca de uma janela móvel de 30 dias para cada palavra-chave,
+baixando e recalculando tudo. Aqui cada par (território, palavra-chave)
+guarda um estado:
+
+  * marca d'água: maior data de publicação já sincronizada;
+  * ids dos diários recentes (datas >= marca - SYNC_LOOKBACK_DAYS), para
+    reconhecer os que voltam na sobreposição;
+  * agregado de investimentos (`InvestmentAggregate`) de tudo o que já foi
+    sincronizado.
+
+Uma nova execução busca só a partir da marca (menos uma pequena janela de
+sobreposição, para diários publicados com atraso), descarta os já vistos,
+baixa os textos apenas dos novos, grava-os no corpus local e soma as
+estatísticas deles ao agregado. O custo passa a ser proporcional ao que foi
+publicado desde a última execução, não ao tamanho da janela.
+
+`sync_batch` roda vários territórios e palavras-chave em um só plano: as
+buscas são deduplicadas e concorrentes, e um diário que aparece em várias
+buscas é baixado e analisado uma única vez na execução. O plano avança em
+grupos de territórios, para que só os textos de um grupo fiquem em memória.
+
+O SQLite do estado é um cache local: o documento salvo de cada busca
+(`sync_document`) carrega o mesmo estado, e `restore_state` o recria a
+partir dele quando o banco se perde.
+
+`load_territory_corpus` é a carga sem palavra-chave de um território: todos
+os diários da janela, com texto completo, vão para o corpus local como
+cobertura total, e qualquer busca nesse período passa a ser respondida pelo
+índice FTS5.
+
+Variáveis de ambiente (opcionais):
+    SYNC_STATE_DB          - SQLite do estado (padrão backend/cache/sync_state.sqlite3)
+    SYNC_LOOKBACK_DAYS     - dias antes da marca buscados de novo (padrão 2)
+    SYNC_INITIAL_DAYS      - janela da primeira sincronização (padrão 30)
+    SYNC_BATCH_CONCURRENCY - buscas de um lote (`sync_batch`) ao mesmo tempo (padrão 4)
+    SYNC_BATCH_GROUP_SIZE  - territórios por grupo do lote; limita os textos em memória (padrão 4)
+    SYNC_CORPUS_DAYS       - dias da carga sem palavra-chave do corpus local (padrão 30; 0 desativa)
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.api.clients import gazette_corpus, gazette_text_client, query_planner, querido_diario_client
+from services.api.clients.querido_diario_client import FilterParams, QueridoDiarioClient
+from services.processing.investment_facts import InvestmentAggregate, gazette_facts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DB = Path(__file__).resolve().parents[2] / "cache" / "sync_state.sqlite3"
+SYNC_LOOKBACK_DAYS = int(os.getenv("SYNC_LOOKBACK_DAYS", 2))
+SYNC_INITIAL_DAYS = int(os.getenv("SYNC_INITIAL_DAYS", 30))
+SYNC_BATCH_CONCURRENCY = int(os.getenv("SYNC_BATCH_CONCURRENCY", 4))
+SYNC_BATCH_GROUP_SIZE = int(os.getenv("SYNC_BATCH_GROUP_SIZE", 4))
+SYNC_CORPUS_DAYS = int(os.getenv("SYNC_CORPUS_DAYS", 30))
+
+
+class SyncStateStore:
+    """Estado por (território, busca) em SQLite (acesso serializado por lock)."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        path = Path(db_path or os.getenv("SYNC_STATE_DB") or DEFAULT_STATE_DB)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                " territory_id TEXT NOT NULL, query TEXT NOT NULL, since TEXT, high_water TEXT,"
+                " recent_ids TEXT, aggregate TEXT, synced_at TEXT,"
+                " PRIMARY KEY (territory_id, query))"
+            )
+
+    def get(self, territory_id: str, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT since, high_water, recent_ids, aggregate, synced_at FROM sync_state"
+                " WHERE territory_id = ? AND query = ?",
+                (territory_id, query),
+            ).fetchone()
+        if row is None:
+            return None
+        since, high_water, recent_ids, aggregate, synced_at = row
+        return {
+            "since": since,
+            "high_water": high_water,
+            "recent_ids": json.loads(recent_ids or "{}"),
+            "aggregate": json.loads(aggregate or "{}"),
+            "synced_at": synced_at,
+        }
+
+    def put(self, territory_id: str, query: str, state: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    territory_id, query, state["since"], state["high_water"],
+                    json.dumps(state["recent_ids"], ensure_ascii=False),
+                    json.dumps(state["aggregate"], ensure_ascii=False),
+                    state["synced_at"],
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[SyncStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_sync_store() -> SyncStateStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SyncStateStore()
+        return _store
+
+
+def _fetch_window(state: Optional[Dict[str, Any]], until: date, initial_since: Optional[str]) -> date:
+    """Início da busca: marca d'água menos a sobreposição, ou a janela inicial."""
+    if state and state.get("high_water"):
+        return date.fromisoformat(state["high_water"]) - timedelta(days=SYNC_LOOKBACK_DAYS)
+    if initial_since:
+        return date.fromisoformat(initial_since)
+    return until - timedelta(days=SYNC_INITIAL_DAYS)
+
+
+def sync_document(territory_id: str, keywords: Optional[str], state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resultado salvo da sincronização (mesma forma de meta/data das análises).
+    O estado vai junto em `sync`: o arquivo versionado é a cópia durável da
+    marca d'água (ver `restore_state`).
+    """
+    aggregate = InvestmentAggregate.from_dict(state["aggregate"])
+    return {
+        "meta": {
+            "source_territory": territory_id,
+            "period": f"{state['since']} a {state['high_water'] or state['since']}",
+            "search_keywords": str(keywords) if keywords else "padrão",
+            "generated_at": state["synced_at"],
+            "type": "incremental_sync",
+            "date_range_start": state["since"],
+            "date_range_end": state["high_water"],
+        },
+        "data": {
+            "total_gazettes": aggregate.gazettes,
+            **aggregate.to_statistics(),
+        },
+        "sync": {key: state[key] for key in ("since", "high_water", "recent_ids", "aggregate", "synced_at")},
+    }
+
+
+def restore_state(
+    territory_id: str,
+    keywords: Optional[str],
+    document: Dict[str, Any],
+    store: Optional[SyncStateStore] = None,
+) -> bool:
+    """
+    Recria o estado de uma busca a partir do documento salvo (campo `sync`),
+    quando o SQLite do estado se perdeu (ex.: cache do CI expirado). Retorna
+    False se o documento não traz o estado.
+    """
+    state = document.get("sync") if isinstance(document, dict) else None
+    if not isinstance(state, dict) or not state.get("since") or "aggregate" not in state:
+        return False
+    store = store or get_sync_store()
+    store.put(territory_id, gazette_corpus.normalize_query(keywords), {
+        "since": state["since"],
+        "high_water": state.get("high_water"),
+        "recent_ids": state.get("recent_ids") or {},
+        "aggregate": state["aggregate"],
+        "synced_at": state.get("synced_at"),
+    })
+    return True
+
+
+async def _fetch_pair(
+    store: SyncStateStore,
+    territory_id: str,
+    keywords: Optional[str],
+    until_date: date,
+    initial_since: Optional[str],
+) -> Dict[str, Any]:
+    """Lê o estado de uma busca e pede ao upstream só a janela desde a marca."""
+    query = gazette_corpus.normalize_query(keywords)
+    state = await asyncio.to_thread(store.get, territory_id, query)
+    since_date = _fetch_window(state, until_date, initial_since)
+    fetched = await query_planner.fetch_gazettes_sharded(
+        territory_id, since_date.isoformat(), until_date.isoformat(), keywords
+    )
+    return {
+        "territory_id": territory_id,
+        "keywords": keywords,
+        "query": query,
+        "state": state,
+        "since": since_date,
+        "until": until_date,
+        "fetched": fetched,
+    }
+
+
+def _select_new(job: Dict[str, Any]) -> None:
+    """
+    Separa os diários ainda não sincronizados (fora de `recent_ids`). Diários
+    sem identidade ou sem data ficam de fora: não há como reconhecê-los na
+    próxima execução (seriam somados de novo a cada sobreposição).
+    """
+    state = job["state"]
+    recent_ids: Dict[str, str] = dict(state["recent_ids"]) if state else {}
+    new_gazettes: List[Dict[str, Any]] = []
+    skipped = 0
+    for gazette in job["fetched"]["gazettes"]:
+        key = gazette_corpus.storage_key(gazette)
+        gazette_date = str(gazette.get("date") or "")[:10]
+        if key is None or len(gazette_date) != 10:
+            skipped += 1
+            continue
+        if key in recent_ids:
+            continue
+        new_gazettes.append(gazette)
+        recent_ids[key] = gazette_date
+    if skipped:
+        logger.warning(f"⚠️ Sync {job['territory_id']} '{job['query']}': {skipped} diários sem identidade ou data ignorados")
+    job["new"] = new_gazettes
+    job["recent_ids"] = recent_ids
+
+
+async def _shared_full_texts(gazettes: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Textos de um lote: primeiro o corpus local, depois um download por `txt_url`."""
+    corpus = gazette_corpus.get_corpus()
+    full_texts = await asyncio.to_thread(corpus.full_texts, gazettes) if corpus is not None else {}
+    missing, seen = [], set(full_texts)
+    for gazette in gazettes:
+        url = gazette.get("txt_url")
+        if url not in seen:
+            seen.add(url)
+            missing.append(gazette)
+    if missing:
+        full_texts.update(await gazette_text_client.fetch_full_texts(missing))
+    return full_texts
+
+
+def _aggregate_new(
+    gazettes: List[Dict[str, Any]], full_texts: Dict[str, str], url_facts: Dict[str, Dict[str, Any]]
+) -> InvestmentAggregate:
+    """Agregado dos diários novos: fatos já extraídos nesta execução (por `txt_url`) ou do cache."""
+    aggregate = InvestmentAggregate()
+    rest = []
+    for gazette in gazettes:
+        fact = url_facts.get(gazette.get("txt_url"))
+        if fact is not None:
+            aggregate.add(fact)
+        else:
+            rest.append(gazette)
+    for fact in gazette_facts(rest, full_texts):
+        aggregate.add(fact)
+    return aggregate
+
+
+async def _commit_pair(
+    store: SyncStateStore,
+    job: Dict[str, Any],
+    full_texts: Dict[str, str],
+    url_facts: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Soma os diários novos ao agregado, grava no corpus e avança a marca d'água."""
+    territory_id, keywords, state = job["territory_id"], job["keywords"], job["state"]
+    fetched, new_gazettes, recent_ids = job["fetched"], job["new"], job["recent_ids"]
+    since_date, until_date = job["since"], job["until"]
+
+    aggregate = InvestmentAggregate.from_dict(state["aggregate"]) if state else InvestmentAggregate()
+    # Varredura dos textos novos é CPU-bound: fora do event loop
+    aggregate.update(await asyncio.to_thread(_aggregate_new, new_gazettes, full_texts, url_facts or {}))
+
+    complete = gazette_corpus.is_complete(len(fetched["gazettes"]))
+    corpus = gazette_corpus.get_corpus()
+    if corpus is not None:
+        try:
+            await asyncio.to_thread(
+                corpus.ingest, territory_id, new_gazettes, full_texts, keywords,
+                since_date.isoformat() if complete else None, until_date.isoformat() if complete else None,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar a sincronização no corpus local: {e}")
+
+    high_water = state.get("high_water") if state else None
+    if complete:
+        dates = [d for d in recent_ids.values() if len(d) == 10]
+        if high_water:
+            dates.append(high_water)
+        high_water = max(dates) if dates else None
+    else:
+        # Busca parou no teto (QD_MAX_GAZETTES): pode faltar diário antes da data
+        # mais recente recebida, então a marca não avança (os ids vistos evitam a recontagem)
+        logger.warning(f"⚠️ Sync {territory_id} '{job['query']}': busca no teto de diários; marca d'água mantida")
+    if high_water:
+        # Só os ids dentro da sobreposição da próxima execução continuam no estado
+        horizon = (date.fromisoformat(high_water) - timedelta(days=SYNC_LOOKBACK_DAYS)).isoformat()
+        recent_ids = {key: d for key, d in recent_ids.items() if len(d) == 10 and d >= horizon}
+
+    new_state = {
+        "since": state["since"] if state else since_date.isoformat(),
+        "high_water": high_water,
+        "recent_ids": recent_ids,
+        "aggregate": aggregate.to_dict(),
+        "synced_at": datetime.now().isoformat(),
+    }
+    await asyncio.to_thread(store.put, territory_id, job["query"], new_state)
+
+    logger.info(
+        f"🔄 Sync {territory_id} '{job['query']}': {len(new_gazettes)} novos de "
+        f"{len(fetched['gazettes'])} buscados ({since_date} a {until_date})"
+    )
+    return {
+        "territory_id": territory_id,
+        "keywords": keywords,
+        "since": since_date.isoformat(),
+        "until": until_date.isoformat(),
+        "fetched_gazettes": len(fetched["gazettes"]),
+        "new_gazettes": len(new_gazettes),
+        "high_water": high_water,
+        "document": sync_document(territory_id, keywords, new_state),
+    }
+
+
+async def _sync_group(
+    store: SyncStateStore,
+    pairs: List[Tuple[str, Optional[str]]],
+    until_date: date,
+    initial_since: Optional[str],
+    semaphore: asyncio.Semaphore,
+    url_facts: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Busca, baixa e consolida um grupo de pares; os textos só vivem durante o grupo."""
+
+    async def _bounded(territory_id: str, keywords: Optional[str]) -> Dict[str, Any]:
+        async with semaphore:
+            return await _fetch_pair(store, territory_id, keywords, until_date, initial_since)
+
+    jobs = await asyncio.gather(*(_bounded(tid, kw) for tid, kw in pairs))
+
+    fetched_jobs = [job for job in jobs if job["fetched"] is not None]
+    for job in fetched_jobs:
+        _select_new(job)
+    union = [gazette for job in fetched_jobs for gazette in job["new"]]
+
+    # Textos já processados em um grupo anterior não são baixados de novo
+    pending = [g for g in union if g.get("txt_url") not in url_facts]
+    full_texts = await _shared_full_texts(pending) if pending else {}
+    # Uma passada de extração sobre os textos distintos; os pares reaproveitam os fatos
+    for gazette, fact in zip(pending, gazette_facts(pending, full_texts)):
+        if gazette.get("txt_url") in full_texts:
+            url_facts[gazette["txt_url"]] = fact
+
+    results = []
+    for job in jobs:
+        if job["fetched"] is None:
+            results.append({
+                "territory_id": job["territory_id"],
+                "keywords": job["keywords"],
+                "error": "Falha na busca do Querido Diário",
+            })
+            continue
+        results.append(await _commit_pair(store, job, full_texts, url_facts))
+    return results
+
+
+async def sync_batch(
+    territory_ids: Iterable[str],
+    keywords_list: Iterable[Optional[str]],
+    until: Optional[str] = None,
+    initial_since: Optional[str] = None,
+    store: Optional[SyncStateStore] = None,
+    concurrency: Optional[int] = None,
+    group_size: Optional[int] = None,
+    exclude: Iterable[Tuple[str, str]] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Sincroniza todas as combinações território x palavra-chave com um plano
+    único:
+
+      1. pares repetidos (mesmo território e mesma busca normalizada) são
+         buscados uma vez; até `concurrency` buscas ao mesmo tempo (os
+         limites por host do `http_pool` continuam valendo);
+      2. o plano roda em grupos de `group_size` territórios: os diários
+         novos das buscas do grupo são unidos e cada `txt_url` é lida do
+         corpus local ou baixada uma única vez;
+      3. os fatos de investimento são extraídos em uma passada sobre os
+         textos distintos do grupo; cada busca só soma os fatos dos seus
+         diários. Os textos são descartados ao fim do grupo e só os fatos
+         (por `txt_url`) seguem para os grupos seguintes.
+
+    A memória fica limitada aos textos de um grupo, não do estado inteiro.
+    Pares em `exclude` (território, busca normalizada) ficam fora do plano.
+    Retorna um resumo por par, na ordem do plano (mesma forma de
+    `sync_territory`).
+    """
+    store = store or get_sync_store()
+    until_date = date.fromisoformat(until) if until else date.today()
+    keywords_list = list(keywords_list)
+
+    excluded = set(exclude)
+    plan: Dict[str, Dict[str, Optional[str]]] = {}
+    for territory_id in territory_ids:
+        queries = plan.setdefault(str(territory_id), {})
+        for keywords in keywords_list:
+            query = gazette_corpus.normalize_query(keywords)
+            if (str(territory_id), query) not in excluded:
+                queries.setdefault(query, keywords)
+
+    semaphore = asyncio.Semaphore(concurrency or SYNC_BATCH_CONCURRENCY)
+    group_size = max(1, group_size or SYNC_BATCH_GROUP_SIZE)
+    territories = list(plan)
+    url_facts: Dict[str, Dict[str, Any]] = {}
+    results = []
+    for start in range(0, len(territories), group_size):
+        pairs = [(tid, kw) for tid in territories[start:start + group_size] for kw in plan[tid].values()]
+        results.extend(await _sync_group(store, pairs, until_date, initial_since, semaphore, url_facts))
+
+    new_total = sum(r.get("new_gazettes", 0) for r in results)
+    logger.info(
+        f"📡 Lote: {len(results)} buscas em {len(territories)} territórios, "
+        f"{new_total} diários novos, {len(url_facts)} textos distintos"
+    )
+    return results
+
+
+async def sync_territory(
+    territory_id: str,
+    keywords: Optional[str] = None,
+    until: Optional[str] = None,
+    initial_since: Optional[str] = None,
+    store: Optional[SyncStateStore] = None,
+) -> Dict[str, Any]:
+    """
+    Sincroniza uma busca (território + palavra-chave) a partir da marca
+    d'água. Retorna o resumo da execução: janela buscada, diários novos,
+    marca d'água e o documento acumulado (`document`), ou `{"error"}` se a
+    busca upstream falhar (o estado não muda).
+    """
+    results = await sync_batch([territory_id], [keywords], until=until, initial_since=initial_since, store=store)
+    return results[0]
+
+
+async def load_territory_corpus(
+    territory_id: str,
+    days: Optional[int] = None,
+    until: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Carga sem palavra-chave: todos os diários do território nos últimos
+    `days` dias (SYNC_CORPUS_DAYS), com os textos completos, gravados no
+    corpus local como cobertura total ("*"). Com ela, qualquer palavra-chave
+    nesse período é respondida pelo índice FTS5, sem ir ao upstream. Só o
+    trecho ainda não coberto (ou com cobertura vencida) é buscado.
+    Retorna `{"since", "until", "gazettes", "covered"}`, ou None se o corpus
+    está desativado, a janela é vazia ou a busca upstream falhou.
+    """
+    days = SYNC_CORPUS_DAYS if days is None else days
+    corpus = gazette_corpus.get_corpus()
+    if corpus is None or days <= 0:
+        return None
+    until_date = date.fromisoformat(until) if until else date.today()
+    since_date = await asyncio.to_thread(
+        corpus.uncovered_since, territory_id, (until_date - timedelta(days=days)).isoformat(), None, True
+    )
+    if since_date > until_date:
+        return None
+
+    filters = FilterParams(
+        territory_ids=territory_id, published_since=since_date, published_until=until_date,
+        size=querido_diario_client.QD_PAGE_SIZE,
+    )
+    gazettes: List[Dict[str, Any]] = []
+    try:
+        async for page in QueridoDiarioClient().iter_gazette_pages(filters):
+            gazettes.extend(page)
+    except Exception as e:
+        logger.warning(f"⚠️ Carga do corpus de {territory_id} falhou: {e}")
+        return None
+
+    full_texts = await _shared_full_texts(gazettes) if gazettes else {}
+    complete = gazette_corpus.is_complete(len(gazettes))
+    await asyncio.to_thread(
+        corpus.ingest, territory_id, gazettes, full_texts, None,
+        since_date.isoformat() if complete else None, until_date.isoformat() if complete else None, True,
+    )
+    covered = await asyncio.to_thread(corpus.uncovered_since, territory_id, since_date.isoformat(), None, True)
+    logger.info(
+        f"📚 Corpus {territory_id}: {len(gazettes)} diários ({len(full_texts)} com texto) "
+        f"de {since_date} a {until_date}; coberto até {covered - timedelta(days=1)}"
+    )
+    return {
+        "since": since_date.isoformat(),
+        "until": until_date.isoformat(),
+        "gazettes": len(gazettes),
+        "covered": covered > since_date,
+    }
+
+
+def sync_filename(territory_id: str, keywords: Optional[str]) -> str:
+    """Um arquivo por busca sincronizada, sobrescrito a cada execução."""
+    ascii_query = unicodedata.normalize("NFKD", gazette_corpus.normalize_query(keywords)).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-z0-9]+", "-", ascii_query).strip("-")
+    return f"analysis_sync_{territory_id}_{slug or 'padrao'}.json"
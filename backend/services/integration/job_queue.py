@@ -0,0 +1,287 @@
+# backend/services/integration/job_queue.py
+"""
+Fila de jobs em segundo plano para as análises longas.
+
+`/analyze` e `/api/v1/save_search` rodam dentro da requisição HTTP: buscas
+grandes (download de textos completos, NER, LLM) prendem o worker do
+uvicorn e estouram o timeout do cliente. Aqui a requisição só enfileira o
+job e devolve o id; workers asyncio do próprio processo o executam e o
+cliente consulta status/resultado depois.
+
+  * concorrência limitada (JOB_WORKERS jobs rodando ao mesmo tempo);
+  * jobs idênticos (mesmo tipo e parâmetros) ainda na fila ou rodando são
+    deduplicados: o segundo pedido recebe o job do primeiro;
+  * jobs na fila ou rodando podem ser cancelados;
+  * com JOB_QUEUE_DB, os jobs também vão para um SQLite: status/resultados
+    sobrevivem a um restart e jobs interrompidos voltam para a fila.
+
+Variáveis de ambiente (opcionais):
+    JOB_WORKERS       - jobs executados ao mesmo tempo (padrão 2)
+    JOB_MAX_FINISHED  - jobs concluídos mantidos em memória (padrão 500)
+    JOB_QUEUE_DB      - caminho do SQLite persistente (vazio = só memória)
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.integration.response_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", 500))
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class Job:
+    __slots__ = ("id", "kind", "params", "key", "status", "result", "error",
+                 "created_at", "started_at", "finished_at")
+
+    def __init__(self, kind: str, params: Dict[str, Any], key: str, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.key = key
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status público do job (sem o resultado)."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class _JobStore:
+    """Persistência opcional dos jobs em SQLite (acesso serializado por lock)."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT, params TEXT, key TEXT, status TEXT,"
+                " result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL)"
+            )
+
+    def save(self, job: Job) -> None:
+        row = (
+            job.id, job.kind, json.dumps(job.params, ensure_ascii=False, default=str), job.key, job.status,
+            json.dumps(job.result, ensure_ascii=False, default=str) if job.status == DONE else None,
+            job.error, job.created_at, job.started_at, job.finished_at,
+        )
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def _from_row(self, row) -> Job:
+        job_id, kind, params, key, status, result, error, created_at, started_at, finished_at = row
+        job = Job(kind, json.loads(params), key, job_id=job_id)
+        job.status, job.error = status, error
+        job.result = json.loads(result) if result is not None else None
+        job.created_at, job.started_at, job.finished_at = created_at, started_at, finished_at
+        return job
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def load_active(self) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATES
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Fila asyncio com workers, deduplicação e cancelamento."""
+
+    def __init__(self, workers: int = JOB_WORKERS, db_path: Optional[str] = None,
+                 max_finished: int = JOB_MAX_FINISHED):
+        self.workers = max(1, workers)
+        self.max_finished = max_finished
+        self._store = _JobStore(db_path) if db_path else None
+        self._handlers: Dict[str, Handler] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        # chave (tipo + parâmetros) -> id do job ainda na fila ou rodando
+        self._active: Dict[str, str] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._loop_id: Optional[int] = None
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """`handler(**params)` executa um job do tipo `kind` e devolve o resultado."""
+        self._handlers[kind] = handler
+
+    # --- ciclo de vida ---
+    async def start(self) -> None:
+        """Inicia os workers no event loop atual (idempotente por loop)."""
+        loop_id = id(asyncio.get_running_loop())
+        if self._loop_id == loop_id:
+            return
+        self._loop_id = loop_id
+        self._queue = asyncio.Queue()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        # Jobs que estavam na fila (ou rodando) antes voltam para a fila
+        pending = [job for job in self._jobs.values() if job.status in ACTIVE_STATES]
+        if self._store is not None:
+            known = {job.id for job in pending}
+            pending += [job for job in await asyncio.to_thread(self._store.load_active) if job.id not in known]
+        for job in pending:
+            job.status = QUEUED
+            self._jobs[job.id] = job
+            self._active[job.key] = job.id
+            self._queue.put_nowait(job.id)
+        if pending:
+            logger.info(f"📋 {len(pending)} job(s) retomado(s) na fila")
+
+    async def stop(self) -> None:
+        """Para os workers; jobs interrompidos voltam para a fila no próximo start."""
+        # Cada worker cancela o job que estiver rodando
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._running.clear()
+        self._queue = None
+        self._loop_id = None
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    # --- API ---
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Enfileira um job (ou devolve o job idêntico que já está ativo)."""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        await self.start()
+
+        key = make_key(kind, **params)
+        existing = self._jobs.get(self._active.get(key, ""))
+        if existing is not None and existing.status in ACTIVE_STATES:
+            return {**existing.to_dict(), "deduplicated": True}
+
+        job = Job(kind, params, key)
+        self._jobs[job.id] = job
+        self._active[key] = job.id
+        await self._persist(job)
+        self._queue.put_nowait(job.id)
+        return {**job.to_dict(), "deduplicated": False}
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self._store is not None:
+            job = await asyncio.to_thread(self._store.load, job_id)
+        return job
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela um job na fila ou rodando (jobs concluídos não mudam)."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in ACTIVE_STATES:
+            return job or await self.get(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            # O worker registra o cancelamento ao receber o CancelledError
+            task.cancel()
+            await asyncio.wait({task})
+        if job.status in ACTIVE_STATES:
+            await self._finish(job, CANCELLED)
+        return job
+
+    # --- execução ---
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue  # cancelado enquanto estava na fila
+            job.status, job.started_at = RUNNING, time.time()
+            await self._persist(job)
+            task = asyncio.create_task(self._handlers[job.kind](**job.params))
+            self._running[job.id] = task
+            try:
+                result = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # O próprio worker foi cancelado (shutdown): o job fica para o próximo start
+                    task.cancel()
+                    raise
+                await self._finish(job, CANCELLED)
+            except Exception as e:
+                logger.error(f"❌ Job {job.id} ({job.kind}) falhou: {e}")
+                await self._finish(job, FAILED, error=str(e))
+            else:
+                job.result = result
+                await self._finish(job, DONE)
+            finally:
+                self._running.pop(job.id, None)
+
+    async def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        if job.status not in ACTIVE_STATES:
+            return
+        job.status, job.error, job.finished_at = status, error, time.time()
+        if self._active.get(job.key) == job.id:
+            del self._active[job.key]
+        await self._persist(job)
+        self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    async def _persist(self, job: Job) -> None:
+        if self._store is None:
+            return
+        try:
+            await asyncio.to_thread(self._store.save, job)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao persistir job {job.id}: {e}")
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Instância única por processo."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(db_path=JOB_QUEUE_DB or None)
+    return _queue
@@ -1,25 +1,43 @@
 # backend/services/integration/piter_api_orchestrator.py
-import json
+import asyncio
 import os
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, Any
-from httpx import RequestError
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from httpx import HTTPStatusError, RequestError
 
-from services.api.clients import querido_diario_client, spacy_api_client
+from services.api.clients import gazette_corpus, query_planner, querido_diario_client, spacy_api_client, gazette_text_client
 from services.api.clients.querido_diario_client import FilterParams, QueridoDiarioClient
 from services.processing import data_cleaner
+from services.processing.investment_facts import InvestmentAggregate, aggregate_gazettes
 from services.processing.statistics_generator import StatisticsGenerator
+from services.integration import response_cache, result_index, result_store
 # Import condicional para evitar erro circular se não estiver configurado
 try:
     from services.api.clients import gemini_client
 except ImportError:
     gemini_client = None
 
+# Máximo de diários enviados à análise qualitativa por execução
+LLM_MAX_GAZETTES = int(os.getenv("LLM_MAX_GAZETTES", 20))
+
 class PiterApiOrchestrator:
     def __init__(self):
         self.qd_client = QueridoDiarioClient()
 
     async def get_enriched_gazette_data(self, filters: FilterParams) -> Dict[str, Any]:
+        """
+        Igual a `_fetch_enriched_gazette_data`, passando pelo cache de
+        respostas: consultas idênticas simultâneas geram uma única busca.
+        """
+        return await response_cache.cached(
+            "gazettes",
+            filters.dict(),
+            lambda: self._fetch_enriched_gazette_data(filters),
+            until=filters.published_until,
+        )
+
+    async def _fetch_enriched_gazette_data(self, filters: FilterParams) -> Dict[str, Any]:
         """
         Busca diários oficiais com FILTRAGEM MANUAL de datas.
 
@@ -47,102 +65,401 @@ class PiterApiOrchestrator:
         if not until:
             until = datetime.now().strftime("%Y-%m-%d")  # Data atual
 
-        # Usar função com filtro manual quando há filtros de data
-        gazette_data = await querido_diario_client.fetch_gazettes(
+        # Busca repetida ou histórica já coberta pelo corpus local: sem rede
+        local = await _search_corpus(territory_id, since, until, keywords)
+        if local is not None:
+            return local
+
+        # Períodos longos (ex.: desde 2020) são buscados em fatias paralelas
+        gazette_data = await query_planner.fetch_gazettes_sharded(
             territory_id=territory_id,
             since=since,
             until=until,
             keywords=keywords
         )
+        if gazette_data is not None:
+            await _ingest_corpus(territory_id, gazette_data["gazettes"], {}, keywords, since, until)
 
         return gazette_data
 
+async def _search_corpus(territory_id: str, since: str, until: str, keywords: str = None):
+    """Resposta do corpus local (None se ele não cobre a busca ou está desativado)."""
+    corpus = gazette_corpus.get_corpus()
+    if corpus is None:
+        return None
+    try:
+        local = await asyncio.to_thread(corpus.search, territory_id, since, until, keywords)
+    except Exception as e:
+        print(f"⚠️ Corpus local indisponível para a busca: {e}")
+        return None
+    if local is not None:
+        print(f"📚 Corpus local: {local['total_gazettes']} diários de {since} a {until} (sem rede)")
+    return local
+
+async def _ingest_corpus(territory_id: str, gazettes: List[Dict[str, Any]], full_texts: Dict[str, str], keywords: str, since: str, until: str) -> None:
+    """Guarda uma busca upstream no corpus; o período só vale como coberto se a busca foi completa."""
+    corpus = gazette_corpus.get_corpus()
+    if corpus is None:
+        return
+    complete = gazette_corpus.is_complete(len(gazettes))
+    try:
+        await asyncio.to_thread(
+            corpus.ingest, territory_id, gazettes, full_texts, keywords,
+            since if complete else None, until if complete else None,
+        )
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar no corpus local: {e}")
+
+def _clean_excerpt(excerpt: str) -> str:
+    return data_cleaner.pre_filter_spacy_input(excerpt, max_length=None)
+
 def save_json_file(data: Dict[str, Any], filename: str, is_latest: bool = False, latest_name: str = ""):
+    """
+    Salva o resultado uma única vez em data_output (JSON compacto + gzip, ver
+    `result_store`) e o registra no índice. `latest_name` vira um ponteiro
+    para este resultado, servido em /data_output/<latest_name>.
+    """
     try:
-        frontend_path = os.path.abspath(os.path.join(os.getcwd(), "..", "frontend", "public", "data"))
         backend_path = os.path.abspath(os.path.join(os.getcwd(), "data_output"))
-        os.makedirs(frontend_path, exist_ok=True)
-        os.makedirs(backend_path, exist_ok=True)
-
-        with open(os.path.join(frontend_path, filename), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        with open(os.path.join(backend_path, filename), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            
+        store = result_store.get_result_store(backend_path)
+        path = store.save(filename, data)
+        # Listagens de data_output respondem pelo índice, sem reabrir os arquivos
+        result_index.get_result_index(backend_path).record(path, data)
+
         if is_latest and latest_name:
-            with open(os.path.join(frontend_path, latest_name), "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            store.set_pointer(latest_name, path)
             print(f"✅ [PERSISTÊNCIA] '{latest_name}' atualizado. Valor Total: {data['data'].get('total_invested', 0)}")
-            
+
     except Exception as e:
         print(f"❌ [ERRO] Falha ao salvar arquivos: {e}")
 
+async def save_search_with_stats(gazettes: List[Dict[str, Any]], filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calcula as estatísticas de investimento de uma busca já feita no
+    frontend (com os textos completos) e salva o resultado.
+    """
+    if not gazettes:
+        return {"status": "skipped", "message": "Nenhum diário para salvar"}
+
+    full_texts = await gazette_text_client.fetch_full_texts(gazettes)
+    stats_gen = StatisticsGenerator()
+    investment_stats = stats_gen.extract_investment_statistics(gazettes, full_texts=full_texts)
+
+    print(f"📊 Estatísticas: total={investment_stats.get('total_invested', 0)}")
+
+    territory_id = filters.get("territory_id") or filters.get("municipio", "unknown")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    data = {
+        "meta": {
+            "source_territory": territory_id,
+            "period": f"{filters.get('dataInicio', 'N/A')} a {filters.get('dataFim', 'N/A')}",
+            "search_keywords": filters.get("categoria") or filters.get("querystring", "N/A"),
+            "generated_at": datetime.now().isoformat(),
+            "type": "search_with_stats",
+            "date_range_start": filters.get("dataInicio"),
+            "date_range_end": filters.get("dataFim")
+        },
+        "data": {
+            "total_gazettes": len(gazettes),
+            "total_invested": investment_stats.get("total_invested", 0),
+            "total_entities": 0,
+            "investments_by_category": investment_stats.get("investments_by_category", {}),
+            "investments_by_period": investment_stats.get("investments_by_period", {}),
+            "publications_by_period": investment_stats.get("publications_by_period", {}),
+            "period_grouping": investment_stats.get("period_grouping", "month")
+        },
+        "gazettes": gazettes
+    }
+
+    filename = f"search_{territory_id}_{timestamp}.json"
+    save_json_file(data, filename, is_latest=True, latest_name="latest_search.json")
+
+    return {
+        "status": "saved",
+        "filename": filename,
+        "total_gazettes": len(gazettes),
+        "total_invested": investment_stats.get("total_invested", 0),
+        "investments_by_category": investment_stats.get("investments_by_category", {}),
+        "investments_by_period": investment_stats.get("investments_by_period", {}),
+        "publications_by_period": investment_stats.get("publications_by_period", {}),
+        "period_grouping": investment_stats.get("period_grouping", "month"),
+        "message": "Resultados salvos com sucesso"
+    }
+
+def _analysis_params(territory_id: str, since: str, until: str, keywords: str = None) -> Dict[str, Any]:
+    return {"territory_id": territory_id, "since": since, "until": until, "keywords": keywords}
+
+def _save_search(territory_id: str, final_result: Dict[str, Any]) -> None:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"search_{territory_id}_{timestamp}.json"
+    save_json_file(final_result, filename, is_latest=True, latest_name="latest_search.json")
+
 async def run_analysis_pipeline(territory_id: str, since: str, until: str, keywords: str = None, save_as_search: bool = True) -> Dict[str, Any]:
+    """
+    Executa (ou reaproveita do cache de respostas) a análise completa de um
+    território/período/palavra-chave e, se pedido, salva o resultado.
+    """
+    final_result = await response_cache.cached(
+        "analysis",
+        _analysis_params(territory_id, since, until, keywords),
+        lambda: _run_analysis(territory_id, since, until, keywords),
+        until=until,
+    )
+
+    if save_as_search and "error" not in final_result:
+        _save_search(territory_id, final_result)
+
+    return final_result
+
+async def stream_analysis_pipeline(
+    territory_id: str, since: str, until: str, keywords: str = None, save_as_search: bool = True
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Versão em streaming de `run_analysis_pipeline`: produz `(evento, dados)`
+    conforme cada etapa termina. O último evento é "result" (mesmo formato de
+    `run_analysis_pipeline`) ou "error".
+    """
+    progress: asyncio.Queue = asyncio.Queue()
+
+    async def _compute() -> Dict[str, Any]:
+        # Só roda quando esta chamada é a dona do cálculo (nada em cache nem em andamento)
+        async with aclosing(_analysis_events(territory_id, since, until, keywords, partial=True)) as events:
+            async for event, payload in events:
+                if event in ("result", "error"):
+                    return payload
+                progress.put_nowait((event, payload))
+
+    # Mesmo single-flight de `run_analysis_pipeline`: um /analyze idêntico em
+    # andamento é aguardado (sem eventos parciais) e os que chegarem durante o
+    # stream aguardam este cálculo. Se o cliente desconectar, o cálculo segue
+    # para quem estiver esperando.
+    result = asyncio.ensure_future(response_cache.cached(
+        "analysis",
+        _analysis_params(territory_id, since, until, keywords),
+        _compute,
+        until=until,
+    ))
+    result.add_done_callback(lambda _: progress.put_nowait(None))
+    try:
+        while True:
+            item = await progress.get()
+            if item is None:
+                break
+            yield item
+        final_result = result.result()
+    finally:
+        result.cancel()
+
+    if "error" in final_result:
+        yield "error", final_result
+        return
+    # Salva antes do último evento: o cliente pode desconectar logo após recebê-lo
+    if save_as_search:
+        _save_search(territory_id, final_result)
+    yield "result", final_result
+
+async def _run_analysis(territory_id: str, since: str, until: str, keywords: str = None) -> Dict[str, Any]:
+    async with aclosing(_analysis_events(territory_id, since, until, keywords)) as events:
+        async for event, payload in events:
+            if event in ("result", "error"):
+                return payload
+
+async def _local_pages(gazettes: List[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Diários do corpus local nas mesmas páginas da busca upstream."""
+    page_size = querido_diario_client.QD_PAGE_SIZE
+    for start in range(0, len(gazettes), page_size):
+        yield gazettes[start:start + page_size]
+
+async def _page_full_texts(page: List[Dict[str, Any]], from_corpus: bool = False) -> Dict[str, str]:
+    """Textos completos de uma página: os guardados no corpus, o restante baixado."""
+    texts: Dict[str, str] = {}
+    corpus = gazette_corpus.get_corpus() if from_corpus else None
+    if corpus is not None:
+        try:
+            texts = await asyncio.to_thread(corpus.full_texts, page)
+        except Exception as e:
+            print(f"⚠️ Falha ao ler textos do corpus local: {e}")
+    missing = [g for g in page if g.get("txt_url") and g["txt_url"] not in texts]
+    if missing:
+        texts.update(await gazette_text_client.fetch_full_texts(missing))
+    return texts
+
+async def _analysis_events(
+    territory_id: str, since: str, until: str, keywords: str = None, partial: bool = False
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Pipeline de análise como sequência de eventos:
+        gazettes     - a cada página coletada (contagem parcial)
+        investments  - totais parciais por página de textos (só com `partial`)
+        entities     - estatísticas de entidades (NER concluída)
+        statistics   - estatísticas finais
+        qualitative  - análise do Gemini por diário
+        result/error - resultado final (encerra a sequência)
+    """
     print(f"🚀 Iniciando pipeline (keywords={keywords})...")
 
-    # 1. Coleta
+    # 1. Coleta paginada: a cada página, o download dos textos completos e a
+    # NER dos excerpts começam enquanto a próxima página ainda está chegando.
+    gazettes = []
+    pages = []
+    documents = []
+    text_tasks = []
+    ner_tasks = []
+
+    # Busca já coberta pelo corpus local: diários (e textos guardados) sem rede
+    local = await _search_corpus(territory_id, since, until, keywords)
+    if local is not None:
+        source = _local_pages(local["gazettes"])
+    else:
+        source = query_planner.iter_sharded_pages(territory_id, since, until, keywords=keywords)
+
     try:
-        gazette_data = await querido_diario_client.fetch_gazettes(territory_id, since, until, keywords=keywords)
-    except RequestError as e:
-        return {"error": "Erro de conexão"}
+        try:
+            async for page in source:
+                # Um documento por excerpt, sem o corte de 10k caracteres; o índice
+                # é a posição do diário na busca inteira.
+                page_documents = list(spacy_api_client.gazette_documents(page, cleaner=_clean_excerpt, start=len(gazettes)))
+                gazettes.extend(page)
+                pages.append(page)
+                documents.extend(page_documents)
+                # Textos completos baixados em paralelo (sem bloquear o event loop)
+                text_tasks.append(asyncio.create_task(_page_full_texts(page, from_corpus=local is not None)))
+                if page_documents:
+                    ner_tasks.append(asyncio.create_task(spacy_api_client.extract_entities_batch(page_documents)))
+                yield "gazettes", {"page": len(pages), "page_gazettes": len(page), "total_gazettes": len(gazettes)}
+        except RequestError:
+            yield "error", {"error": "Erro de conexão"}
+            return
+        except HTTPStatusError as e:
+            print(f"Erro HTTP ao buscar dados do Querido Diário: Status {e.response.status_code}")
+            gazettes = []
+        except Exception as e:
+            # Resposta malformada do upstream etc.: erro em JSON, não 500
+            print(f"Erro inesperado ao buscar dados do Querido Diário: {e}")
+            yield "error", {"error": "Erro ao buscar dados do Querido Diário."}
+            return
 
-    if not gazette_data or "gazettes" not in gazette_data or not gazette_data["gazettes"]:
-        return {"error": "Nenhum diário encontrado."}
+        if not gazettes:
+            yield "error", {"error": "Nenhum diário encontrado."}
+            return
+        gazette_data = {"total_gazettes": len(gazettes), "gazettes": gazettes}
 
-    # Agregação
-    all_raw_text_segments = []
-    for gazette in gazette_data["gazettes"]:
-        excerpt_list = gazette.get("excerpts", [])
-        if excerpt_list:
-            for text_segment in excerpt_list:
-                if text_segment:
-                    all_raw_text_segments.append(text_segment)
+        # Agregação
+        all_raw_text_segments = []
+        for gazette in gazette_data["gazettes"]:
+            excerpt_list = gazette.get("excerpts", [])
+            if excerpt_list:
+                for text_segment in excerpt_list:
+                    if text_segment:
+                        all_raw_text_segments.append(text_segment)
 
-    if not all_raw_text_segments:
-        return {"error": "Nenhum texto encontrado."}
+        if not all_raw_text_segments:
+            yield "error", {"error": "Nenhum texto encontrado."}
+            return
 
-    full_raw_text = " ".join(all_raw_text_segments)
+        full_raw_text = " ".join(all_raw_text_segments)
 
-    # 2. Limpeza
-    cleaned_text = data_cleaner.pre_filter_spacy_input(full_raw_text)
-    if not cleaned_text:
-        return {"error": "Texto vazio após limpeza."}
+        # 2. Limpeza
+        cleaned_text = data_cleaner.pre_filter_spacy_input(full_raw_text)
+        if not cleaned_text:
+            yield "error", {"error": "Texto vazio após limpeza."}
+            return
 
-    # 3. IA (SpaCy)
-    entities = await spacy_api_client.extract_entities(cleaned_text)
+        stats_gen = StatisticsGenerator()
 
-    # 4. Estatísticas
-    stats_gen = StatisticsGenerator()
-    entity_stats = stats_gen.calculate_entity_statistics(entities)
-    investment_stats = stats_gen.extract_investment_statistics(gazette_data["gazettes"])
-    
-    final_statistics = {**entity_stats, **investment_stats}
-    
-    # Debug: Verificar se o dinheiro está aqui
-    print(f"💰 [DEBUG ORCHESTRATOR] Total Investido encontrado: {final_statistics.get('total_invested')}")
-
-    # 5. Análise Qualitativa (Gemini)
-    qualitative_analysis = {}
-    if final_statistics.get("total_invested", 0) > 0 and gemini_client:
-         print("🧠 Acionando IA Generativa...")
-         qualitative_analysis = await gemini_client.analyze_investment_context(cleaned_text)
-
-    final_result = {
-        "meta": {
-            "source_territory": territory_id,
-            "period": f"{since} a {until}",
-            "search_keywords": str(keywords) if keywords else "padrão",
-            "generated_at": datetime.now().isoformat()
-        },
-        "data": {
-            **final_statistics,
-            "qualitative_analysis": qualitative_analysis
+        # 3. Textos completos: o agregado de investimentos de cada página é
+        # mesclado ao da busca (sem revarrer as páginas anteriores). Regex e
+        # digests são CPU-bound: rodam em uma thread, fora do event loop
+        full_texts = {}
+        investments = InvestmentAggregate()
+        for page_number, (page, text_task) in enumerate(zip(pages, text_tasks), 1):
+            page_texts = await text_task
+            full_texts.update(page_texts)
+            investments.update(await asyncio.to_thread(aggregate_gazettes, page, page_texts, generator=stats_gen))
+            if partial:
+                partial_stats = investments.to_statistics()
+                yield "investments", {
+                    "pages_done": page_number,
+                    "total_pages": len(pages),
+                    "total_invested": partial_stats["total_invested"],
+                    "investments_by_category": partial_stats["investments_by_category"],
+                }
+
+        if local is None:
+            await _ingest_corpus(territory_id, gazettes, full_texts, keywords, since, until)
+
+        # 4. IA (SpaCy): entidades agrupadas pelo índice do diário de origem
+        entities_by_gazette = {}
+        for page_entities in await asyncio.gather(*ner_tasks):
+            entities_by_gazette.update(page_entities)
+        entities = [ent for idx in sorted(entities_by_gazette) for ent in entities_by_gazette[idx]]
+
+        entity_stats = stats_gen.calculate_entity_statistics(entities)
+        yield "entities", entity_stats
+
+        # 5. Estatísticas
+        investment_stats = investments.to_statistics()
+
+        final_statistics = {**entity_stats, **investment_stats}
+        yield "statistics", final_statistics
+
+        # Debug: Verificar se o dinheiro está aqui
+        print(f"💰 [DEBUG ORCHESTRATOR] Total Investido encontrado: {final_statistics.get('total_invested')}")
+
+        # 6. Análise Qualitativa (Gemini)
+        qualitative_analysis = {}
+        qualitative_analysis_by_gazette = []
+        qualitative_analysis_coverage = {}
+        if final_statistics.get("total_invested", 0) > 0 and gemini_client:
+             print("🧠 Acionando IA Generativa...")
+             # Um trecho por diário, vários diários por chamada (ver analyze_snippets)
+             snippets = {}
+             for idx, text in documents:
+                 snippets[idx] = f"{snippets[idx]} {text}" if idx in snippets else text
+             selected = dict(list(snippets.items())[:LLM_MAX_GAZETTES])
+             # Resumo da busca inteira (texto limpo de todos os excerpts) e análise
+             # dos primeiros LLM_MAX_GAZETTES diários, em paralelo
+             qualitative_analysis, by_gazette = await asyncio.gather(
+                 gemini_client.analyze_investment_context(cleaned_text),
+                 gemini_client.analyze_snippets(selected),
+             )
+             qualitative_analysis_by_gazette = [
+                 {
+                     "date": gazette_data["gazettes"][idx].get("date"),
+                     "url": gazette_data["gazettes"][idx].get("url"),
+                     "analysis": analysis,
+                 }
+                 for idx, analysis in by_gazette.items()
+             ]
+             qualitative_analysis_coverage = {
+                 "analyzed_gazettes": len(selected),
+                 "gazettes_with_text": len(snippets),
+                 "truncated": len(snippets) > len(selected),
+             }
+             yield "qualitative", {
+                 "qualitative_analysis": qualitative_analysis,
+                 "qualitative_analysis_by_gazette": qualitative_analysis_by_gazette,
+                 "qualitative_analysis_coverage": qualitative_analysis_coverage,
+             }
+
+        final_result = {
+            "meta": {
+                "source_territory": territory_id,
+                "period": f"{since} a {until}",
+                "search_keywords": str(keywords) if keywords else "padrão",
+                "generated_at": datetime.now().isoformat()
+            },
+            "data": {
+                **final_statistics,
+                "qualitative_analysis": qualitative_analysis,
+                "qualitative_analysis_by_gazette": qualitative_analysis_by_gazette,
+                "qualitative_analysis_coverage": qualitative_analysis_coverage,
+            }
         }
-    }
 
-    if save_as_search:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"search_{territory_id}_{timestamp}.json"
-        save_json_file(final_result, filename, is_latest=True, latest_name="latest_search.json")
-    
-    return final_result
\ No newline at end of file
+        yield "result", final_result
+    finally:
+        # Saídas antecipadas (erro ou cliente desconectado) não deixam tarefas soltas
+        for task in text_tasks + ner_tasks:
+            task.cancel()
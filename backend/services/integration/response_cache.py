@@ -0,0 +1,221 @@
+# backend/services/integration/response_cache.py
+"""
+Cache de respostas para as consultas ao Querido Diário e para o pipeline de
+análise, com coalescência de requisições (single-flight).
+
+Consultas idênticas (mesmo território, período e palavra-chave) vindas do
+dashboard reaproveitam o resultado em vez de buscar no Querido Diário e
+rodar NER/estatísticas/LLM de novo. Se N requisições idênticas chegam ao
+mesmo tempo, só a primeira executa; as outras aguardam o mesmo resultado.
+
+Camadas:
+    1. memória  - LRU limitado por número de entradas (por processo)
+    2. disco    - opcional (RESPONSE_CACHE_DISK=1), compartilhado entre workers
+
+Períodos inteiramente no passado não mudam mais: ficam em cache por muito
+mais tempo que períodos que incluem hoje.
+
+Variáveis de ambiente (opcionais):
+    RESPONSE_CACHE_ENABLED      - "0" desativa o cache (padrão ativo)
+    RESPONSE_CACHE_MAX_ENTRIES  - entradas em memória (padrão 256)
+    RESPONSE_CACHE_TTL_RECENT   - TTL (s) de períodos que incluem hoje (padrão 600)
+    RESPONSE_CACHE_TTL_PAST     - TTL (s) de períodos já encerrados (padrão 7 dias)
+    RESPONSE_CACHE_DISK         - "1" ativa a camada em disco
+    RESPONSE_CACHE_DIR          - diretório da camada em disco
+"""
+import asyncio
+import copy
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256))
+RESPONSE_CACHE_TTL_RECENT = float(os.getenv("RESPONSE_CACHE_TTL_RECENT", 600))
+RESPONSE_CACHE_TTL_PAST = float(os.getenv("RESPONSE_CACHE_TTL_PAST", 7 * 24 * 3600))
+RESPONSE_CACHE_DISK = os.getenv("RESPONSE_CACHE_DISK", "0") == "1"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "cache" / "responses"
+
+
+def make_key(namespace: str, **params: Any) -> str:
+    """Chave estável para uma consulta (independe da ordem dos parâmetros)."""
+    payload = json.dumps({"ns": namespace, **params}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ttl_for_period(until: Union[str, date, None]) -> float:
+    """TTL longo se o período terminou antes de hoje, curto caso contrário."""
+    if isinstance(until, str):
+        try:
+            until = datetime.strptime(until[:10], "%Y-%m-%d").date()
+        except ValueError:
+            until = None
+    if isinstance(until, datetime):
+        until = until.date()
+    if until is not None and until < date.today():
+        return RESPONSE_CACHE_TTL_PAST
+    return RESPONSE_CACHE_TTL_RECENT
+
+
+def _is_cacheable(value: Any) -> bool:
+    # Respostas de erro ({"error": ...}) nunca vão para o cache
+    return not (isinstance(value, dict) and "error" in value)
+
+
+class ResponseCache:
+    """LRU em memória + camada opcional em disco, com single-flight."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Execuções em andamento, por event loop (TestClient / asyncio.run)
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # --- memória ---
+    def _memory_get(self, key: str) -> Optional[Any]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time.time() >= expires_at:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Any, expires_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # --- disco ---
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json.gz"
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Any]]:
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+        if time.time() >= entry.get("expires_at", 0):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return entry["expires_at"], entry["value"]
+
+    def _disk_put(self, key: str, value: Any, expires_at: float) -> None:
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    async def _lookup(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        if value is not None or self.disk_dir is None:
+            return value
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao ler cache de respostas: {e}")
+            return None
+        if entry is None:
+            return None
+        expires_at, value = entry
+        self._memory_put(key, value, expires_at)
+        return value
+
+    async def _store(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self._memory_put(key, value, expires_at)
+        if self.disk_dir is not None:
+            try:
+                await asyncio.to_thread(self._disk_put, key, value, expires_at)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gravar cache de respostas: {e}")
+
+    async def _compute_and_store(self, flight_key: Tuple[int, str], key: str,
+                                 compute: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        try:
+            value = await compute()
+            # Grava antes de publicar: quem chegar depois já encontra no cache
+            if _is_cacheable(value):
+                await self._store(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """
+        Retorna o valor em cache ou executa `compute()` UMA vez, mesmo com
+        várias chamadas simultâneas para a mesma chave. Cada chamador recebe
+        sua própria cópia.
+
+        O cálculo roda em uma task do próprio cache: se o chamador que o
+        iniciou for cancelado (cliente desconectou), os demais continuam
+        aguardando o mesmo resultado.
+        """
+        value = await self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            return copy.deepcopy(value)
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute_and_store(flight_key, key, compute, ttl))
+            # Evita o aviso "exception was never retrieved" quando todos desistiram
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[flight_key] = task
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self.hits = self.misses = 0
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Instância única por processo (None se o cache estiver desativado)."""
+    global _cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        disk_dir = None
+        if RESPONSE_CACHE_DISK:
+            disk_dir = os.getenv("RESPONSE_CACHE_DIR") or DEFAULT_CACHE_DIR
+        _cache = ResponseCache(disk_dir=disk_dir)
+    return _cache
+
+
+async def cached(namespace: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]], until=None) -> Any:
+    """Atalho: `compute()` passando pelo cache (ou direto, se desativado)."""
+    cache = get_response_cache()
+    if cache is None:
+        return await compute()
+    return await cache.get_or_compute(make_key(namespace, **params), compute, ttl_for_period(until))
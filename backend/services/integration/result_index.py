@@ -0,0 +1,298 @@
+# backend/services/integration/result_index.py
+"""
+Índice de metadados dos resultados salvos em data_output.
+
+Listar os resultados abria e fazia `json.load` de TODOS os arquivos a cada
+requisição (custo proporcional ao total de bytes salvos). Aqui cada arquivo
+vira uma linha em um SQLite ao lado dos resultados (território, período,
+palavra-chave, totais, tamanho e mtime), gravada por `save_json_file` no
+momento em que o arquivo é salvo. A listagem é paginada e respondida só
+pelo índice.
+
+Arquivos criados, alterados ou removidos por fora (cópia manual, limpeza)
+são reconciliados por um `os.scandir` do diretório, feito apenas quando o
+mtime do diretório muda; só os arquivos novos/alterados são lidos. O
+SQLite fica em um subdiretório (`.index/`) para que as próprias escritas do
+índice não alterem o mtime de data_output.
+
+A listagem aceita filtros (território, tipo, período) resolvidos no SQLite,
+paginação por cursor (estável enquanto novos arquivos chegam) e um modo
+resumo servido do índice: `meta` + totais principais, sem abrir o arquivo.
+"""
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.integration import result_store
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR_NAME = ".index"
+# Incrementar quando o esquema mudar: o índice é reconstruído a partir dos arquivos
+SCHEMA_VERSION = 2
+
+_COLUMNS = (
+    "name", "type", "territory_id", "period", "period_start", "period_end", "keywords", "generated_at",
+    "total_invested", "total_gazettes", "total_entities", "size", "modified", "error", "meta",
+)
+# Colunas devolvidas na listagem (`meta` vai só para o modo resumo)
+LIST_COLUMNS = tuple(c for c in _COLUMNS if c != "meta")
+HEADLINE_TOTALS = ("total_invested", "total_gazettes", "total_entities")
+
+
+def result_type(name: str) -> str:
+    """Tipo do resultado pelo nome do arquivo (mesma regra do /data_output)."""
+    return "analysis" if "analysis" in name else "comparison" if "compare" in name else "search"
+
+
+def _period_bounds(meta: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Início/fim (AAAA-MM-DD) do período analisado, quando conhecidos."""
+    start, end = meta.get("date_range_start"), meta.get("date_range_end")
+    period = meta.get("period") or ""
+    if not (start or end) and " a " in period:
+        start, end = (part.strip() for part in period.split(" a ", 1))
+
+    def _valid(value):
+        value = str(value or "")[:10]
+        return value if len(value) == 10 and value[4] == "-" and value[7] == "-" else None
+
+    return _valid(start), _valid(end)
+
+
+def summarize(name: str, content: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados indexados de um resultado (meta + totais principais)."""
+    meta = content.get("meta") or {}
+    data = content.get("data") or {}
+    total_gazettes = data.get("total_gazettes")
+    if total_gazettes is None:
+        gazettes = content.get("gazettes")
+        if isinstance(gazettes, list):
+            total_gazettes = len(gazettes)
+    period_start, period_end = _period_bounds(meta)
+    return {
+        "name": name,
+        "type": result_type(name),
+        "territory_id": meta.get("source_territory", "unknown"),
+        "period": meta.get("period"),
+        "period_start": period_start,
+        "period_end": period_end,
+        "keywords": meta.get("search_keywords"),
+        "generated_at": meta.get("generated_at"),
+        "total_invested": data.get("total_invested"),
+        "total_gazettes": total_gazettes,
+        "total_entities": data.get("total_entities"),
+        "error": None,
+        "meta": json.dumps(meta, ensure_ascii=False, default=str),
+    }
+
+
+def summary_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Versão resumida de um resultado (mesma forma do arquivo: meta + data)."""
+    return {
+        "meta": json.loads(row["meta"]) if row.get("meta") else {},
+        "data": {total: row.get(total) for total in HEADLINE_TOTALS},
+    }
+
+
+def project(content: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Só os caminhos pedidos (ex.: "meta", "data.total_invested") do resultado."""
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        parts = field.split(".")
+        value: Any = content
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["modified"], row["name"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Posição (mtime, nome) codificada por `encode_cursor`; ValueError se inválida."""
+    try:
+        modified, name = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(modified), str(name)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+class ResultIndex:
+    """Índice SQLite de um diretório de resultados."""
+
+    def __init__(self, data_dir: Path, db_path: Optional[Path] = None):
+        self.data_dir = Path(data_dir)
+        if db_path is None:
+            db_path = self.data_dir / INDEX_DIR_NAME / "results.sqlite"
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._dir_mtime: Optional[int] = None
+        with self._lock, self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Índice é derivado dos arquivos: esquema antigo é descartado e refeito no sync
+                self._conn.execute("DROP TABLE IF EXISTS results")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " name TEXT PRIMARY KEY, type TEXT, territory_id TEXT, period TEXT,"
+                " period_start TEXT, period_end TEXT, keywords TEXT, generated_at TEXT,"
+                " total_invested REAL, total_gazettes INTEGER, total_entities INTEGER,"
+                " size INTEGER, modified REAL, error TEXT, meta TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_modified ON results (modified DESC, name DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_territory ON results (territory_id, type)")
+
+    # --- escrita ---
+    def _upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO results ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                tuple(row.get(column) for column in _COLUMNS),
+            )
+
+    def record(self, path: Path, content: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Indexa um arquivo de resultado. `content` evita reler o arquivo quando
+        quem chama acabou de gravá-lo.
+        """
+        path = Path(path)
+        stat = path.stat()
+        try:
+            if content is None:
+                content = result_store.read_document(path)
+            row = summarize(path.name, content)
+        except Exception as e:
+            logger.warning(f"⚠️ Resultado ilegível no índice: {path.name} ({e})")
+            row = {"name": path.name, "type": result_type(path.name), "error": str(e)}
+        row.update(size=stat.st_size, modified=stat.st_mtime)
+        self._upsert(row)
+
+    def remove(self, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE name = ?", (name,))
+
+    # --- reconciliação com o diretório ---
+    def sync(self, force: bool = False) -> None:
+        """Reconcilia o índice com o diretório (só se o diretório mudou)."""
+        try:
+            dir_mtime = self.data_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and dir_mtime == self._dir_mtime:
+            return
+
+        with self._lock:
+            indexed = {
+                row["name"]: (row["size"], row["modified"])
+                for row in self._conn.execute("SELECT name, size, modified FROM results")
+            }
+        on_disk = set()
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not result_store.is_result_file(entry.name) or not entry.is_file():
+                    continue
+                on_disk.add(entry.name)
+                stat = entry.stat()
+                if indexed.get(entry.name) != (stat.st_size, stat.st_mtime):
+                    self.record(Path(entry.path))
+        for name in indexed.keys() - on_disk:
+            self.remove(name)
+        self._dir_mtime = dir_mtime
+
+    # --- leitura ---
+    def list(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        exclude_prefix: Optional[str] = None,
+        territory_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_meta: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        Página de resultados (mais recentes primeiro), o total que atende aos
+        filtros e o cursor da próxima página (None na última).
+
+        `since`/`until` filtram pelo período analisado (sobreposição com o
+        intervalo pedido). Com `cursor`, `offset` é ignorado.
+        """
+        self.sync()
+        clauses, params = [], []
+        if exclude_prefix:
+            clauses.append("name NOT LIKE ?")
+            params.append(f"{exclude_prefix}%")
+        if territory_id:
+            clauses.append("territory_id = ?")
+            params.append(territory_id)
+        if kind:
+            clauses.append("type = ?")
+            params.append(kind)
+        if since:
+            clauses.append("period_end >= ?")
+            params.append(since)
+        if until:
+            clauses.append("period_start <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        page_clauses, page_params = list(clauses), list(params)
+        if cursor:
+            modified, name = decode_cursor(cursor)
+            page_clauses.append("(modified < ? OR (modified = ? AND name < ?))")
+            page_params += [modified, modified, name]
+            offset = 0
+        page_where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        columns = ", ".join(_COLUMNS if with_meta else LIST_COLUMNS)
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM results {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM results {page_where} ORDER BY modified DESC, name DESC LIMIT ? OFFSET ?",
+                page_params + [limit + 1, offset],
+            ).fetchall()
+        # `error` só aparece nos arquivos que não puderam ser lidos
+        rows = [{k: v for k, v in dict(row).items() if k != "error" or v} for row in rows]
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], total, next_cursor
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[Path, ResultIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_result_index(data_dir) -> ResultIndex:
+    """Um índice por diretório de resultados (por processo)."""
+    key = Path(data_dir).resolve()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ResultIndex(key)
+        return index
+
+
+def load_result(data_dir, name: str) -> Dict[str, Any]:
+    """Conteúdo completo de um resultado listado (ver `result_store`)."""
+    return result_store.get_result_store(data_dir).load(name)
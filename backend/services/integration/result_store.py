@@ -0,0 +1,134 @@
+# backend/services/integration/result_store.py
+"""
+Armazenamento compacto dos resultados salvos em data_output.
+
+Antes cada resultado era gravado até três vezes (cópia do frontend, cópia
+do backend e `latest_search.json`), sempre em JSON com `indent=2`, e as
+buscas salvas carregavam o array completo de diários. Aqui:
+
+  * cada resultado é gravado UMA vez, em JSON compacto + gzip
+    (`<nome>.json.gz`), via arquivo temporário + `os.replace` (atômico);
+  * cada arquivo é autocontido: os diários de uma busca (`gazettes`) vão
+    dentro do próprio `.json.gz` (o gzip já compacta a repetição dos
+    excerpts), então copiar ou versionar o arquivo basta para reabri-lo;
+  * "latest_search.json" é um ponteiro para o último resultado, servido
+    pelo backend (`/data_output/latest_search.json`) em vez de copiado para
+    o `public/` do frontend.
+
+Arquivos `.json` antigos continuam legíveis por `load`.
+"""
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+STORE_DIR_NAME = ".store"
+COMPRESSED_SUFFIX = ".json.gz"
+GZIP_LEVEL = 6
+
+
+def stored_name(filename: str) -> str:
+    """'search_x.json' -> 'search_x.json.gz' (nome do arquivo em disco)."""
+    if filename.endswith(COMPRESSED_SUFFIX):
+        return filename
+    if filename.endswith(".json"):
+        filename = filename[:-len(".json")]
+    return filename + COMPRESSED_SUFFIX
+
+
+def is_result_file(name: str) -> bool:
+    return name.endswith(".json") or name.endswith(COMPRESSED_SUFFIX)
+
+
+def _compact(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def read_document(path: Path) -> Dict[str, Any]:
+    """Documento como está em disco (`.json.gz` ou `.json` antigo)."""
+    path = Path(path)
+    if path.name.endswith(COMPRESSED_SUFFIX):
+        with gzip.open(path, "rb") as f:
+            return json.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ResultStore:
+    """Resultados de um diretório (data_output), um arquivo autocontido por resultado."""
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._meta_dir = self.data_dir / STORE_DIR_NAME
+        self._meta_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+
+    # --- resultados ---
+    def _write(self, path: Path, document: Dict[str, Any]) -> None:
+        # Temporário sem extensão .json: invisível para o índice e o frontend
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as f:
+                f.write(_compact(document))
+        os.replace(tmp, path)
+
+    def save(self, filename: str, data: Dict[str, Any]) -> Path:
+        """Grava o resultado compactado (atômico) e devolve o caminho em disco."""
+        path = self.data_dir / stored_name(filename)
+        self._write(path, data)
+        return path
+
+    def resolve(self, filename: str) -> Optional[Path]:
+        """Caminho em disco de um resultado (nome .json, .json.gz ou ponteiro "latest")."""
+        target = self._pointers().get(filename)
+        if target and (self.data_dir / target).is_file():
+            return self.data_dir / target
+        for candidate in (filename, stored_name(filename)):
+            path = self.data_dir / candidate
+            if path.is_file():
+                return path
+        return None
+
+    def load(self, filename: str) -> Dict[str, Any]:
+        """Resultado completo; FileNotFoundError se não existir."""
+        path = self.resolve(filename)
+        if path is None:
+            raise FileNotFoundError(filename)
+        return read_document(path)
+
+    # --- ponteiros (latest_search.json) ---
+    def _pointers(self) -> Dict[str, str]:
+        try:
+            with open(self._meta_dir / "pointers.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def set_pointer(self, name: str, target: Path) -> None:
+        """Aponta `name` (ex.: latest_search.json) para um resultado salvo."""
+        with self._lock:
+            pointers = self._pointers()
+            pointers[name] = Path(target).name
+            tmp = self._meta_dir / f"pointers.json.{os.getpid()}.tmp"
+            tmp.write_text(json.dumps(pointers, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self._meta_dir / "pointers.json")
+
+    def close(self) -> None:
+        """Nada a liberar: não há conexão aberta entre as operações."""
+
+
+_stores: Dict[Path, ResultStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_result_store(data_dir) -> ResultStore:
+    """Um store por diretório de resultados (por processo)."""
+    key = Path(data_dir).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ResultStore(key)
+        return store
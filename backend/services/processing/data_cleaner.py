@@ -1,5 +1,53 @@
 # backend/services/processing/data_cleaner.py
+"""
+Limpeza dos textos dos diários antes da NER.
+
+`pre_filter_spacy_input` é um filtro em streaming: os padrões são compilados
+uma única vez (no import) e o texto é consumido em blocos, linha a linha,
+até o orçamento de saída (`max_length`) ser atingido. Em textos completos de
+vários MB, o restante do texto nem chega a ser lido.
+"""
 import re
+from typing import Iterable, Iterator, Optional
+
+# Tags HTML (podem atravessar quebras de linha)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Padrões que removem a LINHA INTEIRA se casarem
+_FULL_LINE_JUNK_RE = re.compile(
+    r'^(Página \d+ de \d+)$'
+    r'|^(Diário Oficial (do Município|Nº)[\s\d\w]+)$'
+    r'|^(Assinado Digitalmente (por|via):.*)$'
+    r'|^(\d{1,2}[/\.]\d{1,2}[/\.]\d{2,4})$'
+    # Remove linhas que COMEÇAM com 3+ pontos/hifens/etc.
+    r'|^\s*[\.\-\_=\*]{3,}.*$'
+    r'|^(Publique-se|Cumpra-se|Resolve:)$'
+    , re.IGNORECASE
+)
+
+# Padrões que removem SÓ O PADRÃO (partes da linha)
+_PARTIAL_JUNK_RE = re.compile(
+    r'\bArt\. \d+º?'
+    r'|\b§ \d+º?'
+    r'|\bInciso [IVXLCDM]+\b'
+    r'|\d{3}\.\d{3}\.\d{3}-\d{2}'
+    r'|\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}'
+    r'|\b[A-Fa-f0-9]{20,}\b'
+    r'|Data: \d{1,2}[/\.]\d{1,2}[/\.]\d{2,4}'
+    , re.IGNORECASE
+)
+
+# Caracteres em que `str.splitlines` quebra linha
+_LINE_BREAKS = frozenset("\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029")
+_LINE_BREAK_RE = re.compile("[" + "".join(sorted(_LINE_BREAKS)) + "]")
+# Tamanho dos blocos em que um texto já carregado é consumido
+CHUNK_SIZE = 64 * 1024
+# Linhas menores que isso (após a limpeza) são descartadas
+MIN_LINE_LENGTH = 15
+# Início de tag HTML e o máximo de texto segurado esperando o '>' dela
+_OPEN_TAG_RE = re.compile(r'<[A-Za-z/!]')
+MAX_OPEN_TAG = CHUNK_SIZE
 
 def clean_text_for_ia(text: str) -> str:
     """
@@ -9,86 +57,104 @@ def clean_text_for_ia(text: str) -> str:
         return ""
         
     # Remove tags HTML (exemplo simples)
-    text = re.sub(r'<[^>]+>', ' ', text)
+    text = _HTML_TAG_RE.sub(' ', text)
     
     # Remove quebras de linha excessivas
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WHITESPACE_RE.sub(' ', text).strip()
     
     # Limita o texto para 10000 caracteres para a IA não sobrecarregar
     return text[:10000]
 
-def pre_filter_spacy_input(raw_text: str) -> str:
+def _text_chunks(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def _complete_lines(chunks: Iterable[str]) -> Iterator[str]:
     """
-    Algoritmo de pré-filtragem avançado para limpar texto ANTES de enviar ao Spacy.
-    Remove "juncos" comuns de diários oficiais que confundem o NER.
-    (Versão Corrigida 3)
+    Junta blocos em trechos de linhas completas, já sem HTML. Uma linha
+    incompleta fica para o próximo bloco (em pedaços, sem recopiar a cada
+    bloco). Uma tag `<...` ainda aberta também fica, desde que pareça tag
+    (`<a`, `</`, `<!`) e o trecho segurado não passe de MAX_OPEN_TAG: um `<`
+    solto ("valor < limite") não arrasta o resto do texto de bloco em bloco.
     """
-    if not raw_text:
-        return ""
-
-    # 1. Limpeza básica inicial (HTML)
-    text = re.sub(r'<[^>]+>', ' ', raw_text)
-
-    # 2. Padrões de regex
-    # Padrões que removem a LINHA INTEIRA se casarem
-    full_line_junk_patterns = re.compile(
-        r'^(Página \d+ de \d+)$'
-        r'|^(Diário Oficial (do Município|Nº)[\s\d\w]+)$'
-        r'|^(Assinado Digitalmente (por|via):.*)$'
-        r'|^(\d{1,2}[/\.]\d{1,2}[/\.]\d{2,4})$'
-        # --- CORREÇÃO 1 (Junk Patterns): ---
-        # Remove linhas que COMEÇAM com 3+ pontos/hifens/etc.
-        r'|^\s*[\.\-\_=\*]{3,}.*$' 
-        r'|^(Publique-se|Cumpra-se|Resolve:)$'
-        , re.IGNORECASE
-    )
-
-    # Padrões que removem SÓ O PADRÃO (partes da linha)
-    partial_junk_patterns = re.compile(
-        r'\bArt\. \d+º?'
-        r'|\b§ \d+º?'
-        r'|\bInciso [IVXLCDM]+\b'
-        r'|\d{3}\.\d{3}\.\d{3}-\d{2}'
-        r'|\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}'
-        r'|\b[A-Fa-f0-9]{20,}\b'
-        r'|Data: \d{1,2}[/\.]\d{1,2}[/\.]\d{2,4}'
-        # (Removido o removedor parcial de '...' daqui, pois o full_line deve pegar)
-        , re.IGNORECASE
-    )
-
-    cleaned_lines = []
-    for line in text.splitlines():
-        # 3. Remove espaços em branco no início/fim
-        line = line.strip()
-
-        # 4. Pular linhas que ficaram vazias
-        if not line:
+    pending = []
+    for chunk in chunks:
+        if not chunk:
             continue
-
-        # 5. Pular linhas que SÃO lixo (linha inteira)
-        if full_line_junk_patterns.match(line):
+        if pending and not _LINE_BREAK_RE.search(chunk):
+            # Ainda na mesma linha: só acumula
+            pending.append(chunk)
             continue
-            
-        # 6. Pular linhas que são SÓ MAIÚSCULAS (cabeçalhos)
-        if (line.upper() == line) and any(c.isalpha() for c in line) and len(line) < 100:
+        pending.append(chunk)
+        lines = "".join(pending).splitlines(True)
+        pending = [] if lines[-1][-1] in _LINE_BREAKS else [lines.pop()]
+        if not lines:
             continue
+        complete = "".join(lines)
+        # Tag aberta sem '>' depois: pode fechar em um bloco seguinte
+        open_tag = complete.rfind("<")
+        if open_tag > complete.rfind(">") and _OPEN_TAG_RE.match(complete, open_tag):
+            line_start = max(complete.rfind(ch, 0, open_tag) for ch in _LINE_BREAKS) + 1
+            held = len(complete) - line_start + sum(len(piece) for piece in pending)
+            if held <= MAX_OPEN_TAG:
+                pending.insert(0, complete[line_start:])
+                complete = complete[:line_start]
+                if not complete:
+                    continue
+        yield _HTML_TAG_RE.sub(' ', complete)
+    if pending:
+        yield _HTML_TAG_RE.sub(' ', "".join(pending))
 
-        # 7. Remover PARTES de lixo da linha
-        line = partial_junk_patterns.sub('', line)
-        
-        # 8. Limpar espaços de novo
-        line = line.strip()
+def iter_clean_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Linhas úteis (já limpas) de um texto recebido em blocos ou linhas.
+    Remove HTML, linhas de lixo, cabeçalhos em maiúsculas e trechos de
+    lixo (artigos, CPFs/CNPJs, hashes...).
+    """
+    for block in _complete_lines(chunks):
+        for line in block.splitlines():
+            # Remove espaços em branco no início/fim e pula linhas vazias
+            line = line.strip()
+            if not line:
+                continue
 
-        # --- CORREÇÃO 2 (HTML/Espaços): ---
-        # Reduz o filtro de comprimento para não descartar "Texto com"
-        if len(line) < 15: # <-- Reduzido de 15 para 5
-            continue
+            # Pular linhas que SÃO lixo (linha inteira)
+            if _FULL_LINE_JUNK_RE.match(line):
+                continue
 
-        # 10. Se a linha sobreviveu, adicione
-        cleaned_lines.append(line)
+            # Pular linhas que são SÓ MAIÚSCULAS (cabeçalhos)
+            if len(line) < 100 and line.upper() == line and any(c.isalpha() for c in line):
+                continue
 
-    # 11. Juntar e finalizar
-    final_text = " ".join(cleaned_lines)
-    final_text = re.sub(r'\s+', ' ', final_text).strip()
-    
-    return final_text[:10000]
\ No newline at end of file
+            # Remover PARTES de lixo da linha
+            line = _PARTIAL_JUNK_RE.sub('', line).strip()
+            if len(line) < MIN_LINE_LENGTH:
+                continue
+
+            yield _WHITESPACE_RE.sub(' ', line)
+
+def clean_stream(chunks: Iterable[str], max_length: Optional[int] = 10000) -> str:
+    """
+    Texto limpo a partir de blocos/linhas, parando de consumir a entrada
+    assim que `max_length` caracteres de saída foram produzidos.
+    """
+    parts = []
+    length = 0
+    for line in iter_clean_lines(chunks):
+        parts.append(line)
+        length += len(line) + (1 if length else 0)
+        if max_length is not None and length >= max_length:
+            break
+    final_text = " ".join(parts)
+    return final_text[:max_length] if max_length is not None else final_text
+
+def pre_filter_spacy_input(raw_text: str, max_length: Optional[int] = 10000) -> str:
+    """
+    Algoritmo de pré-filtragem avançado para limpar texto ANTES de enviar ao Spacy.
+    Remove "juncos" comuns de diários oficiais que confundem o NER.
+
+    `max_length=None` não trunca (NER em lote, um documento por excerpt).
+    """
+    if not raw_text:
+        return ""
+    return clean_stream(_text_chunks(raw_text), max_length)
@@ -0,0 +1,125 @@
+# backend/services/processing/investment_batch.py
+"""
+Motor em lote (colunar) para a extração dos valores de investimento.
+
+Em vez de percorrer diário por diário, todos os textos do lote são
+concatenados em um único corpus:
+
+  1. uma única varredura do regex monetário devolve valores e offsets;
+  2. o parsing (em centavos inteiros) e o filtro de faixa são operações
+     NumPy/pandas sobre colunas;
+  3. a classificação de cada valor usa o índice de termos do corpus
+     (`InvestmentClassifier`), com a janela limitada ao próprio diário.
+
+`classify_money` (os valores classificados de cada texto) alimenta os fatos
+por diário de `investment_facts`, que somam as estatísticas.
+"""
+import re
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from services.processing.statistics_generator import CLASSIFIER
+
+# Separador entre diários no corpus: não é dígito (o regex monetário não o
+# atravessa) nem aparece em nenhum termo do classificador.
+_SEPARATOR = "\x00"
+
+# Mesmo valor capturado pelo grupo 1 de MONEY_RE
+_DIGITS_RE = re.compile(r"\d{1,3}(?:\.\d{3})*,\d{2}")
+
+# Faixa aceita, em centavos (R$ 100,00 .. R$ 100.000.000,00)
+_MIN_CENTS = 100 * 100
+_MAX_CENTS = 100_000_000 * 100
+# Valores com mais dígitos que isso já estão fora da faixa (e evitam overflow)
+_MAX_DIGITS = len(str(_MAX_CENTS))
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "gazette": pd.Series(dtype="int64"),
+        "start": pd.Series(dtype="int64"),
+        "end": pd.Series(dtype="int64"),
+        "raw": pd.Series(dtype="object"),
+    })
+
+
+def _find_money(corpus: str) -> pd.DataFrame:
+    """
+    Todos os valores monetários do corpus em uma única varredura.
+
+    Equivale a `MONEY_RE`, mas o padrão começa pelo dígito (o motor de regex
+    pula direto para os dígitos) e o prefixo opcional "R$" é verificado depois,
+    só para ajustar o início do match.
+    """
+    rows = [(m.start(), m.end(), m.group()) for m in _DIGITS_RE.finditer(corpus)]
+    if not rows:
+        return _empty_frame()
+    starts, ends, raws = zip(*rows)
+    starts = list(starts)
+    for i, s in enumerate(starts):
+        if s >= 2 and corpus[s - 1] == "$":
+            if corpus[s - 2] == "R":
+                starts[i] = s - 2
+        elif s >= 3 and corpus[s - 1].isspace() and corpus[s - 3:s - 1] == "R$":
+            starts[i] = s - 3
+    return pd.DataFrame({
+        "start": np.fromiter(starts, dtype=np.int64, count=len(starts)),
+        "end": np.fromiter(ends, dtype=np.int64, count=len(ends)),
+        "raw": pd.Series(raws, dtype="object"),
+    })
+
+
+def _parse_cents(raw: pd.Series) -> pd.Series:
+    """'1.234,56' -> 123456 (int64); valores grandes demais viram -1."""
+    digits = raw.str.replace(".", "", regex=False).str.replace(",", "", regex=False)
+    fits = digits.str.len() <= _MAX_DIGITS
+    cents = pd.Series(-1, index=raw.index, dtype="int64")
+    if fits.any():
+        cents[fits] = digits[fits].astype("int64")
+    return cents
+
+
+def classify_money(texts: List[str]) -> pd.DataFrame:
+    """
+    Valores de investimento classificados de vários textos em uma varredura:
+    uma linha por valor com `gazette` (índice do texto), `start`/`end`
+    (offsets no próprio texto), `cents` e `category`.
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    bounds_start = np.zeros(len(texts), dtype=np.int64)
+    if len(texts) > 1:
+        bounds_start[1:] = np.cumsum(lengths[:-1] + len(_SEPARATOR))
+    bounds_end = bounds_start + lengths
+    corpus = _SEPARATOR.join(texts)
+
+    # --- Valores monetários: parsing e filtro de faixa colunares ---
+    money = _find_money(corpus)
+    if not money.empty:
+        money["gazette"] = np.searchsorted(bounds_start, money["start"].to_numpy(), side="right") - 1
+        money["cents"] = _parse_cents(money["raw"])
+        money = money[(money["cents"] >= _MIN_CENTS) & (money["cents"] <= _MAX_CENTS)].copy()
+
+    # --- Classificação por offset no índice do corpus ---
+    if money.empty:
+        return pd.DataFrame({
+            "gazette": pd.Series(dtype="int64"),
+            "start": pd.Series(dtype="int64"),
+            "end": pd.Series(dtype="int64"),
+            "cents": pd.Series(dtype="int64"),
+            "category": pd.Series(dtype="object"),
+        })
+    index = CLASSIFIER.index(corpus)
+    gaz = money["gazette"].to_numpy()
+    lo = bounds_start[gaz]
+    hi = bounds_end[gaz]
+    money["category"] = index.classify_many(zip(
+        money["start"].tolist(), money["end"].tolist(), lo.tolist(), hi.tolist()
+    ))
+    money = money[money["category"].notna()].copy()
+    offset = bounds_start[money["gazette"].to_numpy()]
+    money["start"] -= offset
+    money["end"] -= offset
+    return money[["gazette", "start", "end", "cents", "category"]]
+
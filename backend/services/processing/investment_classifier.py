@@ -0,0 +1,237 @@
+# backend/services/processing/investment_classifier.py
+"""
+Classificador pré-compilado dos valores monetários de um diário.
+
+Antes, para CADA valor R$ encontrado, o StatisticsGenerator recortava uma
+janela de ~1.000 caracteres e varria nela todos os termos de exclusão e todas
+as palavras-chave (montando um regex por palavra). Aqui o texto é
+indexado UMA vez: as ocorrências de todos os termos viram listas ordenadas de
+offsets, e cada valor é classificado por busca binária nessa tabela.
+
+A semântica é a mesma da janela original:
+  * termos de exclusão casam como substring em qualquer ponto da janela;
+  * palavras-chave e termos obrigatórios exigem borda de palavra (`\\b`),
+    avaliada como se a janela tivesse sido recortada do texto.
+"""
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _is_word_char(ch: str) -> bool:
+    return bool(_WORD_CHAR.match(ch))
+
+
+class _Occurrences:
+    """
+    Ocorrências de um grupo de termos no texto, ordenadas pelo offset inicial.
+    `segments` restringe a busca a trechos [a, b) do texto (as janelas que
+    realmente precisam ser classificadas). Bordas de palavra são verificadas
+    só quando necessário.
+    """
+
+    __slots__ = ("text", "starts", "ends")
+
+    def __init__(self, text: str, terms: Iterable[str], segments: Optional[Sequence[Tuple[int, int]]] = None):
+        self.text = text
+        segments = segments if segments is not None else [(0, len(text))]
+        found = []
+        for term in terms:
+            size = len(term)
+            for seg_start, seg_end in segments:
+                idx = text.find(term, seg_start, seg_end)
+                while idx != -1:
+                    found.append((idx, idx + size))
+                    idx = text.find(term, idx + 1, seg_end)
+        found.sort()
+        self.starts = [s for s, _ in found]
+        self.ends = [e for _, e in found]
+
+    def in_window(self, win_start: int, win_end: int, word_boundary: bool) -> bool:
+        """Existe ocorrência inteiramente dentro de [win_start, win_end)?"""
+        starts, ends, text = self.starts, self.ends, self.text
+        i = bisect_left(starts, win_start)
+        while i < len(starts) and starts[i] < win_end:
+            pos, end = starts[i], ends[i]
+            i += 1
+            if end > win_end:
+                continue
+            if not word_boundary:
+                return True
+            # Na borda da janela o recorte cria uma fronteira de palavra
+            if pos != win_start and _is_word_char(text[pos - 1]):
+                continue
+            if end != win_end and _is_word_char(text[end]):
+                continue
+            return True
+        return False
+
+
+def _merge_windows(windows: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Une janelas sobrepostas/encostadas em trechos contínuos."""
+    merged: List[Tuple[int, int]] = []
+    for win_start, win_end in sorted(windows):
+        if merged and win_start <= merged[-1][1]:
+            if win_end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], win_end)
+        else:
+            merged.append((win_start, win_end))
+    return merged
+
+
+class TextIndex:
+    """Índice de termos de um texto; classifica valores pelo offset."""
+
+    # Se as janelas cobrem mais que isso do texto, indexa o texto inteiro
+    FULL_SCAN_RATIO = 0.5
+
+    def __init__(self, classifier: "InvestmentClassifier", text: str):
+        self._classifier = classifier
+        self._text = text
+        self._text_len = len(text)
+        self._lowered = text.lower()
+        # str.lower() pode alterar o tamanho (ex.: 'İ'); nesse caso os offsets
+        # não batem e cai-se no caminho por janela.
+        self._aligned = len(self._lowered) == self._text_len
+        self._full_groups = None
+        if self._aligned:
+            # Termos obrigatórios primeiro: são poucos e descartam a maioria
+            # dos valores antes de buscar exclusões e subcategorias.
+            self._required = [(t, _Occurrences(self._lowered, (t,))) for t in classifier.required_terms]
+
+    def _groups(self, segments: Optional[Sequence[Tuple[int, int]]] = None):
+        """Ocorrências de (exclusões, [(categoria, palavras-chave)])."""
+        c = self._classifier
+        exclusions = _Occurrences(self._lowered, c.exclusion_terms, segments)
+        categories = [
+            (category, _Occurrences(self._lowered, keywords, segments))
+            for category, keywords in c.categories
+        ]
+        return exclusions, categories
+
+    def _window(self, start: int, end: int, lo: int, hi: Optional[int]) -> Tuple[int, int]:
+        w = self._classifier.window
+        return max(lo, start - w), min(self._text_len if hi is None else hi, end + w)
+
+    def _required_found(self, win_start: int, win_end: int) -> List[str]:
+        return [t for t, occ in self._required if occ.in_window(win_start, win_end, word_boundary=True)]
+
+    def _classify_with(self, groups, win_start: int, win_end: int, required: List[str]) -> Optional[str]:
+        exclusions, categories = groups
+        if exclusions.in_window(win_start, win_end, word_boundary=False):
+            return None
+        for category, occ in categories:
+            if occ.in_window(win_start, win_end, word_boundary=True):
+                return category
+        return self._classifier.fallback_category(required)
+
+    def classify(self, start: int, end: int, lo: int = 0, hi: Optional[int] = None) -> Optional[str]:
+        """
+        Categoria do valor monetário em `text[start:end]`, ou None se ele deve
+        ser descartado (termo de exclusão ou sem relação com software/robótica).
+
+        `lo`/`hi` limitam a janela quando o texto indexado é a concatenação de
+        vários diários (a janela não atravessa o diário vizinho).
+        """
+        win_start, win_end = self._window(start, end, lo, hi)
+
+        if not self._aligned:
+            return self._classifier.classify_window(self._text[win_start:win_end].lower())
+
+        required = self._required_found(win_start, win_end)
+        if not required:
+            return None
+        if self._full_groups is None:
+            self._full_groups = self._groups()
+        return self._classify_with(self._full_groups, win_start, win_end, required)
+
+    def classify_many(self, spans: Iterable[Tuple[int, int, int, int]]) -> List[Optional[str]]:
+        """
+        Classifica vários valores `(start, end, lo, hi)` de uma vez. Exclusões e
+        subcategorias só são buscadas nos trechos cobertos pelas janelas que
+        passaram pelo filtro de software/robótica.
+        """
+        windows = [self._window(start, end, lo, hi) for start, end, lo, hi in spans]
+        if not self._aligned:
+            return [self._classifier.classify_window(self._text[a:b].lower()) for a, b in windows]
+
+        required = [self._required_found(a, b) for a, b in windows]
+        candidates = [w for w, req in zip(windows, required) if req]
+        if not candidates:
+            return [None] * len(windows)
+
+        groups = self._full_groups
+        if groups is None:
+            segments = _merge_windows(candidates)
+            if sum(b - a for a, b in segments) > self.FULL_SCAN_RATIO * self._text_len:
+                groups = self._full_groups = self._groups()
+            else:
+                groups = self._groups(segments)
+
+        return [
+            self._classify_with(groups, a, b, req) if req else None
+            for (a, b), req in zip(windows, required)
+        ]
+
+
+class InvestmentClassifier:
+    """
+    Construído uma vez (no import do StatisticsGenerator) a partir de
+    CATEGORY_MAP e EXCLUSION_TERMS.
+    """
+
+    def __init__(
+        self,
+        category_map: Dict[str, Sequence[str]],
+        exclusion_terms: Iterable[str],
+        required_terms: Tuple[str, ...] = ("software", "robótica"),
+        fallback: Dict[str, str] = None,
+        default_category: str = "Outros",
+        window: int = 500,
+    ):
+        self.window = window
+        self.default_category = default_category
+        self.exclusion_terms: Tuple[str, ...] = tuple(dict.fromkeys(exclusion_terms))
+        self.required_terms: Tuple[str, ...] = tuple(required_terms)
+        # Termo obrigatório -> categoria usada quando nenhuma subcategoria casa
+        self.fallback = fallback or {"robótica": "Robótica"}
+        # A ordem importa: a primeira subcategoria que casar vence
+        self.categories: List[Tuple[str, Tuple[str, ...]]] = [
+            (category, tuple(keywords))
+            for category, keywords in category_map.items()
+            if category != default_category
+        ]
+        # Caminho por janela (textos cujo lower() muda de tamanho): regexes
+        # compilados uma única vez.
+        self._boundary_re = {
+            term: re.compile(r"\b" + re.escape(term) + r"\b")
+            for term in self.required_terms + tuple(kw for _, kws in self.categories for kw in kws)
+        }
+
+    def fallback_category(self, required_found: Sequence[str]) -> str:
+        for term, category in self.fallback.items():
+            if term in required_found:
+                return category
+        return self.default_category
+
+    def index(self, text: str) -> TextIndex:
+        """Indexa o texto inteiro uma vez para classificar todos os seus valores."""
+        return TextIndex(self, text)
+
+    def classify_window(self, context_window: str) -> Optional[str]:
+        """Classifica uma janela já recortada e em minúsculas."""
+        if any(term in context_window for term in self.exclusion_terms):
+            return None
+
+        required = [t for t in self.required_terms if self._boundary_re[t].search(context_window)]
+        if not required:
+            return None
+
+        for category, keywords in self.categories:
+            for keyword in keywords:
+                if self._boundary_re[keyword].search(context_window):
+                    return category
+
+        return self.fallback_category(required)
@@ -0,0 +1,334 @@
+# backend/services/processing/investment_facts.py
+"""
+Fatos de investimento por diário + agregados mescláveis.
+
+`extract_investment_statistics` recalculava tudo (totais, categorias,
+`investments_by_period`, `publications_by_period`) varrendo os textos de
+todos os diários a cada chamada. Aqui o trabalho caro é feito uma vez por
+diário e guardado em cache:
+
+  * fato de um diário: data, mês e os valores de investimento encontrados
+    (`[centavos, categoria, início, fim]`, offsets no texto analisado).
+    A chave é o id do diário (id/txt_url/url/checksum) + data + digest do
+    texto analisado: o mesmo diário com outro texto (excerpts de outra
+    busca, texto completo) gera outro fato;
+  * `InvestmentAggregate`: somas em centavos por categoria e por mês,
+    contagem de publicações por mês e o intervalo de datas. O merge é
+    associativo e comutativo, então páginas de uma busca, um diário novo em
+    uma busca salva ou vários municípios de um ranking são combinados
+    somando agregados, sem reler nenhum texto. O agrupamento final (mês ou
+    ano) só é decidido em `to_statistics`, pelo intervalo de datas total.
+
+Variáveis de ambiente (opcionais):
+    INVESTMENT_FACTS_CACHE_SIZE - fatos mantidos em memória (padrão 100000)
+    INVESTMENT_FACTS_DB         - SQLite persistente dos fatos (vazio = só memória)
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.processing.statistics_generator import (
+    CATEGORY_MAP,
+    CLASSIFIER,
+    MONEY_RE,
+    PANDAS_AVAILABLE,
+    StatisticsGenerator,
+)
+
+logger = logging.getLogger(__name__)
+
+INVESTMENT_FACTS_CACHE_SIZE = int(os.getenv("INVESTMENT_FACTS_CACHE_SIZE", 100_000))
+INVESTMENT_FACTS_DB = os.getenv("INVESTMENT_FACTS_DB", "")
+
+# Faixa aceita, em centavos (R$ 100,00 .. R$ 100.000.000,00)
+_MIN_CENTS = 100 * 100
+_MAX_CENTS = 100_000_000 * 100
+
+
+def _month_label(code: int) -> str:
+    return f"{code // 100}-{code % 100:02d}"
+
+
+def _month_code(label: str) -> int:
+    year, month = label.split("-")
+    return int(year) * 100 + int(month)
+
+
+class InvestmentAggregate:
+    """Somas parciais (em centavos) de um conjunto de diários; mescláveis."""
+
+    def __init__(self):
+        self.gazettes = 0
+        self.total_cents = 0
+        self.by_category: Dict[str, int] = {}
+        self.by_month: Dict[int, int] = {}      # AAAAMM -> centavos
+        self.publications: Dict[int, int] = {}  # AAAAMM -> diários
+        self.first_date: Optional[datetime] = None
+        self.last_date: Optional[datetime] = None
+
+    def add(self, fact: Dict[str, Any]) -> "InvestmentAggregate":
+        """Soma o fato de um diário (in-place)."""
+        self.gazettes += 1
+        month = fact.get("month")
+        if fact.get("date"):
+            self._extend_range(datetime.fromisoformat(fact["date"]))
+        if month:
+            self.publications[month] = self.publications.get(month, 0) + 1
+        for cents, category, _start, _end in fact.get("values", ()):
+            self.total_cents += cents
+            self.by_category[category] = self.by_category.get(category, 0) + cents
+            if month:
+                self.by_month[month] = self.by_month.get(month, 0) + cents
+        return self
+
+    def update(self, other: "InvestmentAggregate") -> "InvestmentAggregate":
+        """Mescla outro agregado neste (in-place)."""
+        self.gazettes += other.gazettes
+        self.total_cents += other.total_cents
+        for target, source in (
+            (self.by_category, other.by_category),
+            (self.by_month, other.by_month),
+            (self.publications, other.publications),
+        ):
+            for key, value in source.items():
+                target[key] = target.get(key, 0) + value
+        for date in (other.first_date, other.last_date):
+            if date is not None:
+                self._extend_range(date)
+        return self
+
+    def merge(self, other: "InvestmentAggregate") -> "InvestmentAggregate":
+        """Novo agregado com a soma dos dois."""
+        return InvestmentAggregate().update(self).update(other)
+
+    __add__ = merge
+
+    def _extend_range(self, date: datetime) -> None:
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+    def to_statistics(self, selected_category: str = None) -> Dict[str, Any]:
+        """Mesmo formato de `StatisticsGenerator.extract_investment_statistics`."""
+        group_by = "month"
+        if self.first_date is not None:
+            # Até um ano (366 dias) -> agrupar por mês, senão por ano
+            group_by = "month" if (self.last_date - self.first_date).days <= 366 else "year"
+
+        def _bucketed(by_month: Dict[int, int]) -> Dict[str, int]:
+            if group_by == "month":
+                return {_month_label(code): value for code, value in sorted(by_month.items())}
+            by_year: Dict[int, int] = {}
+            for code, value in by_month.items():
+                by_year[code // 100] = by_year.get(code // 100, 0) + value
+            return {str(year): value for year, value in sorted(by_year.items())}
+
+        category_totals = {cat: 0.0 for cat in CATEGORY_MAP.keys()}
+        category_totals["Outros"] = 0.0
+        for category, cents in self.by_category.items():
+            category_totals[category] = round(cents / 100, 2)
+        investments_by_period = {k: round(v / 100, 2) for k, v in _bucketed(self.by_month).items()}
+
+        result = {
+            "total_invested": round(self.total_cents / 100, 2),
+            "investments_by_category": category_totals,
+            "investments_by_period": investments_by_period,
+            "publications_by_period": _bucketed(self.publications),
+            "period_grouping": group_by  # 'month' ou 'year'
+        }
+
+        # Manter compatibilidade com selected_category
+        if selected_category:
+            result["time_series"] = investments_by_period
+
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializável (JSON/pickle) para guardar ou enviar entre processos."""
+        return {
+            "gazettes": self.gazettes,
+            "total_cents": self.total_cents,
+            "by_category": dict(self.by_category),
+            "by_month": {_month_label(k): v for k, v in sorted(self.by_month.items())},
+            "publications": {_month_label(k): v for k, v in sorted(self.publications.items())},
+            "first_date": self.first_date.isoformat() if self.first_date else None,
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvestmentAggregate":
+        aggregate = cls()
+        aggregate.gazettes = int(data.get("gazettes", 0))
+        aggregate.total_cents = int(data.get("total_cents", 0))
+        aggregate.by_category = {k: int(v) for k, v in (data.get("by_category") or {}).items()}
+        aggregate.by_month = {_month_code(k): int(v) for k, v in (data.get("by_month") or {}).items()}
+        aggregate.publications = {_month_code(k): int(v) for k, v in (data.get("publications") or {}).items()}
+        for attr in ("first_date", "last_date"):
+            if data.get(attr):
+                setattr(aggregate, attr, datetime.fromisoformat(data[attr]))
+        return aggregate
+
+
+def merge_aggregates(aggregates: Iterable[InvestmentAggregate]) -> InvestmentAggregate:
+    total = InvestmentAggregate()
+    for aggregate in aggregates:
+        total.update(aggregate)
+    return total
+
+
+class _FactCache:
+    """LRU em memória dos fatos, com SQLite opcional por trás."""
+
+    def __init__(self, max_size: int = INVESTMENT_FACTS_CACHE_SIZE, db_path: str = INVESTMENT_FACTS_DB):
+        self.max_size = max_size
+        self._facts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS facts (key TEXT PRIMARY KEY, fact TEXT)")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for key in keys:
+                fact = self._facts.get(key)
+                if fact is not None:
+                    self._facts.move_to_end(key)
+                    found[key] = fact
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if self._conn is not None and missing:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    for key, fact in self._conn.execute(
+                        f"SELECT key, fact FROM facts WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                    ):
+                        found[key] = json.loads(fact)
+                        self._remember(key, found[key])
+        return found
+
+    def put_many(self, facts: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            for key, fact in facts.items():
+                self._remember(key, fact)
+            if self._conn is not None and facts:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO facts (key, fact) VALUES (?, ?)",
+                        [(key, json.dumps(fact, ensure_ascii=False)) for key, fact in facts.items()],
+                    )
+
+    def _remember(self, key: str, fact: Dict[str, Any]) -> None:
+        self._facts[key] = fact
+        self._facts.move_to_end(key)
+        while len(self._facts) > self.max_size:
+            self._facts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._facts.clear()
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+
+_cache: Optional[_FactCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_fact_cache() -> _FactCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _FactCache()
+        return _cache
+
+
+def fact_key(gazette: Dict[str, Any], text: str) -> str:
+    """Id do diário + data + digest do texto analisado."""
+    gazette_id = next(
+        (str(gazette[field]) for field in ("id", "txt_url", "url", "file_checksum") if gazette.get(field)), ""
+    )
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return f"{gazette_id}|{gazette.get('date') or ''}|{digest}"
+
+
+def _classify(texts: List[str]) -> List[List[List[Any]]]:
+    """Valores classificados de cada texto: `[centavos, categoria, início, fim]`."""
+    values: List[List[List[Any]]] = [[] for _ in texts]
+    if PANDAS_AVAILABLE:
+        from services.processing.investment_batch import classify_money
+        money = classify_money(texts)
+        for gazette, start, end, cents, category in zip(
+            money["gazette"].tolist(), money["start"].tolist(), money["end"].tolist(),
+            money["cents"].tolist(), money["category"].tolist(),
+        ):
+            values[gazette].append([cents, category, start, end])
+        return values
+
+    for position, text in enumerate(texts):
+        text_index = None  # indexado só se houver algum valor na faixa
+        for match in MONEY_RE.finditer(text):
+            cents = int(match.group(1).replace(".", "").replace(",", ""))
+            if cents < _MIN_CENTS or cents > _MAX_CENTS:
+                continue
+            if text_index is None:
+                text_index = CLASSIFIER.index(text)
+            category = text_index.classify(match.start(), match.end())
+            if category is not None:
+                values[position].append([cents, category, match.start(), match.end()])
+    return values
+
+
+def gazette_facts(
+    gazettes: List[Dict[str, Any]],
+    full_texts: Optional[Dict[str, str]] = None,
+    generator: Optional[StatisticsGenerator] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fato de cada diário (na ordem recebida). Só os diários fora do cache têm
+    o texto varrido, todos juntos em uma única passada.
+    """
+    generator = generator or StatisticsGenerator()
+    cache = get_fact_cache()
+    texts = [generator._gazette_text(g, full_texts) for g in gazettes]
+    keys = [fact_key(g, t) for g, t in zip(gazettes, texts)]
+    facts = cache.get_many(keys)
+
+    pending = {key: i for i, key in enumerate(keys) if key not in facts}
+    if pending:
+        positions = list(pending.values())
+        computed = {}
+        for key, position, values in zip(pending, positions, _classify([texts[i] for i in positions])):
+            raw_date = gazettes[position].get("date")
+            date = generator._parse_date(raw_date) if raw_date else None
+            computed[key] = {
+                "date": date.isoformat() if date else None,
+                "month": date.year * 100 + date.month if date else None,
+                "values": values,
+            }
+        cache.put_many(computed)
+        facts.update(computed)
+
+    return [facts[key] for key in keys]
+
+
+def aggregate_gazettes(
+    gazettes: List[Dict[str, Any]],
+    full_texts: Optional[Dict[str, str]] = None,
+    generator: Optional[StatisticsGenerator] = None,
+) -> InvestmentAggregate:
+    """Agregado de investimentos de uma lista de diários (fatos do cache)."""
+    aggregate = InvestmentAggregate()
+    for fact in gazette_facts(list(gazettes or []), full_texts, generator):
+        aggregate.add(fact)
+    return aggregate
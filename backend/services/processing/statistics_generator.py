@@ -1,20 +1,21 @@
 import re
 import logging
-from typing import List, Dict, Any
+import importlib.util
+from typing import List, Dict, Any, Optional
 from datetime import datetime
-from collections import defaultdict
 
-try:
-    import requests
-except ImportError:
-    requests = None
+from services.processing.investment_classifier import InvestmentClassifier
 
-try:
+logger = logging.getLogger(__name__)
+
+# pandas só é importado no primeiro uso: no import do app ele custa ~0,3 s
+PANDAS_AVAILABLE = importlib.util.find_spec("pandas") is not None
+
+
+def _pandas():
     import pandas as pd
-except Exception:
-    pd = None
+    return pd
 
-logger = logging.getLogger(__name__)
 
 # --- MAPEAMENTO: Categoria de Tecnologia ---
 # Subcategorias específicas - cada uma é contada separadamente
@@ -60,29 +61,42 @@ EXCLUSION_TERMS = [
     "balanço orçamentário", "receitas correntes", "despesas correntes"
 ]
 
+# Classificador compilado uma única vez: cada texto é indexado uma vez e cada
+# valor R$ é classificado por offset (em vez de varrer a janela de contexto).
+CLASSIFIER = InvestmentClassifier(CATEGORY_MAP, EXCLUSION_TERMS)
+MONEY_RE = re.compile(r"(?:R\$\s?)?(\d{1,3}(?:\.\d{3})*,\d{2})")
+
 class StatisticsGenerator:
-    def __init__(self):
-        self._txt_cache = {}  # Cache para textos baixados
-    
-    def _download_full_text(self, txt_url: str) -> str:
-        """Baixa o texto completo do diário oficial via txt_url."""
-        if not txt_url or not requests:
-            return ""
-        
-        # Verificar cache
-        if txt_url in self._txt_cache:
-            return self._txt_cache[txt_url]
-        
-        try:
-            response = requests.get(txt_url, timeout=30)
-            response.raise_for_status()
-            text = response.text
-            self._txt_cache[txt_url] = text
-            logger.info(f"📥 Texto completo baixado: {len(text)} chars")
-            return text
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao baixar texto: {e}")
+    def _get_full_text(self, txt_url: str, full_texts: Optional[Dict[str, str]] = None) -> str:
+        """
+        Retorna o texto completo pré-carregado do diário.
+        Nunca faz I/O de rede: os downloads são feitos antes, de forma assíncrona.
+        """
+        if not txt_url:
             return ""
+        return (full_texts or {}).get(txt_url, "")
+
+    def _gazette_text(self, gazette: Dict[str, Any], full_texts: Optional[Dict[str, str]] = None) -> str:
+        """Texto analisado de um diário. PRIORIDADE: texto completo via txt_url > excerpts."""
+        text_content = ""
+        txt_url = gazette.get("txt_url")
+
+        # Texto completo pré-carregado, se disponível
+        if txt_url:
+            full_text = self._get_full_text(txt_url, full_texts)
+            if full_text:
+                text_content = full_text
+
+        # Fallback para excerpts se não conseguiu texto completo
+        if not text_content and "excerpts" in gazette and gazette["excerpts"]:
+            if isinstance(gazette["excerpts"], list):
+                text_content = "\n".join([str(e) for e in gazette["excerpts"] if e])
+            else:
+                text_content = str(gazette["excerpts"])
+        elif "excerpt" in gazette:
+            text_content = str(gazette["excerpt"])
+
+        return text_content
 
     def _parse_date(self, date_value):
         """Tenta converter diferentes formatos de data para `datetime`.
@@ -119,7 +133,7 @@ class StatisticsGenerator:
 
         return None
 
-    def generate_statistics(self, gazette_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_statistics(self, gazette_data: List[Dict[str, Any]], full_texts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         if isinstance(gazette_data, dict) and 'gazettes' in gazette_data:
             gazettes_list = gazette_data.get('gazettes') or []
         else:
@@ -128,7 +142,7 @@ class StatisticsGenerator:
         if not gazettes_list:
             return self._get_empty_stats()
 
-        df = pd.DataFrame(gazettes_list) if pd is not None else None
+        df = _pandas().DataFrame(gazettes_list) if PANDAS_AVAILABLE else None
 
         stats = {
             "total_gazettes": len(gazettes_list),
@@ -141,143 +155,26 @@ class StatisticsGenerator:
         entities_stats = self.calculate_entity_statistics(self._extract_entities(gazettes_list))
         stats.update(entities_stats)
 
-        investment_stats = self.extract_investment_statistics(gazettes_list)
+        investment_stats = self.extract_investment_statistics(gazettes_list, full_texts=full_texts)
         stats.update(investment_stats)
 
         return stats
 
-    def extract_investment_statistics(self, gazettes: List[Dict[str, Any]], selected_category: str = None) -> Dict[str, Any]:
-        total_invested = 0.0
-        category_totals = {cat: 0.0 for cat in CATEGORY_MAP.keys()}
-        category_totals["Outros"] = 0.0
-
-        money_re = re.compile(r"(?:R\$\s?)?(\d{1,3}(?:\.\d{3})*,\d{2})")
-        
-        # Preparar intervalo de datas para decidir agrupamento (mês vs ano)
-        parsed_dates = [self._parse_date(g.get('date')) for g in gazettes if g.get('date')]
-        parsed_dates = [d for d in parsed_dates if d is not None]
-        
-        # SEMPRE calcular série temporal (não apenas para selected_category)
-        group_by = 'month'  # default
-        if parsed_dates:
-            start_date = min(parsed_dates)
-            end_date = max(parsed_dates)
-            delta_days = (end_date - start_date).days
-            # Até um ano (366 dias) -> agrupar por mês, senão por ano
-            group_by = 'month' if delta_days <= 366 else 'year'
-
-        # Acumuladores para série temporal
-        ts_acc = defaultdict(float)  # Para valores monetários
-        count_acc = defaultdict(int)  # Para contagem de publicações
-
-        for gazette in gazettes:
-            gazette_date = self._parse_date(gazette.get('date'))
-            
-            # Calcular bucket de tempo
-            time_bucket = None
-            if gazette_date:
-                if group_by == 'month':
-                    time_bucket = f"{gazette_date.year}-{gazette_date.month:02d}"
-                else:
-                    time_bucket = f"{gazette_date.year}"
-                # Sempre contar publicação
-                count_acc[time_bucket] += 1
-
-            # PRIORIDADE: texto completo via txt_url > excerpts
-            text_content = ""
-            txt_url = gazette.get("txt_url")
-            
-            # Tentar baixar texto completo se disponível
-            if txt_url:
-                full_text = self._download_full_text(txt_url)
-                if full_text:
-                    text_content = full_text
-            
-            # Fallback para excerpts se não conseguiu texto completo
-            if not text_content and "excerpts" in gazette and gazette["excerpts"]:
-                if isinstance(gazette["excerpts"], list):
-                    text_content = "\n".join([str(e) for e in gazette["excerpts"] if e])
-                else:
-                    text_content = str(gazette["excerpts"])
-            elif "excerpt" in gazette:
-                 text_content = str(gazette["excerpt"])
-            
-            if not text_content:
-                continue
-
-            matches = money_re.finditer(text_content)
-            
-            for match in matches:
-                value_str = match.group(1)
-                try:
-                    clean_value = float(value_str.replace('.', '').replace(',', '.'))
-                except ValueError:
-                    continue
-
-                if clean_value < 100 or clean_value > 100000000: 
-                    continue
-
-                start_index = match.start()
-                end_index = match.end()
-                # Aumentar janela de contexto para 500 chars para capturar mais informação
-                context_window = text_content[max(0, start_index - 500) : min(len(text_content), end_index + 500)].lower()
-                
-                if any(term in context_window for term in EXCLUSION_TERMS):
-                    continue
-                
-                # FILTRO PRINCIPAL: Só incluir se "software" ou "robótica" estiver no contexto
-                has_software = bool(re.search(r'\bsoftware\b', context_window))
-                has_robotica = bool(re.search(r'\brobótica\b', context_window))
-                
-                if not has_software and not has_robotica:
-                    continue  # Pular valores sem relação com software/robótica
-                
-                # SUBCATEGORIZAÇÃO: Verificar subcategorias específicas
-                found_category = None
-                for category, keywords in CATEGORY_MAP.items():
-                    if category == "Outros":
-                        continue  # Verificar "Outros" por último
-                    for keyword in keywords:
-                        pattern = r'\b' + re.escape(keyword) + r'\b'
-                        if re.search(pattern, context_window):
-                            found_category = category
-                            break 
-                    if found_category:
-                        break
-                
-                # Fallback para categoria principal
-                if not found_category:
-                    found_category = "Robótica" if has_robotica else "Outros"
-
-                total_invested += clean_value
-                category_totals[found_category] += clean_value
-
-                # Acumular na série temporal
-                if time_bucket:
-                    ts_acc[time_bucket] += clean_value
-
-        total_invested = round(total_invested, 2)
-        category_totals = {k: round(v, 2) for k, v in category_totals.items()}
-        
-        # Série temporal de investimentos (ordenada cronologicamente)
-        investments_by_period = {k: round(v, 2) for k, v in sorted(ts_acc.items())}
-        
-        # Série temporal de contagem de publicações (ordenada cronologicamente)
-        publications_by_period = {k: v for k, v in sorted(count_acc.items())}
-
-        result = {
-            "total_invested": total_invested,
-            "investments_by_category": category_totals,
-            "investments_by_period": investments_by_period,
-            "publications_by_period": publications_by_period,
-            "period_grouping": group_by  # 'month' ou 'year'
-        }
+    def extract_investment_statistics(self, gazettes: List[Dict[str, Any]], selected_category: str = None, full_texts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Soma os valores monetários relacionados a software/robótica.
 
-        # Manter compatibilidade com selected_category
-        if selected_category:
-            result["time_series"] = investments_by_period
+        `full_texts` (txt_url -> texto) deve vir de
+        `gazette_text_client.fetch_full_texts`; diários sem texto completo
+        usam os excerpts.
 
-        return result
+        Cada diário vira um fato de investimento calculado uma vez e guardado
+        em cache (ver `investment_facts`); o resultado é a soma dos fatos.
+        Os diários fora do cache são varridos juntos, de forma colunar
+        quando pandas/NumPy estão disponíveis (ver `investment_batch`).
+        """
+        from services.processing.investment_facts import aggregate_gazettes
+        return aggregate_gazettes(gazettes, full_texts, generator=self).to_statistics(selected_category)
 
     def calculate_entity_statistics(self, entities: List[Dict[str, str]]) -> Dict[str, Any]:
         if not entities:
@@ -287,8 +184,8 @@ class StatisticsGenerator:
                 "top_entities": {}
             }
 
-        if pd is not None:
-            df = pd.DataFrame(entities)
+        if PANDAS_AVAILABLE:
+            df = _pandas().DataFrame(entities)
             if 'label' in df.columns:
                 # Conta apenas rótulos válidos (não nulos) para evitar erro no teste de dados mal formados
                 total_entities = int(df['label'].count())
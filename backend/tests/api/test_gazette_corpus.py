@@ -0,0 +1,165 @@
+# backend/tests/api/test_gazette_corpus.py
+import sqlite3
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from services.api.clients import gazette_corpus
+from services.api.clients.gazette_corpus import GazetteCorpus, fts_query
+
+
+def _gazette(i, day, text="Contratação de software de gestão escolar"):
+    return {
+        "territory_id": "5300108",
+        "date": f"2024-01-{day:02d}",
+        "txt_url": f"https://qd.test/{i}.txt",
+        "excerpts": [f"{text} ({i})"],
+    }
+
+
+def test_fts_query_converte_sintaxe_do_querido_diario():
+    assert fts_query("software gestão") == '("software" AND "gestão")'
+    assert fts_query('software | robótica -salário "ata de registro" licit*') == (
+        '("software" OR "robótica" AND "ata de registro" AND "licit" *) NOT "salário"'
+    )
+    assert fts_query("-salário") is None
+
+
+def test_busca_repetida_e_subperiodo_respondidos_localmente(tmp_path):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    gazettes = [_gazette(i, day) for i, day in enumerate((20, 3, 11))]
+    corpus.ingest("5300108", gazettes, keywords="Software  Gestão", since="2024-01-01", until="2024-01-31")
+
+    full = corpus.search("5300108", "2024-01-01", "2024-01-31", "software gestão")
+    assert full["source"] == "local"
+    assert [g["date"] for g in full["gazettes"]] == ["2024-01-03", "2024-01-11", "2024-01-20"]
+    assert full["gazettes"][0] == gazettes[1]
+
+    # Filtro exato de datas em um sub-período
+    assert [g["date"] for g in corpus.search("5300108", "2024-01-05", "2024-01-15", "software gestão")["gazettes"]] == [
+        "2024-01-11"
+    ]
+    # Fora da cobertura, outra busca ou outro território: vai para o upstream
+    assert corpus.search("5300108", "2023-12-15", "2024-01-10", "software gestão") is None
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "robótica") is None
+    assert corpus.search("3550308", "2024-01-01", "2024-01-31", "software gestão") is None
+    corpus.close()
+
+
+def test_cobertura_une_periodos_e_ignora_dias_recentes(tmp_path):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    corpus.ingest("5300108", [_gazette(1, 5)], keywords="software", since="2024-01-01", until="2024-01-10")
+    corpus.ingest("5300108", [], keywords="software", since="2024-01-11", until="2024-01-31")
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software")["total_gazettes"] == 1
+
+    today = date.today()
+    corpus.ingest("5300108", [], keywords="recente", since=(today - timedelta(days=10)).isoformat(), until=today.isoformat())
+    assert corpus.search("5300108", (today - timedelta(days=10)).isoformat(), today.isoformat(), "recente") is None
+    settled = (today - timedelta(days=gazette_corpus.SETTLE_DAYS)).isoformat()
+    assert corpus.search("5300108", (today - timedelta(days=10)).isoformat(), settled, "recente") is not None
+    corpus.close()
+
+
+def test_cobertura_total_resolve_qualquer_palavra_pelo_indice(tmp_path):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    gazettes = [_gazette(1, 2), _gazette(2, 3), _gazette(3, 4)]
+    full_texts = {
+        "https://qd.test/1.txt": "Aquisição de kits de ROBÓTICA educacional para as escolas.",
+        "https://qd.test/2.txt": "Pagamento de salário dos servidores da robotica.",
+        "https://qd.test/3.txt": "Contratação de software de gestão escolar.",
+    }
+    corpus.ingest("5300108", gazettes, full_texts, since="2024-01-01", until="2024-01-31", all_gazettes=True)
+
+    result = corpus.search("5300108", "2024-01-01", "2024-01-31", "robotica -salário")
+    assert [g["txt_url"] for g in result["gazettes"]] == ["https://qd.test/1.txt"]
+    assert "ROBÓTICA" in result["gazettes"][0]["excerpts"][0]
+    assert corpus.search("5300108", "2024-01-04", "2024-01-04", "gestão escolar")["total_gazettes"] == 1
+    assert corpus.full_texts(gazettes) == full_texts
+    corpus.close()
+
+
+def test_linhas_puladas_nao_registram_cobertura(tmp_path):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    sem_data = {**_gazette(9, 9), "date": None}
+    corpus.ingest("5300108", [_gazette(1, 5), sem_data], keywords="software", since="2024-01-01", until="2024-01-31")
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software") is None
+
+    # Carga total com um diário sem texto completo: o FTS não responderia por ele
+    corpus.ingest("5300108", [_gazette(1, 2), _gazette(2, 3)], {"https://qd.test/1.txt": "robótica"},
+                  since="2024-01-01", until="2024-01-31", all_gazettes=True)
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "robótica") is None
+    assert corpus.uncovered_since("5300108", "2024-01-01", all_gazettes=True) == date(2024, 1, 1)
+    corpus.close()
+
+
+def test_cobertura_vencida_volta_ao_upstream_e_e_renovada(tmp_path, monkeypatch):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    corpus.ingest("5300108", [_gazette(1, 5)], keywords="software", since="2024-01-01", until="2024-01-31")
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software") is not None
+
+    # Passado o TTL, o período não é mais confiável (o QD pode ter recarregado datas antigas)
+    monkeypatch.setattr(gazette_corpus.time, "time", lambda: 10**10)
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software") is None
+
+    # A nova carga (com o diário incluído depois) renova a cobertura e descarta a vencida
+    corpus.ingest("5300108", [_gazette(1, 5), _gazette(2, 7)], keywords="software", since="2024-01-01", until="2024-01-31")
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software")["total_gazettes"] == 2
+    assert corpus._conn.execute("SELECT COUNT(*) FROM coverage").fetchone()[0] == 1
+    corpus.close()
+
+
+def test_banco_antigo_e_migrado_e_coberturas_revalidadas(tmp_path):
+    db = tmp_path / "corpus.sqlite3"
+    with sqlite3.connect(db) as conn:
+        conn.executescript(
+            "CREATE TABLE gazettes (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, territory_id TEXT NOT NULL,"
+            " date TEXT NOT NULL, meta TEXT NOT NULL, has_full_text INTEGER NOT NULL DEFAULT 0);"
+            "CREATE VIRTUAL TABLE texts USING fts5(text);"
+            "CREATE TABLE coverage (territory_id TEXT NOT NULL, query TEXT NOT NULL, since TEXT NOT NULL, until TEXT NOT NULL);"
+            "INSERT INTO gazettes VALUES (1, 'k', '5300108', '2024-01-05', '{}', 1);"
+            "INSERT INTO texts (rowid, text) VALUES (1, 'texto completo');"
+            "INSERT INTO coverage VALUES ('5300108', 'software', '2024-01-01', '2024-01-31');"
+        )
+
+    corpus = GazetteCorpus(db)
+
+    assert corpus._conn.execute("SELECT text_bytes FROM gazettes").fetchone()[0] == len("texto completo")
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "software") is None
+    corpus.close()
+
+
+def test_teto_de_textos_descarta_os_mais_antigos(tmp_path, monkeypatch):
+    corpus = GazetteCorpus(tmp_path / "corpus.sqlite3")
+    monkeypatch.setattr(gazette_corpus, "MAX_TEXT_BYTES", 250)
+    gazettes = [_gazette(i, i) for i in range(1, 4)]
+    for i, gazette in enumerate(gazettes, 1):
+        monkeypatch.setattr(gazette_corpus.time, "time", lambda i=i: 1_000_000.0 + i)
+        corpus.ingest("5300108", [gazette], {gazette["txt_url"]: f"robótica {i} " + "x" * 100},
+                      since="2024-01-01", until="2024-01-31", all_gazettes=True)
+
+    # Só os dois mais recentes continuam com o texto completo
+    assert set(corpus.full_texts(gazettes)) == {"https://qd.test/2.txt", "https://qd.test/3.txt"}
+    # O território perdeu a cobertura total: o FTS já não tem o texto inteiro de todos
+    assert corpus.search("5300108", "2024-01-01", "2024-01-31", "robótica") is None
+    corpus.close()
+
+
+def test_endpoint_gazettes_repetido_nao_vai_a_rede(mocker):
+    calls = []
+
+    async def _iter(territory_id, since, until, keywords=None, max_items=None):
+        calls.append((since, until))
+        yield [_gazette(1, 3), _gazette(2, 9)]
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_iter)
+    client = TestClient(main.app)
+    params = {"territory_ids": "5300108", "published_since": "2024-01-01", "published_until": "2024-01-10",
+              "querystring": "software"}
+
+    first = client.get("/api/v1/gazettes", params=params).json()
+    again = client.get("/api/v1/gazettes", params={**params, "published_since": "2024-01-05"}).json()
+
+    assert len(calls) == 1
+    assert first["total_gazettes"] == 2
+    assert again == {"total_gazettes": 1, "gazettes": [_gazette(2, 9)], "source": "local"}
@@ -0,0 +1,99 @@
+# backend/tests/api/test_gazette_text_client.py
+import httpx
+import pytest
+
+from services.api.clients import gazette_text_client, http_pool
+from services.api.clients.gazette_text_cache import GazetteTextCache
+
+
+@pytest.fixture
+def text_cache(tmp_path, monkeypatch):
+    """Cache em disco isolado em um diretório temporário."""
+    cache = GazetteTextCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(gazette_text_client, "get_text_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def mock_pool(text_cache, monkeypatch):
+    """Substitui o transporte do pool compartilhado por um MockTransport."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if "instavel" in request.url.path and calls.count(str(request.url)) == 1:
+            return httpx.Response(503)
+        if "quebrado" in request.url.path:
+            return httpx.Response(404)
+        return httpx.Response(200, text=f"conteúdo de {request.url.path}", headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(
+        http_pool, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(gazette_text_client, "RETRY_BACKOFF", 0)
+    yield calls
+    http_pool._client = None
+    http_pool._client_loop = None
+
+
+@pytest.mark.asyncio
+async def test_fetch_full_texts_deduplica_e_baixa_em_lote(mock_pool):
+    gazettes = [
+        {"txt_url": "http://qd.test/a.txt"},
+        {"txt_url": "http://qd.test/b.txt"},
+        {"txt_url": "http://qd.test/a.txt"},  # duplicado
+        {"excerpts": ["sem txt_url"]},
+    ]
+
+    texts = await gazette_text_client.fetch_full_texts(gazettes)
+
+    assert texts == {
+        "http://qd.test/a.txt": "conteúdo de /a.txt",
+        "http://qd.test/b.txt": "conteúdo de /b.txt",
+    }
+    assert len(mock_pool) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_full_texts_retenta_e_ignora_falhas(mock_pool):
+    gazettes = [
+        {"txt_url": "http://qd.test/instavel.txt"},
+        {"txt_url": "http://qd.test/quebrado.txt"},
+    ]
+
+    texts = await gazette_text_client.fetch_full_texts(gazettes)
+
+    assert texts == {"http://qd.test/instavel.txt": "conteúdo de /instavel.txt"}
+    # 503 seguido de sucesso; 404 não é retentado
+    assert mock_pool.count("http://qd.test/instavel.txt") == 2
+    assert mock_pool.count("http://qd.test/quebrado.txt") == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_full_texts_le_do_cache_sem_rede(mock_pool, text_cache):
+    gazettes = [{"txt_url": "http://qd.test/a.txt"}]
+
+    first = await gazette_text_client.fetch_full_texts(gazettes)
+    second = await gazette_text_client.fetch_full_texts(gazettes)
+
+    assert first == second == {"http://qd.test/a.txt": "conteúdo de /a.txt"}
+    assert len(mock_pool) == 1  # a segunda leitura veio do disco
+    assert text_cache.get("http://qd.test/a.txt")["etag"] == '"v1"'
+
+
+def test_cache_deduplica_conteudo_e_aplica_lru(tmp_path):
+    cache = GazetteTextCache(cache_dir=str(tmp_path), max_bytes=10 ** 9)
+    cache.put("http://qd.test/a.txt", "mesmo texto " * 100)
+    cache.put("http://qd.test/b.txt", "mesmo texto " * 100)
+    one_blob = cache.total_bytes()
+    assert len(list((tmp_path / "blobs").rglob("*.gz"))) == 1
+
+    cache.put("http://qd.test/c.txt", "outro texto " * 100)
+    cache.max_bytes = one_blob  # só cabe um blob
+    cache.evict()
+
+    assert cache.get("http://qd.test/a.txt") is None
+    assert cache.get("http://qd.test/b.txt") is None
+    assert cache.get("http://qd.test/c.txt")["text"] == "outro texto " * 100
+    assert cache.total_bytes() <= one_blob
@@ -0,0 +1,221 @@
+# backend/tests/api/test_gemini_client.py
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.api.clients import gemini_client
+
+
+class _FakeGenai:
+    def __init__(self, names=("models/gemini-1.5-flash", "models/gemini-2.5-flash", "models/gemini-1.5-pro"), fail=False):
+        self.names = names
+        self.fail = fail
+        self.list_calls = 0
+
+    def list_models(self):
+        self.list_calls += 1
+        if self.fail:
+            raise RuntimeError("rede indisponível")
+        return [SimpleNamespace(name=n, supported_generation_methods=["generateContent"]) for n in self.names]
+
+    def GenerativeModel(self, name):
+        return SimpleNamespace(model_name=name)
+
+
+@pytest.fixture
+def fake_genai(monkeypatch, tmp_path):
+    fake = _FakeGenai()
+    monkeypatch.setattr(gemini_client, "_genai", fake)
+    monkeypatch.setattr(gemini_client, "_client_state", "loaded")
+    monkeypatch.setattr(gemini_client, "_model_entry", None)
+    monkeypatch.setattr(gemini_client, "_model_instances", {})
+    monkeypatch.setattr(gemini_client, "MODEL_CACHE_PATH", tmp_path / "gemini_model.json")
+    return fake
+
+
+def test_listagem_so_na_primeira_resolucao(fake_genai):
+    for _ in range(5):
+        model = gemini_client.get_best_gemini_model()
+    assert model.model_name == "models/gemini-2.5-flash"
+    assert fake_genai.list_calls == 1
+
+
+def test_cache_em_disco_sobrevive_a_restart(fake_genai, monkeypatch):
+    gemini_client.resolve_model_name()
+    # "Restart": memória zerada, arquivo continua
+    monkeypatch.setattr(gemini_client, "_model_entry", None)
+    assert gemini_client.resolve_model_name() == "models/gemini-2.5-flash"
+    assert fake_genai.list_calls == 1
+
+
+def test_entrada_vencida_e_atualizada_em_segundo_plano(fake_genai, monkeypatch):
+    stale = {"model": "models/gemini-1.0-flash", "source": "list_models", "resolved_at": time.time() - 10 * 86400}
+    gemini_client.MODEL_CACHE_PATH.write_text(json.dumps(stale))
+
+    # O caminho quente devolve a entrada antiga sem esperar a listagem
+    assert gemini_client.resolve_model_name() == "models/gemini-1.0-flash"
+    for _ in range(50):
+        if gemini_client._model_entry["model"] != "models/gemini-1.0-flash":
+            break
+        time.sleep(0.02)
+    assert gemini_client._model_entry["model"] == "models/gemini-2.5-flash"
+    assert json.loads(gemini_client.MODEL_CACHE_PATH.read_text())["model"] == "models/gemini-2.5-flash"
+
+
+def test_falha_na_listagem_usa_fallback_fixo(fake_genai, monkeypatch):
+    fake_genai.fail = True
+    monkeypatch.setattr(gemini_client, "FALLBACK_MODEL", "gemini-fixo")
+    assert gemini_client.resolve_model_name() == "gemini-fixo"
+    entry = json.loads(gemini_client.MODEL_CACHE_PATH.read_text())
+    assert entry["source"] == "fallback"
+
+
+def test_selecao_prefere_flash_mais_novo():
+    assert gemini_client.select_best_model(["gemini-1.5-pro", "gemini-2.0-flash", "gemini-1.5-flash"]) == "gemini-2.0-flash"
+    assert gemini_client.select_best_model(["gemini-1.0-pro", "gemini-1.5-pro"]) == "gemini-1.5-pro"
+    assert gemini_client.select_best_model([]) is None
+
+
+class _AsyncModel:
+    def __init__(self, name="models/gemini-2.5-flash", delay=0.05):
+        self.model_name = name
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return SimpleNamespace(text='```json\n{"resumo_objeto": "notebooks", "fornecedor": "Tech"}\n```')
+
+
+@pytest.fixture
+def async_model(fake_genai, monkeypatch):
+    model = _AsyncModel()
+    monkeypatch.setattr(gemini_client, "get_best_gemini_model", lambda: model)
+    monkeypatch.setattr(gemini_client, "_result_cache", gemini_client._ResultCache(8, 3600))
+    monkeypatch.setattr(gemini_client, "_rate_limiter", gemini_client._RateLimiter(0))
+    monkeypatch.setattr(gemini_client, "_llm_semaphores", {})
+    return model
+
+
+TEXT = "Aquisição de 50 notebooks para os laboratórios de informática das escolas municipais."
+
+
+def test_resposta_repetida_vem_do_cache(async_model):
+    first = asyncio.run(gemini_client.analyze_investment_context(TEXT))
+    first["resumo_objeto"] = "alterado pelo chamador"
+    second = asyncio.run(gemini_client.analyze_investment_context(TEXT))
+
+    assert second == {"resumo_objeto": "notebooks", "fornecedor": "Tech"}
+    assert async_model.calls == 1
+
+
+def test_limite_de_concorrencia(async_model, monkeypatch):
+    monkeypatch.setattr(gemini_client, "LLM_MAX_CONCURRENCY", 2)
+
+    async def _run():
+        texts = [f"{TEXT} Lote {i}." for i in range(6)]
+        return await asyncio.gather(*(gemini_client.analyze_investment_context(t) for t in texts))
+
+    results = asyncio.run(_run())
+    assert all("error" not in r for r in results)
+    assert async_model.calls == 6
+    assert async_model.max_running == 2
+
+
+def test_rate_limiter_espaca_chamadas():
+    limiter = gemini_client._RateLimiter(per_minute=60 * 20)  # 50 ms entre chamadas
+
+    async def _run():
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.wait()
+        return time.monotonic() - start
+
+    assert asyncio.run(_run()) >= 0.14
+
+
+def test_cache_lru_descarta_mais_antigo():
+    cache = gemini_client._ResultCache(max_entries=2, ttl=3600)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+
+
+class _BatchModel:
+    """Responde um objeto JSON com uma entrada por 'TRECHO <id>' do prompt."""
+
+    model_name = "models/gemini-2.5-flash"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        ids = re.findall(r"TRECHO (\d+):", prompt)
+        payload = {i: {"resumo_objeto": f"item {i}"} for i in ids}
+        return SimpleNamespace(text=json.dumps(payload))
+
+
+@pytest.fixture
+def batch_model(fake_genai, monkeypatch):
+    model = _BatchModel()
+    monkeypatch.setattr(gemini_client, "get_best_gemini_model", lambda: model)
+    monkeypatch.setattr(gemini_client, "_result_cache", gemini_client._ResultCache(64, 3600))
+    monkeypatch.setattr(gemini_client, "_rate_limiter", gemini_client._RateLimiter(0))
+    monkeypatch.setattr(gemini_client, "_llm_semaphores", {})
+    return model
+
+
+def test_pack_snippets_respeita_orcamento():
+    snippets = {str(i): "x" * 400 for i in range(5)}
+    batches = gemini_client.pack_snippets(snippets, char_budget=1000)
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [key for batch in batches for key, _ in batch] == list(snippets)
+
+
+def test_varios_diarios_em_uma_chamada_com_dedup_entre_palavras_chave(batch_model):
+    gazettes = {i: f"Contrato {i}: aquisição de kits de robótica educacional para a rede municipal." for i in range(6)}
+    gazettes[5] = gazettes[0]  # mesmo trecho em dois diários
+
+    first = asyncio.run(gemini_client.analyze_snippets(gazettes))
+    assert list(first) == list(gazettes)
+    assert all("resumo_objeto" in r for r in first.values())
+    assert first[5] == first[0]
+    assert len(batch_model.prompts) == 1
+    assert len(re.findall(r"TRECHO \d+:", batch_model.prompts[0])) == 5
+
+    # Outra palavra-chave: 3 trechos já analisados + 1 novo
+    second_run = {"a": gazettes[1], "b": gazettes[2], "c": gazettes[3],
+                  "d": "Pregão para aquisição de software de gestão escolar para as escolas."}
+    second = asyncio.run(gemini_client.analyze_snippets(second_run))
+    assert second["a"] == first[1]
+    assert len(batch_model.prompts) == 2
+    assert len(re.findall(r"TRECHO \d+:", batch_model.prompts[1])) == 1
+
+
+def test_trecho_sem_resposta_nao_vai_para_cache(batch_model, monkeypatch):
+    async def _partial(prompt):
+        batch_model.prompts.append(prompt)
+        return SimpleNamespace(text=json.dumps({"1": {"resumo_objeto": "ok"}}))
+
+    monkeypatch.setattr(batch_model, "generate_content_async", _partial)
+    texts = {i: f"Trecho {i} sobre aquisição de equipamentos de informática para escolas." for i in range(2)}
+    result = asyncio.run(gemini_client.analyze_snippets(texts))
+    assert result[0] == {"resumo_objeto": "ok"}
+    assert "error" in result[1]
+
+    asyncio.run(gemini_client.analyze_snippets({1: texts[1]}))
+    assert len(batch_model.prompts) == 2
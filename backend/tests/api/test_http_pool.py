@@ -0,0 +1,86 @@
+# backend/tests/api/test_http_pool.py
+import pytest
+
+from services.api.clients import http_pool
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_same_client_in_loop():
+    """O mesmo loop deve sempre receber o mesmo cliente (sem novo handshake)."""
+    first = http_pool.get_http_client()
+    second = http_pool.get_http_client()
+    assert first is second
+    await http_pool.shutdown_http_client()
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_host_slot_limits_concurrency(monkeypatch):
+    """O limite por host não deve deixar passar mais requisições que o configurado."""
+    import asyncio
+
+    monkeypatch.setattr(http_pool, "PER_HOST_LIMIT", 2)
+    http_pool._host_semaphores.clear()
+
+    in_flight = 0
+    peak = 0
+
+    async def worker():
+        nonlocal in_flight, peak
+        async with http_pool.host_slot("https://api.queridodiario.ok.org.br/api/gazettes"):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(worker() for _ in range(6)))
+    assert peak == 2
+    http_pool._host_semaphores.clear()
+
+
+def test_cliente_de_loop_anterior_e_fechado():
+    """Trocar de loop (scripts com asyncio.run, TestClient) não deixa o cliente antigo aberto."""
+    import asyncio
+
+    async def _cliente():
+        return http_pool.get_http_client()
+
+    async def _troca_de_loop():
+        client = http_pool.get_http_client()
+        await asyncio.sleep(0)  # deixa o fechamento agendado rodar
+        return client
+
+    first = asyncio.run(_cliente())
+    second = asyncio.run(_troca_de_loop())
+    assert second is not first
+    assert first.is_closed and not second.is_closed
+    asyncio.run(http_pool.shutdown_http_client())
+
+
+def test_cliente_de_loop_ativo_em_outra_thread_e_fechado_nele():
+    import asyncio
+    import threading
+
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(_no_loop(http_pool.get_http_client), other).result(timeout=5)
+
+        async def _troca_de_loop():
+            client = http_pool.get_http_client()
+            for future in list(http_pool._closing):
+                await asyncio.wrap_future(future)
+            return client
+
+        second = asyncio.run(_troca_de_loop())
+        assert first.is_closed and not second.is_closed
+        asyncio.run(http_pool.shutdown_http_client())
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(timeout=5)
+        other.close()
+
+
+async def _no_loop(func):
+    return func()
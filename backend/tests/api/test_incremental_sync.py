@@ -0,0 +1,221 @@
+# backend/tests/api/test_incremental_sync.py
+import asyncio
+import json
+
+import pytest
+
+from services.integration import incremental_sync
+from services.processing import investment_facts
+from services.integration.incremental_sync import (
+    SyncStateStore,
+    restore_state,
+    sync_batch,
+    sync_filename,
+    sync_territory,
+)
+
+
+def _gazette(day, valor):
+    return {
+        "territory_id": "5300108",
+        "date": f"2024-03-{day:02d}",
+        "txt_url": f"https://qd.test/{day}.txt",
+        "excerpts": [f"Aquisição de software de gestão escolar no valor de R$ {valor},00."],
+    }
+
+
+@pytest.fixture
+def upstream(mocker):
+    """Universo falso do Querido Diário, filtrado pelo período pedido."""
+    universe = [_gazette(2, "1.000"), _gazette(10, "2.000")]
+    calls, downloads = [], []
+
+    async def _iter(territory_id, since, until, keywords=None, max_items=None):
+        calls.append((since, until))
+        # Diários sem data (metadado incompleto) voltam em qualquer período
+        yield [g for g in universe if not g.get("date") or since <= g["date"] <= until]
+
+    async def _texts(gazettes, concurrency=None):
+        downloads.extend(g["txt_url"] for g in gazettes)
+        return {}
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_iter)
+    mocker.patch("services.api.clients.gazette_text_client.fetch_full_texts", new=_texts)
+    return universe, calls, downloads
+
+
+def test_segunda_execucao_busca_so_a_partir_da_marca(tmp_path, upstream):
+    universe, calls, downloads = upstream
+    store = SyncStateStore(tmp_path / "sync.sqlite3")
+
+    first = asyncio.run(sync_territory("5300108", "software", until="2024-03-15", initial_since="2024-03-01", store=store))
+    assert min(c[0] for c in calls) == "2024-03-01" and max(c[1] for c in calls) == "2024-03-15"
+    assert first["new_gazettes"] == 2 and first["high_water"] == "2024-03-10"
+
+    # Um diário novo e o de 10/03 de novo na sobreposição
+    universe.append(_gazette(12, "4.000"))
+    del calls[:]
+    second = asyncio.run(sync_territory("5300108", "software", until="2024-03-20", store=store))
+
+    lookback = incremental_sync.SYNC_LOOKBACK_DAYS
+    assert min(c[0] for c in calls) == f"2024-03-{10 - lookback:02d}"
+    assert max(c[1] for c in calls) == "2024-03-20"
+    assert second["fetched_gazettes"] == 2 and second["new_gazettes"] == 1
+    assert downloads.count("https://qd.test/10.txt") == 1
+    assert second["high_water"] == "2024-03-12"
+
+    data = second["document"]["data"]
+    assert data["total_gazettes"] == 3
+    assert data["total_invested"] == 7000.0
+    assert second["document"]["meta"]["date_range_start"] == "2024-03-01"
+    store.close()
+
+
+@pytest.mark.parametrize("group_size", [None, 1])
+def test_lote_baixa_e_analisa_cada_diario_uma_vez(tmp_path, mocker, group_size):
+    shared = _gazette(5, "3.000")
+    only_b = {**_gazette(6, "1.000"), "territory_id": "5208707"}
+    searches, downloads = [], []
+
+    async def _sharded(territory_id, since, until, keywords=None):
+        searches.append((territory_id, keywords))
+        gazettes = [shared] if territory_id == "5300108" else [only_b, shared]
+        return {"total_gazettes": len(gazettes), "gazettes": gazettes}
+
+    async def _texts(gazettes, concurrency=None):
+        downloads.extend(g["txt_url"] for g in gazettes)
+        return {g["txt_url"]: f"Aquisição de software ERP no valor de R$ {int(g['date'][-2:])}.000,00." for g in gazettes}
+
+    mocker.patch("services.api.clients.query_planner.fetch_gazettes_sharded", new=_sharded)
+    mocker.patch("services.api.clients.gazette_text_client.fetch_full_texts", new=_texts)
+    investment_facts.get_fact_cache().clear()
+    classify = mocker.spy(investment_facts, "_classify")
+    store = SyncStateStore(tmp_path / "sync.sqlite3")
+
+    results = asyncio.run(sync_batch(
+        ["5300108", "5208707"], ["tablet", "Tablet ", "robótica"], until="2024-03-15", store=store,
+        group_size=group_size,
+    ))
+
+    # "Tablet " e "tablet" são a mesma busca; 2 territórios x 2 buscas
+    assert len(searches) == 4 and len(results) == 4
+    assert sorted(downloads) == ["https://qd.test/5.txt", "https://qd.test/6.txt"]
+    # Um texto é extraído uma vez na execução, mesmo entre grupos diferentes
+    assert sum(len(call.args[0]) for call in classify.call_args_list) == 2
+    totals = {(r["territory_id"], r["keywords"]): r["document"]["data"]["total_invested"] for r in results}
+    assert totals == {
+        ("5300108", "tablet"): 5000.0, ("5300108", "robótica"): 5000.0,
+        ("5208707", "tablet"): 11000.0, ("5208707", "robótica"): 11000.0,
+    }
+    store.close()
+
+
+def test_diario_sem_identidade_nao_e_somado_de_novo_e_teto_nao_avanca_marca(tmp_path, upstream, monkeypatch):
+    universe, calls, downloads = upstream
+    universe.append({"territory_id": "5300108", "excerpts": ["software R$ 9.000,00"]})  # sem id, url nem data
+    universe.append({**_gazette(11, "9.000"), "date": ""})
+    store = SyncStateStore(tmp_path / "sync.sqlite3")
+
+    first = asyncio.run(sync_territory("5300108", "software", until="2024-03-15", initial_since="2024-03-01", store=store))
+    second = asyncio.run(sync_territory("5300108", "software", until="2024-03-15", store=store))
+
+    assert first["new_gazettes"] == 2 and second["new_gazettes"] == 0
+    assert second["document"]["data"]["total_invested"] == 3000.0
+    assert all(d for d in store.get("5300108", "software")["recent_ids"].values())
+
+    # Busca que bate no teto: a marca fica onde estava e nada é recontado
+    universe.append(_gazette(14, "4.000"))
+    monkeypatch.setattr("services.api.clients.querido_diario_client.QD_MAX_GAZETTES", 1)
+    capped = asyncio.run(sync_territory("5300108", "software", until="2024-03-20", store=store))
+    assert capped["high_water"] == "2024-03-10" and capped["new_gazettes"] == 1
+    again = asyncio.run(sync_territory("5300108", "software", until="2024-03-20", store=store))
+    assert again["new_gazettes"] == 0
+    assert again["document"]["data"]["total_invested"] == 7000.0
+    store.close()
+
+
+def test_estado_perdido_e_recuperado_do_documento_salvo(tmp_path, upstream):
+    universe, calls, downloads = upstream
+    first_store = SyncStateStore(tmp_path / "a.sqlite3")
+    first = asyncio.run(sync_territory("5300108", "software", until="2024-03-15", initial_since="2024-03-01", store=first_store))
+    document = json.loads(json.dumps(first["document"]))  # como volta do arquivo salvo
+    first_store.close()
+
+    # SQLite perdido (cache expirado): o documento recria o estado
+    store = SyncStateStore(tmp_path / "b.sqlite3")
+    assert restore_state("5300108", "software", {"meta": {}, "data": {}}, store=store) is False
+    assert restore_state("5300108", "Software ", document, store=store) is True
+
+    universe.append(_gazette(12, "4.000"))
+    del calls[:]
+    second = asyncio.run(sync_territory("5300108", "software", until="2024-03-20", store=store))
+
+    assert min(c[0] for c in calls) > "2024-03-01"
+    assert second["new_gazettes"] == 1
+    assert second["document"]["data"]["total_invested"] == 7000.0
+    store.close()
+
+
+def test_pares_excluidos_ficam_fora_do_lote(tmp_path, upstream):
+    store = SyncStateStore(tmp_path / "sync.sqlite3")
+
+    results = asyncio.run(sync_batch(
+        ["5300108"], ["software", "robótica"], until="2024-03-15", store=store, exclude={("5300108", "software")}
+    ))
+
+    assert [r["keywords"] for r in results] == ["robótica"]
+    assert store.get("5300108", "software") is None
+    store.close()
+
+
+def test_falha_upstream_nao_altera_o_estado(tmp_path, mocker):
+    store = SyncStateStore(tmp_path / "sync.sqlite3")
+    mocker.patch("services.api.clients.query_planner.fetch_gazettes_sharded", return_value=None)
+
+    result = asyncio.run(sync_territory("5300108", "software", until="2024-03-15", store=store))
+
+    assert "error" in result
+    assert store.get("5300108", "software") is None
+    store.close()
+
+
+def test_nome_do_arquivo_por_busca():
+    assert sync_filename("5300108", "Tecnologia  Educação") == "analysis_sync_5300108_tecnologia-educacao.json"
+    assert sync_filename("5300108", None) == "analysis_sync_5300108_educacao-tecnologia-informatica.json"
+
+
+def test_carga_do_corpus_responde_qualquer_palavra_offline(mocker):
+    from datetime import date, timedelta
+
+    from services.api.clients import gazette_corpus
+
+    today = date.today()
+    old_day = (today - timedelta(days=10)).isoformat()
+    universe = [
+        {"territory_id": "5300108", "date": old_day, "txt_url": "https://qd.test/a.txt"},
+        {"territory_id": "5300108", "date": today.isoformat(), "txt_url": "https://qd.test/b.txt"},
+    ]
+    requests = []
+
+    async def _pages(self, filters, max_items=None):
+        requests.append((filters.published_since, filters.querystring))
+        yield [g for g in universe if filters.published_since.isoformat() <= g["date"]]
+
+    async def _texts(gazettes, concurrency=None):
+        return {g["txt_url"]: f"Aquisição de kits de robótica ({g['date']})" for g in gazettes}
+
+    mocker.patch("services.api.clients.querido_diario_client.QueridoDiarioClient.iter_gazette_pages", new=_pages)
+    mocker.patch("services.api.clients.gazette_text_client.fetch_full_texts", new=_texts)
+
+    loaded = asyncio.run(incremental_sync.load_territory_corpus("5300108", days=30))
+
+    assert loaded["gazettes"] == 2 and loaded["covered"]
+    assert requests == [(today - timedelta(days=30), None)]
+    # Palavra-chave nunca buscada no upstream, resolvida pelo índice
+    local = gazette_corpus.get_corpus().search("5300108", (today - timedelta(days=30)).isoformat(), old_day, "robótica")
+    assert [g["txt_url"] for g in local["gazettes"]] == ["https://qd.test/a.txt"]
+
+    # A próxima carga só busca o trecho ainda não coberto (dias recentes)
+    asyncio.run(incremental_sync.load_territory_corpus("5300108", days=30))
+    settled = today - timedelta(days=gazette_corpus.SETTLE_DAYS)
+    assert requests[-1][0] == settled + timedelta(days=1)
@@ -0,0 +1,148 @@
+# backend/tests/api/test_job_queue.py
+import asyncio
+
+import pytest
+
+from services.integration.job_queue import JobQueue
+
+
+async def _wait_status(queue, job_id, *states):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job.status in states:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} não chegou a {states}")
+
+
+@pytest.mark.asyncio
+async def test_executa_jobs_respeitando_o_limite_de_workers():
+    queue = JobQueue(workers=2)
+    running = {"now": 0, "max": 0}
+
+    async def handler(n):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        return {"n": n}
+
+    queue.register("teste", handler)
+    submitted = [await queue.submit("teste", {"n": n}) for n in range(5)]
+    jobs = [await _wait_status(queue, s["job_id"], "done") for s in submitted]
+    await queue.stop()
+
+    assert [job.result for job in jobs] == [{"n": n} for n in range(5)]
+    assert running["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_jobs_identicos_ativos_sao_deduplicados():
+    queue = JobQueue(workers=1)
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(territory_id):
+        calls.append(territory_id)
+        await release.wait()
+        return {"ok": territory_id}
+
+    queue.register("analysis", handler)
+    first = await queue.submit("analysis", {"territory_id": "5300108"})
+    second = await queue.submit("analysis", {"territory_id": "5300108"})
+    other = await queue.submit("analysis", {"territory_id": "3550308"})
+
+    assert second["job_id"] == first["job_id"] and second["deduplicated"]
+    assert other["job_id"] != first["job_id"]
+
+    release.set()
+    await _wait_status(queue, other["job_id"], "done")
+    # Concluído, o mesmo pedido vira um job novo
+    third = await queue.submit("analysis", {"territory_id": "5300108"})
+    assert third["job_id"] != first["job_id"]
+    await _wait_status(queue, third["job_id"], "done")
+    await queue.stop()
+
+    assert calls == ["5300108", "3550308", "5300108"]
+
+
+@pytest.mark.asyncio
+async def test_cancelamento_na_fila_e_rodando():
+    queue = JobQueue(workers=1)
+    started = asyncio.Event()
+    cancelled = []
+    calls = []
+
+    async def handler(n):
+        calls.append(n)
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+
+    queue.register("teste", handler)
+    running = await queue.submit("teste", {"n": 1})
+    waiting = await queue.submit("teste", {"n": 2})
+    await started.wait()
+
+    assert (await queue.cancel(waiting["job_id"])).status == "cancelled"
+    assert (await queue.cancel(running["job_id"])).status == "cancelled"
+    await asyncio.sleep(0.02)
+    await queue.stop()
+
+    assert calls == [1] and cancelled == [1]
+
+
+@pytest.mark.asyncio
+async def test_falha_do_handler_marca_job_como_failed():
+    queue = JobQueue(workers=1)
+
+    async def handler():
+        raise RuntimeError("quebrou")
+
+    queue.register("teste", handler)
+    submitted = await queue.submit("teste", {})
+    job = await _wait_status(queue, submitted["job_id"], "failed")
+    await queue.stop()
+
+    assert job.error == "quebrou"
+
+
+@pytest.mark.asyncio
+async def test_tipo_desconhecido():
+    with pytest.raises(ValueError):
+        await JobQueue().submit("nao_existe", {})
+
+
+@pytest.mark.asyncio
+async def test_fila_persistente_retoma_jobs_interrompidos(tmp_path):
+    db = str(tmp_path / "jobs.db")
+
+    async def travado(n):
+        await asyncio.sleep(10)
+
+    queue = JobQueue(workers=1, db_path=db)
+    queue.register("teste", travado)
+    interrupted = await queue.submit("teste", {"n": 1})
+    await _wait_status(queue, interrupted["job_id"], "running")
+    await queue.stop()
+    queue.close()
+
+    async def rapido(n):
+        return {"n": n}
+
+    restarted = JobQueue(workers=1, db_path=db)
+    restarted.register("teste", rapido)
+    await restarted.start()
+    job = await _wait_status(restarted, interrupted["job_id"], "done")
+    assert job.result == {"n": 1}
+    await restarted.stop()
+    restarted.close()
+
+    # Status e resultado continuam consultáveis direto do SQLite
+    reopened = JobQueue(workers=1, db_path=db)
+    stored = await reopened.get(interrupted["job_id"])
+    assert stored.status == "done" and stored.result == {"n": 1}
+    reopened.close()
@@ -0,0 +1,123 @@
+# backend/tests/api/test_model_loading.py
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from services.api.clients import gemini_client, spacy_api_client
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def test_importar_app_nao_carrega_modelos():
+    code = (
+        "import sys, main; "
+        "print([m for m in ('spacy', 'google.generativeai', 'pandas') if m in sys.modules])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_modelo_carregado_no_primeiro_uso(monkeypatch):
+    loads = []
+    monkeypatch.setattr(spacy_api_client, "nlp", None)
+    monkeypatch.setattr(spacy_api_client, "_model_state", "not_loaded")
+    monkeypatch.setattr(spacy_api_client, "_load_ner_model", lambda: loads.append(1) or object())
+
+    assert spacy_api_client.model_status() == "not_loaded"
+    first = spacy_api_client.get_nlp()
+    assert spacy_api_client.get_nlp() is first
+    assert loads == [1]
+    assert spacy_api_client.model_status() == "loaded"
+
+
+def test_modelo_carregado_so_com_componentes_da_ner(monkeypatch):
+    import spacy
+
+    calls = []
+    real_load = spacy.load
+
+    def _load(name, **kwargs):
+        calls.append(kwargs)
+        return real_load(name, **kwargs)
+
+    monkeypatch.setattr(spacy, "load", _load)
+    model = spacy_api_client._load_ner_model()
+
+    assert set(calls[0]["exclude"]).isdisjoint(spacy_api_client.NER_PIPES)
+    assert set(model.pipe_names) <= set(spacy_api_client.NER_PIPES)
+    assert "ner" in model.pipe_names
+
+
+def test_modelo_indisponivel_nao_quebra_ner(monkeypatch):
+    def _missing():
+        raise IOError("modelo não instalado")
+
+    monkeypatch.setattr(spacy_api_client, "nlp", None)
+    monkeypatch.setattr(spacy_api_client, "_model_state", "not_loaded")
+    monkeypatch.setattr(spacy_api_client, "_load_ner_model", _missing)
+    monkeypatch.setattr(spacy_api_client, "NER_WORKERS", 0)
+    monkeypatch.setattr(spacy_api_client, "_ner_executor", None)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+
+    assert asyncio.run(spacy_api_client.warm_up()) is False
+    assert spacy_api_client.model_status() == "unavailable"
+    assert asyncio.run(spacy_api_client.extract_entities("A Prefeitura publicou o edital.")) == []
+
+
+def test_health_reporta_estado_dos_modelos(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(spacy_api_client, "nlp", None)
+    monkeypatch.setattr(spacy_api_client, "_model_state", "loading")
+    monkeypatch.setattr(gemini_client, "_client_state", "missing_key")
+
+    body = TestClient(app).get("/health").json()
+    assert body["status"] == "healthy"
+    assert body["ready"] is False
+    assert body["models"] == {"ner": "loading", "llm": "missing_key"}
+
+    monkeypatch.setattr(spacy_api_client, "_model_state", "loaded")
+    assert TestClient(app).get("/health").json()["ready"] is True
+
+
+def test_pool_atualiza_estado_e_tenta_de_novo_apos_intervalo(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+
+    def _chunk(documents, batch_size):
+        calls.append(len(documents))
+        return [(source, [{"text": "Prefeitura", "label": "ORG"}]) for source, _ in documents]
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(spacy_api_client, "nlp", None)
+    monkeypatch.setattr(spacy_api_client, "_model_state", "not_loaded")
+    monkeypatch.setattr(spacy_api_client, "_unavailable_at", 0.0)
+    monkeypatch.setattr(spacy_api_client, "_get_ner_executor", lambda: executor)
+    monkeypatch.setattr(spacy_api_client, "_pipe_entities_chunk", _chunk)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+
+    # Sem warm-up: a primeira chamada bem-sucedida ao pool marca o modelo como carregado
+    assert asyncio.run(spacy_api_client.extract_entities_batch([(0, "texto")])) == {0: [{"text": "Prefeitura", "label": "ORG"}]}
+    assert spacy_api_client.model_status() == "loaded"
+
+    def _missing(documents, batch_size):
+        raise spacy_api_client.ModelUnavailableError("sem modelo")
+
+    monkeypatch.setattr(spacy_api_client, "_pipe_entities_chunk", _missing)
+    assert asyncio.run(spacy_api_client.extract_entities_batch([(0, "texto")])) == {}
+    assert spacy_api_client.model_status() == "unavailable"
+
+    # Dentro do intervalo nem chama o pool; depois dele tenta de novo
+    monkeypatch.setattr(spacy_api_client, "_pipe_entities_chunk", _chunk)
+    assert asyncio.run(spacy_api_client.extract_entities_batch([(0, "texto")])) == {}
+    assert calls == [1]
+    monkeypatch.setattr(spacy_api_client, "NER_RETRY_AFTER", 0)
+    assert asyncio.run(spacy_api_client.extract_entities_batch([(0, "texto")]))
+    assert spacy_api_client.model_status() == "loaded"
+    executor.shutdown()
@@ -0,0 +1,76 @@
+# backend/tests/api/test_querido_diario_client.py
+import httpx
+import pytest
+
+from services.api.clients import http_pool, querido_diario_client
+from services.api.clients.querido_diario_client import FilterParams, QueridoDiarioClient
+
+TOTAL = 7
+
+
+@pytest.fixture
+def mock_qd(monkeypatch):
+    """API falsa com TOTAL diários, respeitando `size` e `offset`."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        offset, size = int(params.get("offset", 0)), int(params["size"])
+        requests.append((offset, size))
+        gazettes = [
+            {"date": "2024-01-02", "excerpts": [f"diário {i}"]}
+            for i in range(offset, min(offset + size, TOTAL))
+        ]
+        return httpx.Response(200, json={"total_gazettes": TOTAL, "gazettes": gazettes})
+
+    monkeypatch.setattr(
+        http_pool, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(querido_diario_client, "QD_PAGE_SIZE", 3)
+    monkeypatch.setattr(querido_diario_client, "QD_MAX_GAZETTES", 0)
+    yield requests
+    http_pool._client = None
+    http_pool._client_loop = None
+
+
+@pytest.mark.asyncio
+async def test_percorre_todas_as_paginas(mock_qd):
+    pages = [page async for page in querido_diario_client.iter_gazette_pages("5300108", "2024-01-01", "2024-01-31")]
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert sorted(mock_qd) == [(0, 3), (3, 3), (6, 3)]
+
+    data = await querido_diario_client.fetch_gazettes("5300108", "2024-01-01", "2024-01-31")
+    assert data["total_gazettes"] == TOTAL
+    assert [g["excerpts"][0] for g in data["gazettes"]] == [f"diário {i}" for i in range(TOTAL)]
+
+
+@pytest.mark.asyncio
+async def test_limite_maximo_de_itens(mock_qd):
+    pages = [page async for page in querido_diario_client.iter_gazette_pages("5300108", "2024-01-01", "2024-01-31", max_items=4)]
+
+    assert sum(len(p) for p in pages) == 4
+    assert sorted(mock_qd) == [(0, 3), (3, 1)]
+
+
+@pytest.mark.asyncio
+async def test_cliente_pagina_com_tamanho_dos_filtros(mock_qd):
+    client = QueridoDiarioClient()
+    filters = FilterParams(territory_ids="5300108", size=5)
+    pages = [page async for page in client.iter_gazette_pages(filters)]
+
+    assert [len(p) for p in pages] == [5, 2]
+
+
+@pytest.mark.asyncio
+async def test_erro_http_na_busca_retorna_none(monkeypatch):
+    monkeypatch.setattr(
+        http_pool, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(500)))
+    )
+    try:
+        assert await querido_diario_client.fetch_gazettes("5300108", "2024-01-01", "2024-01-31") is None
+    finally:
+        http_pool._client = None
+        http_pool._client_loop = None
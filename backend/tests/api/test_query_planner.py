@@ -0,0 +1,111 @@
+# backend/tests/api/test_query_planner.py
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+from services.api.clients import http_pool, query_planner, querido_diario_client
+
+
+def _corpus(since: date, until: date, per_day):
+    gazettes = []
+    day = since
+    while day <= until:
+        for n in range(per_day(day)):
+            gazettes.append({"date": day.isoformat(), "txt_url": f"https://qd/{day}/{n}.txt", "excerpts": ["x"]})
+        day += timedelta(days=1)
+    return gazettes
+
+
+@pytest.fixture
+def fake_qd(monkeypatch):
+    """API falsa que respeita published_since/until, offset e size."""
+    state = {"corpus": [], "requests": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        since, until = params["published_since"], params["published_until"]
+        offset, size = int(params.get("offset", 0)), int(params["size"])
+        state["requests"].append((since, until, offset))
+        found = [g for g in state["corpus"] if since <= g["date"] <= until]
+        return httpx.Response(200, json={"total_gazettes": len(found), "gazettes": found[offset:offset + size]})
+
+    monkeypatch.setattr(
+        http_pool, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(querido_diario_client, "QD_PAGE_SIZE", 100)
+    monkeypatch.setattr(querido_diario_client, "QD_MAX_GAZETTES", 0)
+    yield state
+    http_pool._client = None
+    http_pool._client_loop = None
+
+
+def test_split_range_respeita_limites_de_mes():
+    shards = query_planner.split_range(date(2024, 1, 15), date(2024, 3, 10), "month")
+    assert shards == [
+        (date(2024, 1, 15), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 10)),
+    ]
+
+
+def test_plan_shards_por_tamanho_do_periodo():
+    assert len(query_planner.plan_shards(date(2024, 1, 1), date(2024, 1, 5))) == 1
+    assert len(query_planner.plan_shards(date(2024, 1, 1), date(2024, 1, 31))) == 5
+    assert len(query_planner.plan_shards(date(2022, 1, 1), date(2024, 12, 31))) == 36
+
+
+@pytest.mark.asyncio
+async def test_periodo_longo_em_fatias_mensais(fake_qd):
+    fake_qd["corpus"] = _corpus(date(2023, 1, 1), date(2023, 12, 31), lambda d: 1)
+
+    data = await query_planner.fetch_gazettes_sharded("5300108", "2023-01-01", "2023-12-31")
+
+    assert data["total_gazettes"] == 365
+    assert [g["date"] for g in data["gazettes"]] == sorted(g["date"] for g in fake_qd["corpus"])
+    assert {(s, u) for s, u, _ in fake_qd["requests"]} == {
+        (a.isoformat(), b.isoformat())
+        for a, b in query_planner.split_range(date(2023, 1, 1), date(2023, 12, 31), "month")
+    }
+
+
+@pytest.mark.asyncio
+async def test_fatia_no_teto_e_subdividida(fake_qd, monkeypatch):
+    monkeypatch.setattr(query_planner, "QD_SHARD_MAX_GAZETTES", 50)
+    # Março tem 10 diários por dia: estoura o teto e vira semanas/dias
+    fake_qd["corpus"] = _corpus(date(2024, 1, 1), date(2024, 4, 30), lambda d: 10 if d.month == 3 else 1)
+
+    data = await query_planner.fetch_gazettes_sharded("5300108", "2024-01-01", "2024-04-30")
+
+    assert data["total_gazettes"] == len(fake_qd["corpus"])
+    assert len({g["txt_url"] for g in data["gazettes"]}) == len(fake_qd["corpus"])
+    ranges = {(s, u) for s, u, _ in fake_qd["requests"]}
+    assert ("2024-03-01", "2024-03-07") in ranges
+    assert ("2024-03-01", "2024-03-01") in ranges
+
+
+@pytest.mark.asyncio
+async def test_diarios_repetidos_entre_fatias_sao_deduplicados(fake_qd):
+    corpus = _corpus(date(2024, 1, 1), date(2024, 3, 31), lambda d: 1)
+    # O mesmo diário publicado (indexado) em duas datas
+    corpus.append({**corpus[0], "date": "2024-02-15"})
+    fake_qd["corpus"] = corpus
+
+    pages = [page async for page in query_planner.iter_sharded_pages("5300108", "2024-01-01", "2024-03-31")]
+    urls = [g["txt_url"] for page in pages for g in page]
+
+    assert len(urls) == len(set(urls)) == len(corpus) - 1
+
+
+@pytest.mark.asyncio
+async def test_erro_http_retorna_none(monkeypatch):
+    monkeypatch.setattr(
+        http_pool, "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(503)))
+    )
+    try:
+        assert await query_planner.fetch_gazettes_sharded("5300108", "2020-01-01", "2024-12-31") is None
+    finally:
+        http_pool._client = None
+        http_pool._client_loop = None
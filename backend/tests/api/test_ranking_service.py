@@ -0,0 +1,87 @@
+# backend/tests/api/test_ranking_service.py
+import asyncio
+
+import pytest
+
+from services.api.ranking import ranking_service as ranking_module
+from services.api.ranking.ranking_service import RankingService
+
+
+def _gazettes(value: str):
+    return {"gazettes": [{
+        "date": "2024-05-02",
+        "excerpts": [f"Aquisição de software educacional no valor de R$ {value}."],
+    }]}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """RankingService com o Querido Diário simulado e estatísticas em thread."""
+    monkeypatch.setattr(ranking_module, "_get_stats_executor", lambda: None)
+    monkeypatch.setattr(ranking_module, "RANKING_MUNICIPALITY_TIMEOUT", 0.2)
+
+    async def fake_search(territory_id, start_date, end_date, keywords):
+        if territory_id == "lento":
+            await asyncio.sleep(5)
+        if territory_id == "quebrado":
+            raise RuntimeError("falha simulada")
+        if territory_id == "vazio":
+            return None
+        return _gazettes({"a": "1.000,00", "b": "5.000,00"}[territory_id])
+
+    svc = RankingService()
+    monkeypatch.setattr(svc.qd_client, "search_gazettes", fake_search)
+    return svc
+
+
+@pytest.mark.asyncio
+async def test_ranking_paralelo_com_resultado_parcial(service):
+    result = await service.get_state_municipalities_ranking(
+        state_code="GO",
+        territory_ids=["a", "lento", "b", "quebrado", "vazio"],
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        keywords=["software"],
+    )
+
+    assert list(result["municipalities"]) == ["a", "b"]
+    assert [m["territory_id"] for m in result["rankings"]["by_investment"]] == ["b", "a"]
+    assert result["partial"] is True
+    assert {f["territory_id"]: f["reason"] for f in result["failed_municipalities"]} == {
+        "lento": "timeout",
+        "quebrado": "error",
+    }
+
+
+@pytest.mark.asyncio
+async def test_iter_municipalities_emite_um_evento_por_municipio(service):
+    events = [
+        event async for event in service.iter_municipalities(
+            ["a", "b", "vazio"], "2024-01-01", "2024-12-31", ["software"]
+        )
+    ]
+
+    assert sorted(e["territory_id"] for e in events) == ["a", "b", "vazio"]
+    assert {e["territory_id"]: e["status"] for e in events}["vazio"] == "empty"
+
+
+def test_stream_do_ranking_nao_expoe_o_agregado_interno(service, monkeypatch):
+    import json
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.api.ranking import routes
+
+    monkeypatch.setattr(routes, "ranking_service", service)
+    response = TestClient(main.app).post("/api/v1/ranking/state/stream", json={
+        "state_code": "GO", "territory_ids": ["a", "b"], "start_date": "2024-01-01",
+        "end_date": "2024-12-31", "keywords": ["software"],
+    })
+
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    municipalities = [e for e in events if e["event"] == "municipality"]
+    assert len(municipalities) == 2
+    assert all("investment_aggregate" not in e["data"] for e in municipalities)
+    assert "investment_aggregate" not in response.text
+    assert events[-1]["data"]["rankings"]["state_totals"]["total_invested"] == 6000.0
@@ -0,0 +1,156 @@
+# backend/tests/api/test_response_cache.py
+import asyncio
+import time
+from datetime import date, timedelta
+
+from services.integration import response_cache
+from services.integration.response_cache import ResponseCache, make_key, ttl_for_period
+
+
+def test_requisicoes_identicas_simultaneas_executam_uma_vez():
+    cache = ResponseCache(max_entries=8)
+    calls = 0
+
+    async def _compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"gazettes": [1, 2, 3]}
+
+    async def _run():
+        return await asyncio.gather(*(cache.get_or_compute("k", _compute, ttl=60) for _ in range(10)))
+
+    results = asyncio.run(_run())
+    assert calls == 1
+    assert all(r == {"gazettes": [1, 2, 3]} for r in results)
+    # Cada chamador recebe sua própria cópia
+    results[0]["gazettes"].append(4)
+    assert results[1] == {"gazettes": [1, 2, 3]}
+
+    # Depois, direto do cache
+    asyncio.run(cache.get_or_compute("k", _compute, ttl=60))
+    assert calls == 1
+
+
+def test_erros_nao_vao_para_o_cache():
+    cache = ResponseCache(max_entries=8)
+    calls = 0
+
+    async def _compute():
+        nonlocal calls
+        calls += 1
+        return {"error": "Erro de conexão"}
+
+    for _ in range(2):
+        asyncio.run(cache.get_or_compute("k", _compute, ttl=60))
+    assert calls == 2
+
+
+def test_excecao_propaga_para_todos_que_aguardam():
+    cache = ResponseCache(max_entries=8)
+
+    async def _boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("QD fora do ar")
+
+    async def _run():
+        return await asyncio.gather(*(cache.get_or_compute("k", _boom, ttl=60) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelar_quem_iniciou_nao_cancela_os_demais(tmp_path):
+    for disk_dir in (None, tmp_path):
+        cache = ResponseCache(max_entries=8, disk_dir=disk_dir)
+        calls = 0
+
+        async def _compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"gazettes": [1]}
+
+        async def _run():
+            leader = asyncio.ensure_future(cache.get_or_compute("k", _compute, ttl=60))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.ensure_future(cache.get_or_compute("k", _compute, ttl=60)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await asyncio.wait_for(asyncio.gather(*waiters), timeout=2)
+
+        assert asyncio.run(_run()) == [{"gazettes": [1]}] * 3
+        assert calls == 1
+
+
+def test_cancelamento_durante_gravacao_em_disco_nao_trava(tmp_path, mocker):
+    # Sem memória: quem aguarda depende só da task em andamento
+    cache = ResponseCache(max_entries=0, disk_dir=tmp_path)
+    original = cache._disk_put
+
+    def _slow_put(*args):
+        time.sleep(0.05)
+        original(*args)
+
+    mocker.patch.object(cache, "_disk_put", side_effect=_slow_put)
+    mocker.patch.object(cache, "_disk_get", return_value=None)
+
+    async def _compute():
+        return {"gazettes": [1]}
+
+    async def _run():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", _compute, ttl=60))
+        await asyncio.sleep(0.01)  # líder já está gravando em disco
+        waiter = asyncio.ensure_future(cache.get_or_compute("k", _compute, ttl=60))
+        await asyncio.sleep(0.01)  # quem aguarda já está na execução em andamento
+        leader.cancel()
+        return await asyncio.wait_for(waiter, timeout=2)
+
+    assert asyncio.run(_run()) == {"gazettes": [1]}
+    assert len(list(tmp_path.rglob("*.json.gz"))) == 1
+
+
+def test_lru_e_camada_em_disco(tmp_path):
+    async def _value(v):
+        return {"v": v}
+
+    cache = ResponseCache(max_entries=1, disk_dir=tmp_path)
+    asyncio.run(cache.get_or_compute("a", lambda: _value(1), ttl=60))
+    asyncio.run(cache.get_or_compute("b", lambda: _value(2), ttl=60))
+    assert list(cache._memory) == ["b"]
+
+    # Outro processo/worker: memória vazia, mesmo diretório
+    other = ResponseCache(max_entries=4, disk_dir=tmp_path)
+    result = asyncio.run(other.get_or_compute("a", lambda: _value(99), ttl=60))
+    assert result == {"v": 1}
+
+
+def test_ttl_maior_para_periodos_encerrados():
+    yesterday = date.today() - timedelta(days=1)
+    assert ttl_for_period(yesterday.isoformat()) == response_cache.RESPONSE_CACHE_TTL_PAST
+    assert ttl_for_period(date.today()) == response_cache.RESPONSE_CACHE_TTL_RECENT
+    assert ttl_for_period(None) == response_cache.RESPONSE_CACHE_TTL_RECENT
+    assert make_key("x", a=1, b=2) == make_key("x", b=2, a=1)
+
+
+def test_analyze_repetido_nao_refaz_o_pipeline(mocker):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    pages = []
+
+    async def _iter(*args, **kwargs):
+        pages.append(1)
+        yield [{"date": "2024-01-02", "excerpts": ["A Prefeitura de Brasília informa sobre licitação."]}]
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_iter)
+    mocker.patch("services.api.clients.spacy_api_client.extract_entities_batch", return_value={})
+    mocker.patch("services.integration.piter_api_orchestrator.save_json_file")
+
+    client = TestClient(app)
+    params = {"territory_id": "5300108", "since": "2024-01-01", "until": "2024-01-05"}
+    first = client.get("/analyze", params=params).json()
+    second = client.get("/analyze", params=params).json()
+
+    assert first == second
+    assert len(pages) == 1
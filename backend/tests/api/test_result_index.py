@@ -0,0 +1,138 @@
+# backend/tests/api/test_result_index.py
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+from services.integration import result_index
+from services.integration.result_index import ResultIndex
+
+
+def _write(path, territory, total, mtime, gazettes=None, period="2024-01-01 a 2024-01-31"):
+    content = {
+        "meta": {"source_territory": territory, "period": period, "search_keywords": "software"},
+        "data": {"total_invested": total, "total_entities": 3},
+    }
+    if gazettes is not None:
+        content["gazettes"] = gazettes
+    path.write_text(json.dumps(content), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+    return content
+
+
+def test_lista_paginada_mais_recentes_primeiro(tmp_path):
+    for i in range(5):
+        _write(tmp_path / f"analysis_5300108_{i}.json", "5300108", 10.0 * i, 1_000_000 + i)
+    index = ResultIndex(tmp_path)
+
+    rows, total, _ = index.list(limit=2, offset=1)
+
+    assert total == 5
+    assert [r["name"] for r in rows] == ["analysis_5300108_3.json", "analysis_5300108_2.json"]
+    assert rows[0]["total_invested"] == 30.0
+    assert rows[0]["type"] == "analysis"
+    assert rows[0]["period"] == "2024-01-01 a 2024-01-31"
+    index.close()
+
+
+def test_sync_le_so_arquivos_novos_ou_alterados(tmp_path, mocker):
+    _write(tmp_path / "search_a.json", "5300108", 1.0, 1_000_000)
+    _write(tmp_path / "search_b.json", "5300108", 2.0, 1_000_001, gazettes=[{}, {}])
+    index = ResultIndex(tmp_path)
+    index.sync()
+
+    record = mocker.spy(index, "record")
+    _write(tmp_path / "search_c.json", "3550308", 3.0, 1_000_002)
+    _write(tmp_path / "search_a.json", "5300108", 9.0, 1_000_003)
+    (tmp_path / "search_b.json").unlink()
+
+    rows, total, _ = index.list()
+
+    assert sorted(call.args[0].name for call in record.call_args_list) == ["search_a.json", "search_c.json"]
+    assert total == 2
+    assert {r["name"]: r["total_invested"] for r in rows} == {"search_a.json": 9.0, "search_c.json": 3.0}
+    index.close()
+
+
+def test_arquivo_invalido_fica_no_indice_com_erro(tmp_path):
+    (tmp_path / "search_quebrado.json").write_text("{nao é json", encoding="utf-8")
+    index = ResultIndex(tmp_path)
+
+    rows, _, _ = index.list()
+
+    assert rows[0]["name"] == "search_quebrado.json" and rows[0]["error"]
+    index.close()
+
+
+def test_endpoint_data_output_responde_pelo_indice(tmp_path, monkeypatch):
+    _write(tmp_path / "search_5300108_1.json", "5300108", 5.0, 1_000_000, gazettes=[{"date": "2024-01-02"}])
+    content = _write(tmp_path / "analysis_5300108_2.json", "5300108", 7.0, 1_000_001)
+    _write(tmp_path / "archive_old.json", "5300108", 1.0, 999_999)
+    monkeypatch.setattr(main, "DATA_OUTPUT_DIR", tmp_path)
+    client = TestClient(main.app)
+
+    listing = client.get("/data_output", params={"limit": 2}).json()
+    assert listing["total"] == 3
+    assert [f["name"] for f in listing["files"]] == ["analysis_5300108_2.json", "search_5300108_1.json"]
+    assert "data" not in listing["files"][0]
+    assert listing["files"][1]["total_gazettes"] == 1
+
+    with_data = client.get("/data_output", params={"limit": 1, "include_data": True}).json()
+    assert with_data["files"][0]["data"] == content
+
+    analysis = client.get("/api/v1/analysis/files").json()
+    assert analysis["total"] == 2
+    assert [f["filename"] for f in analysis["files"]] == ["analysis_5300108_2.json", "search_5300108_1.json"]
+
+    result_index.get_result_index(tmp_path).close()
+
+
+def test_filtros_e_cursor_no_indice(tmp_path):
+    for i in range(6):
+        territory = "5300108" if i % 2 else "3550308"
+        period = "2023-01-01 a 2023-12-31" if i < 3 else "2024-03-01 a 2024-03-31"
+        _write(tmp_path / f"analysis_{territory}_{i}.json", territory, float(i), 1_000_000 + i, period=period)
+    _write(tmp_path / "search_5300108_9.json", "5300108", 9.0, 1_000_009)
+    index = ResultIndex(tmp_path)
+
+    rows, total, _ = index.list(territory_id="5300108", kind="analysis")
+    assert total == 3 and [r["name"] for r in rows] == [
+        "analysis_5300108_5.json", "analysis_5300108_3.json", "analysis_5300108_1.json"
+    ]
+
+    rows, total, _ = index.list(since="2024-01-01", until="2024-02-15")
+    assert total == 1 and rows[0]["name"] == "search_5300108_9.json"
+
+    # Cursor: páginas sem sobreposição, estáveis mesmo com um arquivo novo no meio
+    first, total, cursor = index.list(limit=3)
+    _write(tmp_path / "analysis_novo.json", "5300108", 1.0, 2_000_000)
+    second, _, cursor2 = index.list(limit=3, cursor=cursor)
+    third, _, cursor3 = index.list(limit=3, cursor=cursor2)
+    names = [r["name"] for r in first + second + third]
+    assert total == 7 and len(names) == len(set(names)) == 7
+    assert "analysis_novo.json" not in names and cursor3 is None
+    index.close()
+
+
+def test_endpoint_summary_e_projecao(tmp_path, monkeypatch, mocker):
+    content = _write(tmp_path / "search_5300108_1.json", "5300108", 5.0, 1_000_000, gazettes=[{"date": "2024-01-02"}] * 3)
+    monkeypatch.setattr(main, "DATA_OUTPUT_DIR", tmp_path)
+    client = TestClient(main.app)
+    load = mocker.spy(result_index, "load_result")
+
+    summary = client.get("/data_output", params={"summary": True}).json()["files"][0]["data"]
+    assert summary == {
+        "meta": content["meta"],
+        "data": {"total_invested": 5.0, "total_gazettes": 3, "total_entities": 3},
+    }
+    assert load.call_count == 0
+
+    projected = client.get("/data_output", params={"fields": "meta.source_territory,data.total_invested,nao.existe"})
+    assert projected.json()["files"][0]["data"] == {
+        "meta": {"source_territory": "5300108"},
+        "data": {"total_invested": 5.0},
+    }
+
+    assert client.get("/data_output", params={"cursor": "???"}).status_code == 400
+    result_index.get_result_index(tmp_path).close()
@@ -0,0 +1,86 @@
+# backend/tests/api/test_result_store.py
+import json
+import shutil
+
+from fastapi.testclient import TestClient
+
+import main
+from services.integration import result_index, result_store
+from services.integration.piter_api_orchestrator import save_json_file
+from services.integration.result_store import ResultStore
+
+
+def _gazettes(n, start=0):
+    return [
+        {"date": "2024-01-02", "txt_url": f"https://qd/{i}.txt", "excerpts": [f"Contratação de software {i} " * 20]}
+        for i in range(start, start + n)
+    ]
+
+
+def _search(gazettes, total=10.0):
+    return {
+        "meta": {"source_territory": "5300108", "period": "2024-01-01 a 2024-01-31"},
+        "data": {"total_invested": total, "total_gazettes": len(gazettes)},
+        "gazettes": gazettes,
+    }
+
+
+def test_grava_compactado_e_recupera_igual(tmp_path):
+    store = ResultStore(tmp_path)
+    data = _search(_gazettes(30))
+
+    path = store.save("search_5300108_1.json", data)
+
+    assert path.name == "search_5300108_1.json.gz"
+    assert path.stat().st_size < len(json.dumps(data, indent=2)) / 5
+    assert store.load("search_5300108_1.json") == data
+    assert store.load("search_5300108_1.json.gz") == data
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+    store.close()
+
+
+def test_arquivo_salvo_e_autocontido(tmp_path):
+    ResultStore(tmp_path).save("search_a.json", _search(_gazettes(10)))
+
+    # Copiado sem o .store/, o arquivo ainda traz os diários
+    copia = tmp_path / "copia"
+    copia.mkdir()
+    shutil.copy(tmp_path / "search_a.json.gz", copia)
+    assert ResultStore(copia).load("search_a.json") == _search(_gazettes(10))
+
+
+def test_ponteiro_e_arquivos_legados(tmp_path):
+    legacy = {"meta": {"source_territory": "3550308"}, "data": {"total_invested": 1.0}}
+    (tmp_path / "analysis_legado.json").write_text(json.dumps(legacy), encoding="utf-8")
+    store = ResultStore(tmp_path)
+    path = store.save("search_novo.json", _search(_gazettes(2)))
+    store.set_pointer("latest_search.json", path)
+
+    assert store.load("analysis_legado.json") == legacy
+    assert store.load("latest_search.json") == _search(_gazettes(2))
+    store.close()
+
+
+def test_save_json_file_grava_uma_vez_e_indexa(tmp_path, monkeypatch):
+    backend = tmp_path / "backend"
+    backend.mkdir()
+    monkeypatch.chdir(backend)
+    data = _search(_gazettes(3), total=42.0)
+
+    save_json_file(data, "search_5300108_x.json", is_latest=True, latest_name="latest_search.json")
+
+    output = backend / "data_output"
+    assert sorted(p.name for p in output.iterdir() if p.is_file()) == ["search_5300108_x.json.gz"]
+    assert not (tmp_path / "frontend").exists()
+
+    monkeypatch.setattr(main, "DATA_OUTPUT_DIR", output)
+    client = TestClient(main.app)
+    assert client.get("/data_output/latest_search.json").json() == data
+    assert client.get("/data_output/search_5300108_x.json").json() == data
+    listing = client.get("/data_output").json()
+    assert listing["files"][0]["name"] == "search_5300108_x.json.gz"
+    assert listing["files"][0]["total_invested"] == 42.0
+    assert client.get("/data_output", params={"include_data": True}).json()["files"][0]["data"] == data
+
+    result_index.get_result_index(output).close()
+    result_store.get_result_store(output).close()
@@ -0,0 +1,138 @@
+# backend/tests/api/test_spacy_api_client.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.api.clients import spacy_api_client
+
+
+class _SlowNlp:
+    """Modelo falso: bloqueia a thread como o parsing real faria."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, text):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        self.running -= 1
+        ents = [SimpleNamespace(text="Prefeitura de Goiânia", label_="ORG"),
+                SimpleNamespace(text="A", label_="ORG"),
+                SimpleNamespace(text="ontem", label_="DATE")]
+        return SimpleNamespace(ents=ents)
+
+
+@pytest.fixture
+def thread_mode(monkeypatch):
+    """Sem pool de processos (NER_WORKERS=0): o modelo falso roda em thread."""
+    fake = _SlowNlp()
+    monkeypatch.setattr(spacy_api_client, "nlp", fake)
+    monkeypatch.setattr(spacy_api_client, "NER_WORKERS", 0)
+    monkeypatch.setattr(spacy_api_client, "_ner_executor", None)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+    return fake
+
+
+def test_ner_nao_bloqueia_event_loop(thread_mode):
+    async def _run():
+        ticks = 0
+
+        async def _ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(_ticker())
+        entities = await spacy_api_client.extract_entities("texto")
+        ticker.cancel()
+        return entities, ticks
+
+    entities, ticks = asyncio.run(_run())
+    assert entities == [{"text": "Prefeitura de Goiânia", "label": "ORG"}]
+    # O loop continuou atendendo outras corrotinas durante o parsing
+    assert ticks >= 5
+
+
+def test_backpressure_limita_textos_em_andamento(thread_mode, monkeypatch):
+    monkeypatch.setattr(spacy_api_client, "NER_MAX_PENDING", 1)
+
+    async def _run():
+        return await asyncio.gather(*(spacy_api_client.extract_entities("texto") for _ in range(3)))
+
+    results = asyncio.run(_run())
+    assert len(results) == 3
+    assert thread_mode.max_running == 1
+
+
+def test_pool_de_processos_extrai_entidades(monkeypatch):
+    monkeypatch.setattr(spacy_api_client, "NER_WORKERS", 1)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+    monkeypatch.setattr(spacy_api_client, "_ner_executor", None)
+    try:
+        entities = asyncio.run(spacy_api_client.extract_entities("A Prefeitura de São Paulo publicou o edital."))
+        assert isinstance(entities, list)
+        assert spacy_api_client._ner_executor is not None
+    finally:
+        spacy_api_client.shutdown_ner_executor()
+
+
+class _PipeNlp:
+    """Modelo falso com `pipe`: cada palavra capitalizada vira uma entidade ORG."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def _doc(self, text):
+        words = [w for w in text.split() if w[:1].isupper()]
+        return SimpleNamespace(ents=[SimpleNamespace(text=w, label_="ORG") for w in words])
+
+    def __call__(self, text):
+        return self._doc(text)
+
+    def pipe(self, stream, as_tuples=False, batch_size=None, n_process=1):
+        self.batch_sizes.append(batch_size)
+        for text, context in stream:
+            yield self._doc(text), context
+
+
+def test_lote_atribui_entidades_ao_diario_de_origem(monkeypatch):
+    fake = _PipeNlp()
+    monkeypatch.setattr(spacy_api_client, "nlp", fake)
+    monkeypatch.setattr(spacy_api_client, "NER_WORKERS", 0)
+    monkeypatch.setattr(spacy_api_client, "_ner_executor", None)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+
+    gazettes = [
+        {"excerpts": ["contrato com Positivo", "edital da Seduc"]},
+        {"excerpts": []},
+        # Bem além do antigo corte de 10.000 caracteres
+        {"excerpts": ["texto " * 5000 + "Microsoft"]},
+    ]
+    documents = spacy_api_client.gazette_documents(gazettes)
+    result = asyncio.run(spacy_api_client.extract_entities_batch(documents, batch_size=8))
+
+    assert result == {
+        0: [{"text": "Positivo", "label": "ORG"}, {"text": "Seduc", "label": "ORG"}],
+        2: [{"text": "Microsoft", "label": "ORG"}],
+    }
+    assert fake.batch_sizes == [8]
+
+
+def test_lote_no_pool_de_processos(monkeypatch):
+    monkeypatch.setattr(spacy_api_client, "NER_WORKERS", 1)
+    monkeypatch.setattr(spacy_api_client, "BATCHES_PER_TASK", 1)
+    monkeypatch.setattr(spacy_api_client, "_pending", {})
+    monkeypatch.setattr(spacy_api_client, "_ner_executor", None)
+    documents = [(i % 3, f"A Prefeitura de São Paulo publicou o edital {i}.") for i in range(5)]
+    try:
+        result = asyncio.run(spacy_api_client.extract_entities_batch(documents, batch_size=2))
+        assert set(result) <= {0, 1, 2}
+        assert all(isinstance(ents, list) for ents in result.values())
+    finally:
+        spacy_api_client.shutdown_ner_executor()
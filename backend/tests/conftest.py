@@ -0,0 +1,43 @@
+# backend/tests/conftest.py
+import pytest
+
+import main
+from services.api.clients import gazette_corpus
+from services.integration import response_cache, result_index, result_store
+
+
+@pytest.fixture(autouse=True)
+def _limpa_cache_de_respostas():
+    """Cada teste começa sem respostas em cache (os mocks mudam entre testes)."""
+    cache = response_cache.get_response_cache()
+    if cache is not None:
+        cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _corpus_isolado(tmp_path, monkeypatch):
+    """Corpus local em um SQLite temporário: buscas de um teste não respondem as do próximo."""
+    monkeypatch.setenv("GAZETTE_CORPUS_DB", str(tmp_path / "gazette_corpus.sqlite3"))
+    monkeypatch.setattr(gazette_corpus, "_corpus", None)
+    yield
+    if gazette_corpus._corpus is not None:
+        gazette_corpus._corpus.close()
+    gazette_corpus._corpus = None
+
+
+@pytest.fixture(autouse=True)
+def _resultados_isolados(tmp_path, monkeypatch):
+    """
+    data_output (resultados, ponteiros e `.index`) em um diretório temporário:
+    /analyze e save_search não gravam em backend/data_output durante os testes.
+    """
+    data_dir = tmp_path / "data_output"
+    # save_json_file resolve data_output a partir do diretório atual
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "DATA_OUTPUT_DIR", data_dir)
+    monkeypatch.setattr(result_store, "_stores", {})
+    monkeypatch.setattr(result_index, "_indexes", {})
+    yield
+    for index in result_index._indexes.values():
+        index.close()
@@ -0,0 +1,118 @@
+# backend/tests/processing/referencia_investimentos.py
+"""
+`extract_investment_statistics` como era antes das otimizações: diário a
+diário, com floats somados em dicionários e cada valor classificado varrendo
+a janela de 500 caracteres com regex (termos de exclusão, filtro
+software/robótica e subcategorias). Só existe nos testes: é a referência de
+equivalência e de benchmark para os fatos/agregados de `investment_facts`.
+
+Única adaptação: o texto completo vem de `full_texts` (txt_url -> texto) em
+vez do download síncrono feito dentro do laço.
+"""
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from services.processing.statistics_generator import CATEGORY_MAP, EXCLUSION_TERMS, StatisticsGenerator
+
+
+def estatisticas_laco(
+    gazettes: List[Dict[str, Any]],
+    selected_category: str = None,
+    full_texts: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    gen = StatisticsGenerator()
+    full_texts = full_texts or {}
+    total_invested = 0.0
+    category_totals = {cat: 0.0 for cat in CATEGORY_MAP.keys()}
+    category_totals["Outros"] = 0.0
+
+    money_re = re.compile(r"(?:R\$\s?)?(\d{1,3}(?:\.\d{3})*,\d{2})")
+
+    # Até um ano (366 dias) -> agrupar por mês, senão por ano
+    parsed_dates = [gen._parse_date(g.get('date')) for g in gazettes if g.get('date')]
+    parsed_dates = [d for d in parsed_dates if d is not None]
+    group_by = 'month'
+    if parsed_dates:
+        group_by = 'month' if (max(parsed_dates) - min(parsed_dates)).days <= 366 else 'year'
+
+    ts_acc = defaultdict(float)
+    count_acc = defaultdict(int)
+
+    for gazette in gazettes:
+        gazette_date = gen._parse_date(gazette.get('date'))
+        time_bucket = None
+        if gazette_date:
+            if group_by == 'month':
+                time_bucket = f"{gazette_date.year}-{gazette_date.month:02d}"
+            else:
+                time_bucket = f"{gazette_date.year}"
+            count_acc[time_bucket] += 1
+
+        # PRIORIDADE: texto completo via txt_url > excerpts
+        text_content = ""
+        txt_url = gazette.get("txt_url")
+        if txt_url and full_texts.get(txt_url):
+            text_content = full_texts[txt_url]
+        if not text_content and "excerpts" in gazette and gazette["excerpts"]:
+            if isinstance(gazette["excerpts"], list):
+                text_content = "\n".join([str(e) for e in gazette["excerpts"] if e])
+            else:
+                text_content = str(gazette["excerpts"])
+        elif "excerpt" in gazette:
+            text_content = str(gazette["excerpt"])
+
+        if not text_content:
+            continue
+
+        for match in money_re.finditer(text_content):
+            try:
+                clean_value = float(match.group(1).replace('.', '').replace(',', '.'))
+            except ValueError:
+                continue
+            if clean_value < 100 or clean_value > 100000000:
+                continue
+
+            start_index = match.start()
+            end_index = match.end()
+            context_window = text_content[max(0, start_index - 500): min(len(text_content), end_index + 500)].lower()
+
+            if any(term in context_window for term in EXCLUSION_TERMS):
+                continue
+
+            # FILTRO PRINCIPAL: só valores com "software" ou "robótica" no contexto
+            has_software = bool(re.search(r'\bsoftware\b', context_window))
+            has_robotica = bool(re.search(r'\brobótica\b', context_window))
+            if not has_software and not has_robotica:
+                continue
+
+            # SUBCATEGORIZAÇÃO ("Outros" por último)
+            found_category = None
+            for category, keywords in CATEGORY_MAP.items():
+                if category == "Outros":
+                    continue
+                for keyword in keywords:
+                    if re.search(r'\b' + re.escape(keyword) + r'\b', context_window):
+                        found_category = category
+                        break
+                if found_category:
+                    break
+            if not found_category:
+                found_category = "Robótica" if has_robotica else "Outros"
+
+            total_invested += clean_value
+            category_totals[found_category] += clean_value
+            if time_bucket:
+                ts_acc[time_bucket] += clean_value
+
+    investments_by_period = {k: round(v, 2) for k, v in sorted(ts_acc.items())}
+    result = {
+        "total_invested": round(total_invested, 2),
+        "investments_by_category": {k: round(v, 2) for k, v in category_totals.items()},
+        "investments_by_period": investments_by_period,
+        "publications_by_period": {k: v for k, v in sorted(count_acc.items())},
+        "period_grouping": group_by,
+    }
+    if selected_category:
+        result["time_series"] = investments_by_period
+    return result
@@ -0,0 +1,160 @@
+# backend/tests/processing/test_data_cleaner_stream.py
+import os
+import random
+import re
+import time
+
+import pytest
+
+from services.processing import data_cleaner
+from services.processing.data_cleaner import _text_chunks, clean_stream, iter_clean_lines, pre_filter_spacy_input
+
+
+def _pre_filter_referencia(raw_text, max_length=10000):
+    """Implementação anterior (texto inteiro, padrões compilados a cada chamada)."""
+    if not raw_text:
+        return ""
+    text = re.sub(r'<[^>]+>', ' ', raw_text)
+    full_line = re.compile(
+        r'^(Página \d+ de \d+)$'
+        r'|^(Diário Oficial (do Município|Nº)[\s\d\w]+)$'
+        r'|^(Assinado Digitalmente (por|via):.*)$'
+        r'|^(\d{1,2}[/\.]\d{1,2}[/\.]\d{2,4})$'
+        r'|^\s*[\.\-\_=\*]{3,}.*$'
+        r'|^(Publique-se|Cumpra-se|Resolve:)$'
+        , re.IGNORECASE
+    )
+    partial = re.compile(
+        r'\bArt\. \d+º?'
+        r'|\b§ \d+º?'
+        r'|\bInciso [IVXLCDM]+\b'
+        r'|\d{3}\.\d{3}\.\d{3}-\d{2}'
+        r'|\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}'
+        r'|\b[A-Fa-f0-9]{20,}\b'
+        r'|Data: \d{1,2}[/\.]\d{1,2}[/\.]\d{2,4}'
+        , re.IGNORECASE
+    )
+    cleaned_lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or full_line.match(line):
+            continue
+        if (line.upper() == line) and any(c.isalpha() for c in line) and len(line) < 100:
+            continue
+        line = partial.sub('', line).strip()
+        if len(line) < 15:
+            continue
+        cleaned_lines.append(line)
+    final_text = re.sub(r'\s+', ' ', " ".join(cleaned_lines)).strip()
+    return final_text[:max_length] if max_length is not None else final_text
+
+
+_LINHAS = [
+    "Página 3 de 40",
+    "Diário Oficial do Município 1234",
+    "Assinado Digitalmente por: Fulano",
+    "12/03/2024",
+    "---------- fim ----------",
+    "Resolve:",
+    "SECRETARIA MUNICIPAL DE ADMINISTRAÇÃO",
+    "Art. 2º Fica contratada a empresa Alfa Tecnologia Ltda para serviços de software.",
+    "CNPJ 12.345.678/0001-90, CPF 123.456.789-00, hash a1b2c3d4e5f6a1b2c3d4e5f6a1b2",
+    "<p>Contrato de <b>manutenção</b>\tde   sistemas no valor de R$ 10.000,00</p>",
+    "<div class='x'\n data-y='1'>Aquisição de licenças de banco de dados</div>",
+    "curta",
+    "Extrato do termo aditivo ao contrato nº 45/2023 — Inciso IV da Lei 8.666",
+    "   ",
+    "a < b e c > d no texto corrido da licitação para rede",
+]
+
+
+def _diario(rng, n_linhas):
+    quebras = ["\n", "\r\n", "\n\n", "\r"]
+    return "".join(rng.choice(_LINHAS) + rng.choice(quebras) for _ in range(n_linhas))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+@pytest.mark.parametrize("seed", range(5))
+def test_stream_equivale_a_implementacao_anterior(seed, chunk_size):
+    text = _diario(random.Random(seed), 120)
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    for max_length in (None, 10000, 500, 37):
+        assert clean_stream(chunks, max_length) == _pre_filter_referencia(text, max_length)
+    assert pre_filter_spacy_input(text) == _pre_filter_referencia(text)
+
+
+def test_tag_html_aberta_atravessa_blocos():
+    text = "Linha válida antes da tag <span\nclass='x'> continua aqui depois da tag\n"
+    chunks = ["Linha válida antes da tag <sp", "an\nclass='x", "'> continua aqui depois da tag\n"]
+
+    assert clean_stream(chunks, None) == _pre_filter_referencia(text, None)
+
+
+def test_menor_solto_nao_segura_o_resto_do_texto(mocker):
+    """Um '<' sem '>' (texto corrido) não é tag: não vai de bloco em bloco até o fim."""
+    linha = "Contratação de serviços de manutenção de rede para escolas municipais\n"
+    text = "Se o valor < limite da dispensa, a compra é direta.\n" + linha * 50_000
+    chunks = list(_text_chunks(text))
+    consumed = []
+
+    def blocos():
+        for chunk in chunks:
+            consumed.append(len(chunk))
+            yield chunk
+
+    assert clean_stream(blocos(), 10000) == _pre_filter_referencia(text)
+    assert len(consumed) == 1
+    assert clean_stream(iter(chunks), None) == _pre_filter_referencia(text, None)
+
+    # Tag de verdade que nunca fecha: o trecho segurado é limitado
+    tag = "<div class='x'\n" + linha * 50_000
+    held = []
+    original = data_cleaner._HTML_TAG_RE
+
+    class _Espiao:
+        def sub(self, repl, block):
+            held.append(len(block))
+            return original.sub(repl, block)
+
+    mocker.patch.object(data_cleaner, "_HTML_TAG_RE", _Espiao())
+    clean_stream(_text_chunks(tag), None)
+    assert max(held) <= 2 * data_cleaner.CHUNK_SIZE + data_cleaner.MAX_OPEN_TAG
+
+
+def test_para_de_consumir_quando_o_orcamento_acaba():
+    consumed = []
+
+    def linhas():
+        for i in range(10_000):
+            consumed.append(i)
+            yield f"Contratação de serviços de software número {i}\n"
+
+    result = clean_stream(linhas(), max_length=200)
+
+    assert len(result) == 200
+    assert len(consumed) < 10
+    assert next(iter_clean_lines(["PÁGINA\n", "Linha útil do diário oficial\n"])) == "Linha útil do diário oficial"
+
+
+def test_benchmark_stream_vs_texto_inteiro():
+    """
+    Compara a implementação anterior com o filtro em streaming em diários
+    grandes (saída truncada no padrão de 10.000 caracteres). Tamanho
+    configurável com PITER_BENCH_CLEANER_LINES (padrão 50.000 linhas/diário).
+    """
+    n_linhas = int(os.getenv("PITER_BENCH_CLEANER_LINES", 50_000))
+    rng = random.Random(21)
+    texts = [_diario(rng, n_linhas) for _ in range(5)]
+
+    start = time.perf_counter()
+    expected = [_pre_filter_referencia(t) for t in texts]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = [pre_filter_spacy_input(t) for t in texts]
+    stream_time = time.perf_counter() - start
+
+    size_mb = sum(len(t) for t in texts) / 1e6
+    print(f"\n📊 {size_mb:.1f} MB de texto: anterior {full_time:.3f}s, streaming {stream_time:.3f}s ({full_time / stream_time:.1f}x)")
+    assert result == expected
@@ -0,0 +1,122 @@
+# backend/tests/processing/test_investment_batch.py
+import os
+import random
+import time
+
+import pytest
+
+from services.processing import investment_facts
+from services.processing.investment_facts import aggregate_gazettes
+from tests.processing.referencia_investimentos import estatisticas_laco
+
+# Exercita o caminho colunar (`investment_batch.classify_money`)
+pytest.importorskip("pandas")
+
+
+COMMON = (
+    "o município torna público que contrato aquisição processo pregão eletrônico "
+    "objeto serviços prestação secretaria fundo valor empresa ltda cnpj"
+).split()
+RARE = ["software", "robótica", "rede", "escolar", "gestão", "icms", "servidores", "nuvem", "salário", "erp"]
+
+
+def _money(rng: random.Random) -> str:
+    value = f"{rng.randint(1, 999)}.{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}"
+    kind = rng.random()
+    if kind < 0.4:
+        return f"R$ {value}"
+    if kind < 0.6:
+        return f"R${value}"
+    if kind < 0.7:
+        # Fora da faixa (acima de 100 milhões) ou pequeno demais
+        return rng.choice(["R$ 1.000.000.000,00", "R$ 99,99", "12,00"])
+    return value
+
+
+def _text(rng: random.Random, size: int) -> str:
+    tokens = []
+    for _ in range(size):
+        r = rng.random()
+        if r < 0.04:
+            tokens.append(rng.choice(RARE))
+        elif r < 0.06:
+            tokens.append(_money(rng))
+        else:
+            tokens.append(rng.choice(COMMON))
+    return " ".join(tokens)
+
+
+def _gazettes(rng: random.Random, count: int, years=(2023,)):
+    gazettes = []
+    for i in range(count):
+        gazette = {"excerpts": [_text(rng, 60) for _ in range(rng.randint(0, 3))]}
+        if rng.random() > 0.05:
+            gazette["date"] = f"{rng.choice(years)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        if rng.random() < 0.1:
+            gazette["txt_url"] = f"https://example.org/{i}.txt"
+        gazettes.append(gazette)
+    return gazettes
+
+
+def _lote(gazettes, selected=None, full_texts=None):
+    """Caminho de produção com o cache de fatos vazio: todos os textos passam por `classify_money`."""
+    investment_facts.get_fact_cache().clear()
+    return aggregate_gazettes(gazettes, full_texts).to_statistics(selected)
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    yield
+    investment_facts.get_fact_cache().clear()
+
+
+@pytest.mark.parametrize("years,selected", [((2023,), None), ((2020, 2023), None), ((2023,), "Software")])
+def test_lote_equivale_ao_laco_original(years, selected):
+    rng = random.Random(len(years))
+    gazettes = _gazettes(rng, 300, years)
+    full_texts = {g["txt_url"]: _text(rng, 400) for g in gazettes if "txt_url" in g and rng.random() < 0.5}
+
+    assert _lote(gazettes, selected, full_texts) == estatisticas_laco(gazettes, selected, full_texts)
+
+
+def test_lote_vazio_e_sem_valores():
+    for gazettes in ([], [{"date": "2024-01-02", "excerpts": ["software sem valores"]}]):
+        assert _lote(gazettes) == estatisticas_laco(gazettes)
+
+
+def test_valor_na_borda_entre_diarios():
+    """A janela de contexto não atravessa para o diário vizinho."""
+    gazettes = [
+        {"date": "2024-01-02", "excerpts": ["R$ 5.000,00"]},
+        {"date": "2024-01-03", "excerpts": ["aquisição de software"]},
+    ]
+    result = _lote(gazettes)
+    assert result["total_invested"] == 0.0
+    assert result["publications_by_period"] == {"2024-01": 2}
+
+
+# Ganho mínimo sobre o laço original (medido: ~2,3x em 10.000 diários)
+MIN_SPEEDUP = float(os.getenv("PITER_BENCH_MIN_SPEEDUP", 1.5))
+
+
+@pytest.mark.skipif(not os.getenv("PITER_BENCH"), reason="benchmark: rode com PITER_BENCH=1")
+def test_benchmark_lote_vs_laco():
+    """
+    Compara o laço original com o caminho de produção (`aggregate_gazettes`,
+    cache de fatos vazio) em um lote grande. Opcional (PITER_BENCH=1);
+    tamanho configurável com PITER_BENCH_GAZETTES (padrão 10.000).
+    """
+    count = int(os.getenv("PITER_BENCH_GAZETTES", 10_000))
+    gazettes = _gazettes(random.Random(6), count, (2022, 2023, 2024))
+
+    start = time.perf_counter()
+    expected = estatisticas_laco(gazettes)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = _lote(gazettes)
+    batch_time = time.perf_counter() - start
+
+    print(f"\n📊 {count} diários: laço {loop_time:.3f}s, lote {batch_time:.3f}s ({loop_time / batch_time:.1f}x)")
+    assert result == expected
+    assert loop_time / batch_time >= MIN_SPEEDUP
@@ -0,0 +1,52 @@
+# backend/tests/processing/test_investment_classifier.py
+import random
+
+import pytest
+
+from services.processing.statistics_generator import CLASSIFIER, MONEY_RE
+
+
+VOCAB = [
+    "software", "Software", "softwares", "xsoftware", "robótica", "ROBÓTICA",
+    "rede", "redes", "_rede", "escolar", "gestão", "erp", "data center",
+    "icms", "receita", "licença-prêmio", "art. 18", "servidores", "nuvem",
+    "contrato", "valor", "de", "o", "R$ 1.234,56", "R$ 150.000,00", "12,00",
+]
+
+
+def _random_text(rng: random.Random) -> str:
+    tokens = [rng.choice(VOCAB) for _ in range(rng.randint(5, 400))]
+    # Às vezes sem espaços, para exercitar as bordas de palavra
+    return (" " if rng.random() < 0.7 else "").join(tokens)
+
+
+def test_indice_equivale_a_varredura_por_janela():
+    """Classificar pelo índice deve dar o mesmo resultado que varrer a janela recortada."""
+    rng = random.Random(42)
+    for _ in range(200):
+        text = _random_text(rng)
+        index = CLASSIFIER.index(text)
+        for match in MONEY_RE.finditer(text):
+            window = text[max(0, match.start() - 500): match.end() + 500].lower()
+            assert index.classify(match.start(), match.end()) == CLASSIFIER.classify_window(window)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Contratação de software de gestão: R$ 1.000,00", "Gestão"),
+    ("Kit de robótica educacional R$ 2.000,00", "Educação"),
+    ("Kit de robótica R$ 2.000,00", "Robótica"),
+    ("Licença de software R$ 3.000,00", "Outros"),
+    ("Licença de software, recolhimento de ICMS R$ 3.000,00", None),
+    ("Aquisição de cadeiras R$ 3.000,00", None),
+    ("Contrato de softwares R$ 3.000,00", None),  # 'softwares' não casa '\bsoftware\b'
+])
+def test_classificacao(text, expected):
+    match = MONEY_RE.search(text)
+    assert CLASSIFIER.index(text).classify(match.start(), match.end()) == expected
+
+
+def test_texto_com_lower_de_tamanho_diferente_usa_janela():
+    """'İ'.lower() muda o tamanho do texto; o resultado deve continuar correto."""
+    text = "İSTANBUL software de rede R$ 5.000,00"
+    match = MONEY_RE.search(text)
+    assert CLASSIFIER.index(text).classify(match.start(), match.end()) == "Rede"
@@ -0,0 +1,116 @@
+# backend/tests/processing/test_investment_facts.py
+import random
+
+import pytest
+
+from services.api.ranking.ranking_service import RankingService
+from services.processing import investment_facts
+from services.processing.investment_facts import InvestmentAggregate, aggregate_gazettes, merge_aggregates
+from services.processing.statistics_generator import StatisticsGenerator
+from tests.processing.referencia_investimentos import estatisticas_laco
+
+
+TRECHOS = [
+    "Aquisição de software de gestão escolar no valor de R$ {v}.",
+    "Contratação de servidores em nuvem, valor global {v}.",
+    "Pagamento de salário e vencimentos: R$ {v}.",
+    "Serviço de rede e backup de dados por R${v}.",
+    "Licitação de obras de pavimentação, R$ {v}.",
+]
+
+
+def _gazettes(seed, count, years=(2023,), prefix="g"):
+    rng = random.Random(seed)
+    gazettes = []
+    for i in range(count):
+        value = f"{rng.randint(1, 999)}.{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}"
+        gazette = {
+            "txt_url": f"https://qd.test/{prefix}{i}.txt",
+            "excerpts": [rng.choice(TRECHOS).format(v=value) for _ in range(rng.randint(0, 3))],
+        }
+        if rng.random() > 0.1:
+            gazette["date"] = f"{rng.choice(years)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        gazettes.append(gazette)
+    return gazettes
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    investment_facts.get_fact_cache().clear()
+    yield
+    investment_facts.get_fact_cache().clear()
+
+
+@pytest.mark.parametrize("years,selected", [((2023,), None), ((2020, 2023), None), ((2023,), "Software")])
+def test_agregado_equivale_ao_laco_original(years, selected):
+    gazettes = _gazettes(len(years), 200, years)
+    gen = StatisticsGenerator()
+
+    expected = estatisticas_laco(gazettes, selected)
+
+    assert aggregate_gazettes(gazettes, generator=gen).to_statistics(selected) == expected
+    assert gen.extract_investment_statistics(gazettes, selected) == expected
+
+
+def test_merge_de_paginas_igual_a_busca_inteira():
+    """Meses de anos diferentes em páginas separadas: o agrupamento só é decidido no fim."""
+    gazettes = _gazettes(3, 120, (2021, 2023))
+    pages = [gazettes[:50], gazettes[50:90], gazettes[90:]]
+    whole = aggregate_gazettes(gazettes).to_statistics()
+
+    parts = [aggregate_gazettes(page) for page in pages]
+
+    assert merge_aggregates(parts).to_statistics() == whole
+    assert (parts[2] + parts[0] + parts[1]).to_statistics() == whole
+    restored = [InvestmentAggregate.from_dict(p.to_dict()) for p in parts]
+    assert merge_aggregates(restored).to_statistics() == whole
+    assert whole["period_grouping"] == "year"
+
+
+def test_diario_novo_so_varre_o_texto_novo(mocker):
+    gazettes = _gazettes(4, 50)
+    gen = StatisticsGenerator()
+    before = gen.extract_investment_statistics(gazettes)
+    classify = mocker.spy(investment_facts, "_classify")
+
+    novo = {"date": "2023-06-01", "txt_url": "https://qd.test/novo.txt", "excerpts": ["x"]}
+    full_texts = {novo["txt_url"]: "Aquisição de software ERP no valor de R$ 50.000,00."}
+    after = gen.extract_investment_statistics(gazettes + [novo], full_texts=full_texts)
+
+    assert classify.call_count == 1 and len(classify.call_args.args[0]) == 1
+    assert after["total_invested"] == round(before["total_invested"] + 50000.0, 2)
+
+    # Mesmo diário com outro texto não reaproveita o fato antigo
+    full_texts[novo["txt_url"]] = "Aquisição de software ERP no valor de R$ 70.000,00."
+    changed = gen.extract_investment_statistics(gazettes + [novo], full_texts=full_texts)
+    assert changed["total_invested"] == round(before["total_invested"] + 70000.0, 2)
+
+
+def test_fatos_persistidos_no_sqlite(tmp_path):
+    db = str(tmp_path / "facts.sqlite")
+    primeiro = investment_facts._FactCache(db_path=db)
+    keys = [f"k{i}" for i in range(3)]
+    primeiro.put_many({k: {"date": None, "month": None, "values": [[10000, "Outros", 0, 5]]} for k in keys})
+
+    segundo = investment_facts._FactCache(db_path=db)
+
+    assert set(segundo.get_many(keys + ["ausente"])) == set(keys)
+
+
+def test_ranking_soma_agregados_dos_municipios():
+    a, b = _gazettes(6, 30, prefix="a"), _gazettes(7, 30, prefix="b")
+    results = {
+        tid: {
+            "total_gazettes": len(g),
+            "total_invested": aggregate_gazettes(g).to_statistics()["total_invested"],
+            "investment_aggregate": aggregate_gazettes(g).to_dict(),
+        }
+        for tid, g in (("a", a), ("b", b))
+    }
+
+    ranking = RankingService().build_ranking(results)
+
+    state = ranking["rankings"]["state_totals"]
+    assert state["total_gazettes"] == 60
+    assert {k: v for k, v in state.items() if k != "total_gazettes"} == estatisticas_laco(a + b)
+    assert "investment_aggregate" not in ranking["municipalities"]["a"]
@@ -101,4 +101,20 @@ def test_stats_gen_com_dados_mal_formados(stats_gen):
 
     # value_counts() em 'text' conta apenas textos válidos (não-None)
     # "Prefeitura" e "Brasília" têm texto válido
-    assert statistics["top_entities"] == {"Prefeitura": 1, "Brasília": 1}
\ No newline at end of file
+    assert statistics["top_entities"] == {"Prefeitura": 1, "Brasília": 1}
+
+def test_investment_stats_usa_textos_pre_carregados(stats_gen):
+    """O texto completo vem do mapa `full_texts`, sem nenhum download inline."""
+    gazettes = [{
+        "date": "2024-03-10",
+        "txt_url": "http://qd.test/diario.txt",
+        "excerpts": ["trecho sem valores"],
+    }]
+    full_texts = {
+        "http://qd.test/diario.txt": "Contratação de software de gestão escolar no valor de R$ 12.500,00."
+    }
+
+    statistics = stats_gen.extract_investment_statistics(gazettes, full_texts=full_texts)
+
+    assert statistics["total_invested"] == 12500.0
+    assert statistics["investments_by_period"] == {"2024-03": 12500.0}
@@ -0,0 +1,213 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from main import app
+from services.integration import response_cache
+
+client = TestClient(app)
+
+GAZETTES = [
+    {"date": "2024-01-02", "url": "http://example.com/1.pdf",
+     "excerpts": ["Contratação de software educacional no valor de R$ 12.000,00 pela Prefeitura de Brasília."]},
+    {"date": "2024-01-03", "url": "http://example.com/2.pdf",
+     "excerpts": ["Aquisição de kits de robótica por R$ 5.000,00."]},
+]
+
+
+def _mock_pipeline(mocker, pages):
+    async def _iter(*args, **kwargs):
+        for page in pages:
+            yield page
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_iter)
+    mocker.patch(
+        "services.api.clients.spacy_api_client.extract_entities_batch",
+        return_value={0: [{"text": "Prefeitura de Brasília", "label": "ORG"}]},
+    )
+    mocker.patch("services.integration.piter_api_orchestrator.gemini_client", None)
+    return mocker.patch("services.integration.piter_api_orchestrator.save_json_file")
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_stream_ndjson_emite_etapas_e_resultado_igual_ao_analyze(mocker):
+    save = _mock_pipeline(mocker, [GAZETTES[:1], GAZETTES[1:]])
+
+    response = client.get("/analyze/stream", params={"keywords": "software"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = _ndjson(response)
+    names = [e["event"] for e in events]
+    assert names == ["gazettes", "gazettes", "investments", "investments", "entities", "statistics", "result"]
+    assert events[1]["data"]["total_gazettes"] == 2
+    assert events[3]["data"]["total_invested"] == 17000.0
+    save.assert_called_once()
+
+    # Sem cache: /analyze recalcula tudo e deve chegar ao mesmo resultado
+    response_cache.get_response_cache().clear()
+    streamed = events[-1]["data"]
+    direct = client.get("/analyze", params={"keywords": "software"}).json()
+    streamed["meta"].pop("generated_at")
+    direct["meta"].pop("generated_at")
+    assert streamed == direct
+
+
+def test_stream_sse(mocker):
+    _mock_pipeline(mocker, [GAZETTES])
+
+    response = client.get("/analyze/stream", params={"format": "sse", "keywords": "robótica"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    blocks = [b for b in response.text.split("\n\n") if b]
+    assert blocks[0].startswith("event: gazettes\ndata: ")
+    last_event, last_data = blocks[-1].split("\n")
+    assert last_event == "event: result"
+    assert json.loads(last_data[len("data: "):])["data"]["total_invested"] == 17000.0
+
+
+def test_stream_sem_diarios_emite_erro(mocker):
+    save = _mock_pipeline(mocker, [])
+
+    events = _ndjson(client.get("/analyze/stream"))
+    assert events == [{"event": "error", "data": {"error": "Nenhum diário encontrado."}}]
+    save.assert_not_called()
+
+
+def test_stream_erro_de_conexao(mocker):
+    async def _falha(*args, **kwargs):
+        raise httpx.RequestError("sem rede")
+        yield
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_falha)
+    events = _ndjson(client.get("/analyze/stream", params={"keywords": "x"}))
+    assert events[-1] == {"event": "error", "data": {"error": "Erro de conexão"}}
+
+
+def test_resposta_malformada_do_upstream_vira_erro_json(mocker):
+    async def _malformada(*args, **kwargs):
+        raise json.JSONDecodeError("Expecting value", "<html>", 0)
+        yield
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_malformada)
+    response = client.get("/analyze", params={"keywords": "malformada"})
+    assert response.status_code == 200
+    assert response.json() == {"error": "Erro ao buscar dados do Querido Diário."}
+
+
+def test_stream_formato_invalido():
+    assert client.get("/analyze/stream", params={"format": "xml"}).status_code == 400
+
+
+def test_job_de_analise_via_endpoints(mocker):
+    import time
+
+    _mock_pipeline(mocker, [GAZETTES])
+    mocker.patch("main.MODEL_WARMUP", False)
+
+    with TestClient(app) as job_client:
+        submitted = job_client.post("/api/v1/jobs/analyze", params={"keywords": "software"})
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+
+        for _ in range(200):
+            result = job_client.get(f"/api/v1/jobs/{job_id}/result")
+            if result.status_code == 200:
+                break
+            assert result.status_code == 202
+            time.sleep(0.01)
+
+        assert result.status_code == 200
+        assert result.json()["data"]["total_invested"] == 17000.0
+        assert job_client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "done"
+        assert job_client.get("/api/v1/jobs/inexistente").status_code == 404
+
+
+def test_analise_qualitativa_resume_a_busca_e_sinaliza_truncamento(mocker):
+    _mock_pipeline(mocker, [GAZETTES])
+    mocker.patch("services.integration.piter_api_orchestrator.LLM_MAX_GAZETTES", 1)
+    gemini = mocker.MagicMock()
+
+    async def _contexto(text):
+        return {"resumo": text}
+
+    async def _trechos(snippets):
+        return {idx: {"resumo": f"diário {idx}"} for idx in snippets}
+
+    gemini.analyze_investment_context.side_effect = _contexto
+    gemini.analyze_snippets.side_effect = _trechos
+    mocker.patch("services.integration.piter_api_orchestrator.gemini_client", gemini)
+
+    data = client.get("/analyze", params={"keywords": "qualitativa"}).json()["data"]
+
+    # O resumo cobre todos os diários, não só o primeiro que respondeu
+    resumo = data["qualitative_analysis"]["resumo"]
+    assert "software educacional" in resumo and "kits de robótica" in resumo
+    assert [g["analysis"] for g in data["qualitative_analysis_by_gazette"]] == [{"resumo": "diário 0"}]
+    assert data["qualitative_analysis_coverage"] == {
+        "analyzed_gazettes": 1, "gazettes_with_text": 2, "truncated": True,
+    }
+
+
+def test_agregado_de_investimentos_roda_fora_do_event_loop(mocker):
+    import asyncio
+
+    from services.integration import piter_api_orchestrator
+
+    _mock_pipeline(mocker, [GAZETTES[:1], GAZETTES[1:]])
+    in_loop = []
+    original = piter_api_orchestrator.aggregate_gazettes
+
+    def _espiao(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            in_loop.append(True)
+        except RuntimeError:
+            in_loop.append(False)
+        return original(*args, **kwargs)
+
+    mocker.patch.object(piter_api_orchestrator, "aggregate_gazettes", _espiao)
+    events = _ndjson(client.get("/analyze/stream", params={"keywords": "thread"}))
+
+    assert events[-1]["data"]["data"]["total_invested"] == 17000.0
+    assert in_loop == [False, False]
+
+
+def test_stream_e_analyze_simultaneos_rodam_o_pipeline_uma_vez(mocker):
+    import asyncio
+
+    _mock_pipeline(mocker, [])
+    calls = 0
+
+    async def _lento(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        for page in (GAZETTES[:1], GAZETTES[1:]):
+            yield page
+
+    mocker.patch("services.api.clients.querido_diario_client.iter_gazette_pages", new=_lento)
+
+    async def _run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            params = {"keywords": "simultaneo"}
+            stream = asyncio.ensure_future(ac.get("/analyze/stream", params=params))
+            await asyncio.sleep(0.01)  # o stream chega primeiro e é o dono do cálculo
+            direct, stream_again = await asyncio.gather(
+                ac.get("/analyze", params=params), ac.get("/analyze/stream", params=params)
+            )
+            return await stream, direct, stream_again
+
+    stream, direct, stream_again = asyncio.run(_run())
+
+    assert calls == 1
+    events = _ndjson(stream)
+    assert [e["event"] for e in events][:2] == ["gazettes", "gazettes"]
+    assert events[-1]["data"] == direct.json()
+    # Quem só aguardou o cálculo recebe apenas o resultado final
+    assert _ndjson(stream_again) == [{"event": "result", "data": direct.json()}]
@@ -1,10 +1,9 @@
 # backend/tests/test_llm_integration.py
 import pytest
-import os
 from services.api.clients import gemini_client
 
 # Este teste só roda se houver uma API KEY configurada, para não falhar no CI/CD sem querer
-@pytest.mark.skipif(not os.getenv("GEMINI_API_KEY"), reason="Requer GEMINI_API_KEY no .env")
+@pytest.mark.skipif(not gemini_client.get_api_key(), reason="Requer GEMINI_API_KEY no .env")
 @pytest.mark.asyncio
 async def test_gemini_simple_analysis():
     """
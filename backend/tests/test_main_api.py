@@ -7,6 +7,13 @@ from main import app
 # Cria um cliente de teste para fazer requisições à API
 client = TestClient(app)
 
+
+def paginas(gazette_data):
+    """Simula `iter_gazette_pages`: uma única página com os diários da resposta."""
+    async def _iter(*args, **kwargs):
+        yield gazette_data["gazettes"]
+    return _iter
+
 # --- Teste para o cenário de texto vazio/inválido ---
 def test_analyze_endpoint_with_empty_text(mocker):
     """
@@ -17,7 +24,7 @@ def test_analyze_endpoint_with_empty_text(mocker):
 
     # --- Simulação (Mock) ---
     # 1. Simula a resposta do Querido Diário Client
-    # Dizemos ao mocker para substituir a função 'fetch_gazettes'
+    # Dizemos ao mocker para substituir a busca paginada 'iter_gazette_pages'
     # e fazer ela retornar um dicionário específico.
     mock_gazette_data_empty_excerpt = {
         "total_gazettes": 1,
@@ -37,8 +44,8 @@ def test_analyze_endpoint_with_empty_text(mocker):
         # Caminho completo para a função que queremos substituir
         # (Ajuste se o nome do módulo/arquivo for diferente)
         # Como estamos rodando de dentro do backend:
-        "services.api.clients.querido_diario_client.fetch_gazettes",
-        return_value=mock_gazette_data_empty_excerpt # O que a função simulada vai retornar
+        "services.api.clients.querido_diario_client.iter_gazette_pages",
+        new=paginas(mock_gazette_data_empty_excerpt) # O que a função simulada vai retornar
     )
 
     # (Opcional) Poderíamos mockar o data_cleaner também, mas vamos confiar nele por agora.
@@ -96,8 +103,8 @@ def test_analyze_endpoint_success(mocker):
         ]
     }
     mocker.patch(
-        "services.api.clients.querido_diario_client.fetch_gazettes",
-        return_value=mock_gazette_data_with_text
+        "services.api.clients.querido_diario_client.iter_gazette_pages",
+        new=paginas(mock_gazette_data_with_text)
     )
 
     # 2. Mock da resposta do Spacy API Client (com entidades de exemplo)
@@ -106,8 +113,8 @@ def test_analyze_endpoint_success(mocker):
         {"text": "licitação", "label": "MISC"}           # Miscelânea
     ]
     mocker.patch(
-        "services.api.clients.spacy_api_client.extract_entities",
-        return_value=mock_spacy_entities
+        "services.api.clients.spacy_api_client.extract_entities_batch",
+        return_value={0: mock_spacy_entities}
     )
 
     # --- Ação ---
@@ -150,10 +157,14 @@ def test_analyze_endpoint_qd_failure(mocker):
     print("\nExecutando test_analyze_endpoint_qd_failure...")
 
     # --- Simulação (Mock) ---
-    # Simula a função fetch_gazettes para levantar um erro de conexão
+    # Simula a busca paginada levantando um erro de conexão
+    async def _falha(*args, **kwargs):
+        raise httpx.RequestError("Simulação de erro de conexão com QD")
+        yield
+
     mocker.patch(
-        "services.api.clients.querido_diario_client.fetch_gazettes",
-        side_effect=httpx.RequestError("Simulação de erro de conexão com QD")
+        "services.api.clients.querido_diario_client.iter_gazette_pages",
+        new=_falha
     )
 
     # --- Ação ---
@@ -184,15 +195,15 @@ def test_analyze_endpoint_spacy_failure(mocker):
         "total_gazettes": 1, "gazettes": [{"excerpts": ["Texto válido aqui."]}]
     }
     mocker.patch(
-        "services.api.clients.querido_diario_client.fetch_gazettes",
-        return_value=mock_gazette_data_with_text
+        "services.api.clients.querido_diario_client.iter_gazette_pages",
+        new=paginas(mock_gazette_data_with_text)
     )
 
     # 2. Mock do Spacy Client para retornar uma lista vazia
     # (O código atual já trata exceções e retorna [], então vamos simular o resultado final)
     mocker.patch(
-        "services.api.clients.spacy_api_client.extract_entities",
-        return_value=[] # Simula Spacy não encontrando nada ou falhando
+        "services.api.clients.spacy_api_client.extract_entities_batch",
+        return_value={} # Simula Spacy não encontrando nada ou falhando
     )
 
     # --- Ação ---
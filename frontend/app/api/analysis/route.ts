@@ -6,6 +6,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import fs from 'fs';
 import path from 'path';
+import zlib from 'zlib';
 
 interface AnalysisFile {
   fileName: string;
@@ -37,7 +38,7 @@ export async function GET(request: NextRequest) {
 
     // Ler arquivos JSON
     const files = fs.readdirSync(dataDir)
-      .filter(file => file.endsWith('.json'))
+      .filter(file => file.endsWith('.json') || file.endsWith('.json.gz'))
       .slice(0, 20); // Limita a 20 arquivos
 
     const chartData: AnalysisFile[] = [];
@@ -47,7 +48,9 @@ export async function GET(request: NextRequest) {
     for (const file of files) {
       try {
         const filePath = path.join(dataDir, file);
-        const content = fs.readFileSync(filePath, 'utf-8');
+        // Resultados novos são gravados compactados (.json.gz)
+        const raw = fs.readFileSync(filePath);
+        const content = (file.endsWith('.gz') ? zlib.gunzipSync(raw) : raw).toString('utf-8');
         const data = JSON.parse(content);
 
         // Extrair dados de investimento
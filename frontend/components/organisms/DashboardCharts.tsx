@@ -106,7 +106,8 @@ export default function DashboardCharts() {
         setLoading(true);
         setError(null);
 
-        const response = await fetch(`${API_BASE_URL}/data_output`);
+        // Só os mais recentes, com conteúdo (a listagem padrão traz apenas metadados)
+        const response = await fetch(`${API_BASE_URL}/data_output?limit=10&include_data=true`);
         if (!response.ok) throw new Error('Erro ao carregar dados');
 
         const result = await response.json();
@@ -5,6 +5,7 @@
 
 import fs from 'fs';
 import path from 'path';
+import zlib from 'zlib';
 
 export interface AnalysisData {
   territory_id: string;
@@ -36,7 +37,7 @@ export async function loadAnalysisFiles(): Promise<AnalysisData[]> {
     }
 
     const files = fs.readdirSync(dataDir)
-      .filter(file => file.endsWith('.json'))
+      .filter(file => file.endsWith('.json') || file.endsWith('.json.gz'))
       .slice(0, 10); // Limita a 10 arquivos para não sobrecarregar
 
     const analysisData: AnalysisData[] = [];
@@ -44,7 +45,9 @@ export async function loadAnalysisFiles(): Promise<AnalysisData[]> {
     for (const file of files) {
       try {
         const filePath = path.join(dataDir, file);
-        const content = fs.readFileSync(filePath, 'utf-8');
+        // Resultados novos são gravados compactados (.json.gz)
+        const raw = fs.readFileSync(filePath);
+        const content = (file.endsWith('.gz') ? zlib.gunzipSync(raw) : raw).toString('utf-8');
         const data = JSON.parse(content);
         analysisData.push({
           fileName: file,